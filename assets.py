@@ -1,60 +1,175 @@
+"""Pyxelのリソース（スプライト）を作るスクリプト
+
+スプライトは atlas.py の SPRITES の位置に描き、イメージバンクごとの PNG
+（invaders_assets_bank0.png など）とアトラスの JSON（invaders_assets.json）を書き出す。
+ウィンドウは作らないので、描画環境のないマシンでも実行できる。
+
+このスクリプトと atlas.py の内容のハッシュを JSON に記録しておき、どちらも
+変わっていなければ作り直さない。
+
+    python assets.py            # 変わっていれば作り直す
+    python assets.py --force    # 必ず作り直す
+    python assets.py --pyxres   # リソースファイル invaders_assets.pyxres も作る（ウィンドウが必要）
+"""
+import argparse
+import hashlib
+import json
+import os
+
 import pyxel
 
-# Pyxelリソースファイルを作成するスクリプト
-def create_assets():
-    # リソースの初期化
-    pyxel.init(160, 120)
-    
-    # プレイヤー (Amazon Q) - 青色
-    pyxel.image(0).rect(0, 0, 8, 8, 0)  # 背景を透明に
-    pyxel.image(0).rect(2, 1, 4, 6, 12)  # 青い四角形
-    pyxel.image(0).pset(1, 2, 12)  # 左側の点
-    pyxel.image(0).pset(6, 2, 12)  # 右側の点
-    pyxel.image(0).pset(1, 5, 12)  # 左側の点
-    pyxel.image(0).pset(6, 5, 12)  # 右側の点
-    
-    # 敵タイプ1 (EC2) - 赤色
-    pyxel.image(0).rect(8, 0, 8, 8, 0)  # 背景を透明に
-    pyxel.image(0).rect(10, 1, 4, 6, 8)  # 赤い四角形
-    pyxel.image(0).line(10, 3, 13, 3, 7)  # 白い線
-    
-    # 敵タイプ2 (S3) - オレンジ色
-    pyxel.image(0).rect(16, 0, 8, 8, 0)  # 背景を透明に
-    pyxel.image(0).rect(18, 1, 4, 6, 9)  # オレンジの四角形
-    pyxel.image(0).line(18, 4, 21, 4, 7)  # 白い線
-    
-    # 敵タイプ3 (Lambda) - 黄色
-    pyxel.image(0).rect(24, 0, 8, 8, 0)  # 背景を透明に
-    pyxel.image(0).rect(26, 1, 4, 6, 10)  # 黄色の四角形
-    pyxel.image(0).line(26, 2, 29, 2, 7)  # 白い線
-    pyxel.image(0).line(26, 5, 29, 5, 7)  # 白い線
-    
-    # 通常弾 - 白色
-    pyxel.image(0).rect(0, 8, 2, 4, 0)  # 背景を透明に
-    pyxel.image(0).rect(0, 8, 2, 4, 7)  # 白い弾
-    
-    # 敵の弾 - 赤色
-    pyxel.image(0).rect(2, 8, 2, 4, 0)  # 背景を透明に
-    pyxel.image(0).rect(2, 8, 2, 4, 8)  # 赤い弾
-    
-    # 貫通弾 - オレンジ色
-    pyxel.image(0).rect(4, 8, 4, 8, 0)  # 背景を透明に
-    pyxel.image(0).rect(5, 8, 2, 6, 9)  # オレンジの弾
-    pyxel.image(0).tri(5, 8, 7, 8, 6, 6, 9)  # 三角形の先端
-    
-    # バウンス弾 - 黄色
-    pyxel.image(0).rect(8, 8, 4, 4, 0)  # 背景を透明に
-    pyxel.image(0).circ(10, 10, 2, 10)  # 黄色の円
-    
-    # 爆発エフェクト
-    pyxel.image(0).rect(12, 8, 8, 8, 0)  # 背景を透明に
-    pyxel.image(0).circb(16, 12, 3, 8)  # 赤い円
-    pyxel.image(0).circb(16, 12, 2, 10)  # 黄色い円
-    pyxel.image(0).circb(16, 12, 1, 7)  # 白い円
-    
-    # リソースファイルを保存
-    pyxel.save("invaders_assets.pyxres")
+from atlas import ASSET_DIR, BANK_FILE, MANIFEST_FILE, SPRITES, bank_path
+
+# 以前のリソースファイル（pyxel の Pyxel Editor などで開く用）
+RESOURCE_FILE = "invaders_assets.pyxres"
+
+# ハッシュに含めるファイル（スプライトの描き方と位置）
+SOURCES = ("assets.py", "atlas.py")
+
+
+# スプライトの描画（(x, y) はアトラスのスプライトの左上）
+
+def draw_player(image, x, y):
+    """プレイヤー (Amazon Q) - 青色"""
+    image.rect(x + 2, y + 1, 4, 6, 12)  # 青い四角形
+    image.pset(x + 1, y + 2, 12)  # 左側の点
+    image.pset(x + 6, y + 2, 12)  # 右側の点
+    image.pset(x + 1, y + 5, 12)  # 左側の点
+    image.pset(x + 6, y + 5, 12)  # 右側の点
+
+
+def draw_ec2(image, x, y):
+    """敵タイプ1 (EC2) - 赤色"""
+    image.rect(x + 2, y + 1, 4, 6, 8)  # 赤い四角形
+    image.line(x + 2, y + 3, x + 5, y + 3, 7)  # 白い線
+
+
+def draw_s3(image, x, y):
+    """敵タイプ2 (S3) - オレンジ色"""
+    image.rect(x + 2, y + 1, 4, 6, 9)  # オレンジの四角形
+    image.line(x + 2, y + 4, x + 5, y + 4, 7)  # 白い線
+
+
+def draw_lambda(image, x, y):
+    """敵タイプ3 (Lambda) - 黄色"""
+    image.rect(x + 2, y + 1, 4, 6, 10)  # 黄色の四角形
+    image.line(x + 2, y + 2, x + 5, y + 2, 7)  # 白い線
+    image.line(x + 2, y + 5, x + 5, y + 5, 7)  # 白い線
+
+
+def draw_player_bullet(image, x, y):
+    """通常弾 - 白色"""
+    image.rect(x, y, 2, 4, 7)
+
+
+def draw_enemy_bullet(image, x, y):
+    """敵の弾 - 赤色"""
+    image.rect(x, y, 2, 4, 8)
+
+
+def draw_penetrating_bullet(image, x, y):
+    """貫通弾 - オレンジ色"""
+    image.rect(x + 1, y, 2, 6, 9)  # オレンジの弾
+    image.tri(x + 1, y, x + 3, y, x + 2, y - 2, 9)  # 三角形の先端
+
+
+def draw_bouncing_bullet(image, x, y):
+    """バウンス弾 - 黄色"""
+    image.circ(x + 2, y + 2, 2, 10)  # 黄色の円
+
+
+def draw_explosion(image, x, y):
+    """爆発エフェクト"""
+    image.circb(x + 4, y + 4, 3, 8)  # 赤い円
+    image.circb(x + 4, y + 4, 2, 10)  # 黄色い円
+    image.circb(x + 4, y + 4, 1, 7)  # 白い円
+
+
+PAINTERS = {
+    "player": draw_player,
+    "enemy_ec2": draw_ec2,
+    "enemy_s3": draw_s3,
+    "enemy_lambda": draw_lambda,
+    "player_bullet": draw_player_bullet,
+    "enemy_bullet": draw_enemy_bullet,
+    "penetrating_bullet": draw_penetrating_bullet,
+    "bouncing_bullet": draw_bouncing_bullet,
+    "explosion": draw_explosion,
+}
+
+
+def source_hash():
+    """スプライトの描き方と位置を決めるファイルの内容のハッシュ"""
+    digest = hashlib.sha256()
+    for name in SOURCES:
+        with open(os.path.join(ASSET_DIR, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def read_manifest():
+    """前回書き出したアトラスの JSON（なければ None）"""
+    try:
+        with open(os.path.join(ASSET_DIR, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_up_to_date(digest):
+    """前回と同じソースから作った画像がそろっているか"""
+    manifest = read_manifest()
+    if manifest is None or manifest.get("source_hash") != digest:
+        return False
+    return all(os.path.exists(bank_path(int(bank))) for bank in manifest.get("banks", {}))
+
+
+def create_images():
+    """スプライトをアトラスの位置に描いたイメージバンクを返す（バンク番号 -> Image）"""
+    images = {}
+    for name, (bank, x, y, width, height) in SPRITES.items():
+        image = images.get(bank)
+        if image is None:
+            image = images[bank] = pyxel.Image(256, 256)
+        image.rect(x, y, width, height, 0)  # 背景を透明に
+        PAINTERS[name](image, x, y)
+    return images
+
+
+def build(force=False, pyxres=False):
+    """リソースを作る（ソースが変わっていなければ何もしない）。作ったら True を返す"""
+    digest = source_hash()
+    if not force and not pyxres and is_up_to_date(digest):
+        return False
+
+    images = create_images()
+    for bank, image in images.items():
+        image.save(bank_path(bank), 1)
+
+    manifest = {
+        "source_hash": digest,
+        "banks": {str(bank): BANK_FILE.format(bank=bank) for bank in sorted(images)},
+        "sprites": {name: list(rect) for name, rect in SPRITES.items()},
+    }
+    with open(os.path.join(ASSET_DIR, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+
+    if pyxres:
+        # リソースファイルの保存には pyxel の初期化（ウィンドウ）が必要
+        pyxel.init(160, 120)
+        for bank, image in images.items():
+            pyxel.images[bank].blt(0, 0, image, 0, 0, image.width, image.height)
+        pyxel.save(os.path.join(ASSET_DIR, RESOURCE_FILE))
+    return True
+
 
 if __name__ == "__main__":
-    create_assets()
-    print("Assets created successfully!")
+    parser = argparse.ArgumentParser(description="スプライトの画像を作る")
+    parser.add_argument("--force", action="store_true", help="ソースが変わっていなくても作り直す")
+    parser.add_argument("--pyxres", action="store_true", help=f"{RESOURCE_FILE} も作る")
+    args = parser.parse_args()
+    if build(args.force, args.pyxres):
+        print("Assets created successfully!")
+    else:
+        print("Assets are up to date.")
@@ -0,0 +1,39 @@
+"""スプライトのアトラス
+
+スプライトの名前から (イメージバンク, X, Y, 幅, 高さ) を引く表。assets.py はこの位置に
+スプライトを描き、ゲームオブジェクトはここからスプライトの位置を得る。pyxel には依存しない。
+
+assets.py はイメージバンクごとに PNG（BANK_FILE）を書き出し、描画側は使うバンクだけを
+最初に描くときに読み込む（render.SpriteBanks）。
+"""
+import os
+
+SPRITES = {
+    "player": (0, 0, 0, 8, 8),  # プレイヤー (Amazon Q)
+    "enemy_ec2": (0, 8, 0, 8, 8),  # 敵タイプ1 (EC2)
+    "enemy_s3": (0, 16, 0, 8, 8),  # 敵タイプ2 (S3)
+    "enemy_lambda": (0, 24, 0, 8, 8),  # 敵タイプ3 (Lambda)
+    "player_bullet": (0, 0, 8, 2, 4),  # 通常弾
+    "enemy_bullet": (0, 2, 8, 2, 4),  # 敵の弾
+    "penetrating_bullet": (0, 4, 8, 4, 8),  # 貫通弾
+    "bouncing_bullet": (0, 8, 8, 4, 4),  # バウンス弾
+    "explosion": (0, 12, 8, 8, 8),  # 爆発エフェクト
+}
+
+# enemy_type（0, 1, 2）の順の敵のスプライト
+ENEMY_SPRITES = ("enemy_ec2", "enemy_s3", "enemy_lambda")
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+BANK_FILE = "invaders_assets_bank{bank}.png"  # イメージバンクごとの画像
+MANIFEST_FILE = "invaders_assets.json"  # アトラスと作ったときのハッシュ
+
+
+def sprite_origin(name):
+    """スプライトの (イメージバンク, X, Y)"""
+    bank, x, y, _, _ = SPRITES[name]
+    return bank, x, y
+
+
+def bank_path(bank):
+    """イメージバンクの画像のパス"""
+    return os.path.join(ASSET_DIR, BANK_FILE.format(bank=bank))
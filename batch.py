@@ -0,0 +1,177 @@
+"""大量のゲームを並列に描画なしで実行するバッチランナー
+
+敵のパラメータ（EnemyManager の引数）の組み合わせ・方策・seed ごとに1ゲームずつ
+プロセスプールで実行し、結果を1ゲーム1行の JSONL（または Parquet）に書き出す。
+ゲーム同士は独立しているので、コア数にほぼ比例して速くなる。
+
+    python batch.py --param speed_step=0.1,0.2,0.3 --param shoot_chance_step=0.001,0.002 \\
+        --policy tracker --policy random --seeds 100 --output results.jsonl
+
+各行の内容: パラメータ、policy、seed、score、waves_cleared、frames、
+cause（"shot": 被弾、"invasion": 敵の到達、"timeout": max_frames まで生存）、lives
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from policies import POLICIES, create_policy
+from simulation import Simulation
+
+# --param で変えられる EnemyManager の引数
+PARAMS = ("speed", "shoot_chance", "speed_step", "shoot_chance_step")
+
+
+def run_game(job):
+    """1ゲームを実行して結果の辞書を返す（プロセスプールのワーカーで呼ばれる）"""
+    params, policy_name, seed, max_frames = job
+    sim = Simulation(seed=seed, enemy_settings=params)
+    policy = create_policy(policy_name, seed)
+    step = sim.step
+    while not sim.game_over and sim.frame_count < max_frames:
+        step(policy(sim))
+
+    result = dict(params)
+    result.update({
+        "policy": policy_name,
+        "seed": seed,
+        "score": sim.score,
+        "waves_cleared": sim.enemy_manager.waves_cleared,
+        "frames": sim.frame_count,
+        "cause": sim.death_cause or "timeout",
+        "lives": sim.player.lives,
+    })
+    return result
+
+
+def parse_param(text):
+    """"name=v1,v2,..." を (name, [v1, v2, ...]) にする"""
+    name, sep, values = text.partition("=")
+    if not sep or name not in PARAMS:
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=V1,V2,... with NAME in {', '.join(PARAMS)}: {text}")
+    try:
+        return name, [float(value) for value in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"values must be numbers: {text}") from None
+
+
+def iter_jobs(grid, policies, seeds, max_frames):
+    """パラメータの全組み合わせ × 方策 × seed のジョブを順に作る"""
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        for policy in policies:
+            for seed in seeds:
+                yield params, policy, seed, max_frames
+
+
+class JsonlWriter:
+    """結果を1行ずつ JSON で書き出す"""
+    def __init__(self, path):
+        self.file = open(path, "w") if path != "-" else sys.stdout
+
+    def write(self, result):
+        self.file.write(json.dumps(result) + "\n")
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ParquetWriter:
+    """結果を batch_size 行ずつまとめて Parquet で書き出す（pyarrow が必要）"""
+    def __init__(self, path, batch_size=4096):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet で書き出すには pyarrow が必要です") from None
+        self.pyarrow = pyarrow
+        self.path = path
+        self.batch_size = batch_size
+        self.rows = []
+        self.writer = None
+
+    def write(self, result):
+        self.rows.append(result)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        table = self.pyarrow.Table.from_pylist(self.rows)
+        if self.writer is None:
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+
+def run_batch(jobs, writer, workers=None, chunksize=16):
+    """ジョブを並列に実行し、終わった順に writer に書き出して件数を返す"""
+    count = 0
+    if workers == 1:  # デバッグやプロファイルのためにプロセスを使わない
+        for result in map(run_game, jobs):
+            writer.write(result)
+            count += 1
+        return count
+
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(run_game, jobs, chunksize):
+            writer.write(result)
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大量のゲームを並列に描画なしで実行")
+    parser.add_argument("--param", type=parse_param, action="append", default=[],
+                        metavar="NAME=V1,V2", help=f"変えるパラメータ（{', '.join(PARAMS)}）")
+    parser.add_argument("--policy", action="append", choices=list(POLICIES),
+                        help="方策（複数可、省略時は random）")
+    parser.add_argument("--seeds", type=int, default=100, help="組み合わせごとのゲーム数")
+    parser.add_argument("--first-seed", type=int, default=0, help="最初の seed")
+    parser.add_argument("--max-frames", type=int, default=30 * 60 * 10,
+                        help="1ゲームの最大フレーム数（既定は30fpsで10分）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="プロセス数")
+    parser.add_argument("--chunksize", type=int, default=16, help="1回にワーカーへ渡すゲーム数")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default="jsonl")
+    parser.add_argument("--output", help="出力ファイル（- で標準出力、既定は results.<format>）")
+    args = parser.parse_args()
+
+    names = [name for name, _ in args.param]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        parser.error(f"--param given more than once for: {', '.join(duplicates)}")
+    output = args.output or f"results.{args.format}"
+
+    grid = dict(args.param)
+    policies = args.policy or ["random"]
+    seeds = range(args.first_seed, args.first_seed + args.seeds)
+    jobs = iter_jobs(grid, policies, seeds, args.max_frames)
+    total = len(policies) * len(seeds)
+    for values in grid.values():
+        total *= len(values)
+
+    writer = ParquetWriter(output) if args.format == "parquet" else JsonlWriter(output)
+    start = time.perf_counter()
+    try:
+        count = run_batch(jobs, writer, args.workers, args.chunksize)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"{count}/{total} games in {elapsed:.1f}s ({count / elapsed:.1f} games/s, "
+          f"{args.workers} workers)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""性能計測用のスクリプト
+
+リポジトリのルートから python -m benchmarks.<名前> で実行する。
+"""
@@ -0,0 +1,77 @@
+"""弾のメモリ使用量の計測
+
+大量の弾を生成して1体あたりのバイト数を表示する。比較のために、インスタンスごとに
+__dict__ を持ち、大きさや色などの定数もインスタンスに入れていた以前のレイアウトを
+再現したクラスでも同じ計測を行う。
+
+    python -m benchmarks.memory --count 100000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from simulation import BouncingBullet, EnemyBullet, PenetratingBullet, PlayerBullet
+
+# 以前はインスタンスごとに持っていた属性
+LEGACY_FIELDS = {
+    PlayerBullet: ("width", "height", "color", "sprite_x", "sprite_y", "speed"),
+    EnemyBullet: ("width", "height", "color", "sprite_x", "sprite_y", "speed"),
+    PenetratingBullet: ("width", "height", "color", "sprite_x", "sprite_y", "speed",
+                        "penetrate", "bounce", "max_bounce", "dx", "dy"),
+    BouncingBullet: ("width", "height", "color", "sprite_x", "sprite_y", "speed",
+                     "penetrate", "bounce", "max_bounce"),
+}
+
+
+def legacy_layout(cls):
+    """cls と同じ振る舞いで、以前のように定数を __dict__ に持つクラスを作る"""
+    fields = LEGACY_FIELDS[cls]
+
+    def __init__(self, *args):
+        cls.__init__(self, *args)
+        for name in fields:
+            self.__dict__[name] = getattr(cls, name)
+
+    # __slots__ を定義しないので、派生クラスのインスタンスは __dict__ を持つ
+    return type("Legacy" + cls.__name__, (cls,), {"__init__": __init__})
+
+
+def measure(factory, count):
+    """factory で count 個を生成し、1個あたりの確保バイト数を返す"""
+    objects = [None] * count  # リスト自体の確保は計測に含めない
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        objects[i] = factory()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+# 計測するクラスとコンストラクタ引数
+BULLETS = (
+    (PlayerBullet, (0, 0)),
+    (EnemyBullet, (0, 0)),
+    (PenetratingBullet, (0, 0)),
+    (BouncingBullet, (0, 0, 1.5)),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="弾1体あたりのメモリ使用量を計測")
+    parser.add_argument("--count", type=int, default=100_000, help="生成する弾の数")
+    args = parser.parse_args()
+
+    print(f"{args.count} bullets per class (bytes per entity)")
+    print(f"{'class':<20}{'legacy':>10}{'slots':>10}{'saved':>10}")
+    for cls, ctor_args in BULLETS:
+        legacy_cls = legacy_layout(cls)
+        legacy = measure(lambda: legacy_cls(*ctor_args), args.count)
+        slots = measure(lambda: cls(*ctor_args), args.count)
+        print(f"{cls.__name__:<20}{legacy:>10.1f}{slots:>10.1f}{1 - slots / legacy:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
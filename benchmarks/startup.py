@@ -0,0 +1,107 @@
+"""起動時間の計測
+
+新しい Python のプロセスでゲームを起動し、最初のフレームを描くまでの時間を
+ウィンドウなし（SDL の offscreen ドライバ）で計測する。計測は --runs 回行い、中央値を表示する。
+
+- import: invaders_game_oop（と pyxel）の読み込み
+- init: InvadersGame の作成（pyxel.init、描画の準備、最初のゲーム）
+- first_frame: 最初のフレームの update と draw
+- assets: そのうちスプライトのイメージバンクの読み込み
+- total: import から最初のフレームまで（time-to-first-frame）
+- process: プロセスの起動から終了まで（インタプリタの起動を含む）
+
+--app に package_app.py で作ったアプリのディレクトリ（dist/invaders）を渡すと、
+アプリに入れたモジュールだけで起動したときの時間を計測する。
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 20 --json startup.json
+    python -m benchmarks.startup --app dist/invaders
+
+計測するプロセスではゲームより先にモジュールを読み込まないように、このモジュールの
+先頭では sys, os, time 以外を読み込まない。
+"""
+import os
+import sys
+import time
+
+METRICS = ("import", "init", "first_frame", "assets", "total", "process")
+
+
+def child(app_dir=None):
+    """ゲームを起動して最初のフレームを描き、各段階の時間（ミリ秒）を JSON で出力する"""
+    if app_dir:
+        sys.path.insert(0, os.path.abspath(app_dir))
+    os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    start = time.perf_counter()
+    import invaders_game_oop
+    import render
+    imported = time.perf_counter()
+    game = invaders_game_oop.InvadersGame(seed=0, run=False)
+    created = time.perf_counter()
+    game.update()
+    game.draw()
+    drawn = time.perf_counter()
+
+    import json
+
+    print(json.dumps({
+        "import": (imported - start) * 1000,
+        "init": (created - imported) * 1000,
+        "first_frame": (drawn - created) * 1000,
+        "assets": render.sprite_banks.load_time * 1000,
+        "total": (drawn - start) * 1000,
+        "module_dir": os.path.dirname(invaders_game_oop.__file__),
+    }))
+
+
+def measure(app_dir=None):
+    """新しいプロセスで1回計測した結果を返す"""
+    import json
+    import subprocess
+
+    command = [sys.executable, "-m", "benchmarks.startup", "--child"]
+    if app_dir:
+        command += ["--app", app_dir]
+    start = time.perf_counter()
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    process = (time.perf_counter() - start) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = process
+    return result
+
+
+def main():
+    import argparse
+    import json
+    import statistics
+
+    parser = argparse.ArgumentParser(description="ゲームの起動時間を計測")
+    parser.add_argument("--runs", type=int, default=10, help="計測する回数")
+    parser.add_argument("--app", metavar="DIR", help="package_app.py で作ったアプリのディレクトリ")
+    parser.add_argument("--json", metavar="PATH", help="結果を書き出す JSON ファイル")
+    args = parser.parse_args()
+
+    runs = [measure(args.app) for _ in range(args.runs)]
+    print(f"startup: {args.runs} runs from {runs[0]['module_dir']} (ms)")
+    print(f"{'':<12}{'median':>9}{'min':>9}{'max':>9}")
+    summary = {}
+    for name in METRICS:
+        values = [run[name] for run in runs]
+        summary[name] = {"median": statistics.median(values), "min": min(values),
+                         "max": max(values)}
+        print(f"{name:<12}{summary[name]['median']:>9.1f}{min(values):>9.1f}{max(values):>9.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": args.runs, "app": args.app, "unit": "ms", "metrics": summary},
+                      f, indent=2)
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        # 計測するプロセス（measure が起動する）では argparse も読み込まない
+        child(sys.argv[sys.argv.index("--app") + 1] if "--app" in sys.argv else None)
+    else:
+        main()
@@ -0,0 +1,293 @@
+"""ゲームロジックのベンチマーク
+
+決まった入力のシナリオを描画なしで進め、シナリオごとに次を計測する。
+
+- 1秒あたりのフレーム数（frames/s）と、1000フレームあたりのGC（第0世代）の回数
+- Simulation.PHASES の処理ごとの時間（平均と p99、ミリ秒）
+- tracemalloc で測ったメモリ確保のピーク（KiB）
+- --render を付けると InvadersGame.draw_game の時間（pyxel が必要）
+
+1フレームの処理の p99 が1tick の時間（--budget-ms、既定は30tick/秒の33.3ms）を超えるか、
+保存しておいたベースライン（benchmarks/baseline.json）と比べて frames/s が許容幅より
+下がったか、メモリ確保のピークが許容幅より増えたシナリオがあれば終了コード1で終わる。
+--stage で stages.py のステージ（"stress" など）や JSON のステージで計測できる。
+--collision swept で弾が動いた範囲で当たり判定する方式（Simulation の collision）を計測する。
+ベースラインとは同じエンジン・ステージ・当たり判定の方式のときだけ比べる。
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --scenario rapid_fire --frames 10000
+    python -m benchmarks.suite --stage stress --engine array --frames 600
+    python -m benchmarks.suite --save-baseline
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from profiler import FrameProfiler
+from simulation import Inputs, Simulation
+from stages import load_stage
+from timestep import TICK_RATE
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# 計測用のランダムな入力を使わず、シナリオごとに決まった入力にする
+IDLE = Inputs()
+FIRE_LEFT = Inputs(left=True, space=True)
+FIRE_RIGHT = Inputs(right=True, space=True)
+
+# 比較のときの絶対的な許容幅（小さい値の揺れで失敗しないように）
+ALLOC_SLACK_KIB = 16
+
+
+def sweep_fire(frame):
+    """弾を撃ち続けながら40フレームごとに左右に往復する"""
+    return FIRE_LEFT if (frame // 40) % 2 == 0 else FIRE_RIGHT
+
+
+class Scenario:
+    """ベンチマークのシナリオ
+
+    inputs(frame) はフレームごとの入力、setup(game) はゲームの開始（リセット）直後の準備、
+    before_step(game, frame) は各フレームの前に呼ぶ処理。
+    """
+    def __init__(self, name, description, inputs, setup=None, before_step=None):
+        self.name = name
+        self.description = description
+        self.inputs = inputs
+        self.setup = setup or (lambda game: None)
+        self.before_step = before_step or (lambda game, frame: None)
+
+
+def max_difficulty(clears):
+    """敵の群れを clears 回全滅させた後の難易度にするシナリオ"""
+    def setup(sim):
+        for _ in range(clears):
+            sim.enemy_manager.next_wave()
+
+    return Scenario("max_difficulty", f"{clears}回全滅させた後の群れに弾を撃ち続ける",
+                    sweep_fire, setup)
+
+
+def bounce_spam(sim, frame):
+    """4フレームごとにバウンス弾を発射"""
+    if frame % 4 == 0:
+        sim.fire_special_weapon(1)
+
+
+def create_scenarios(clears):
+    """シナリオを名前の辞書で返す"""
+    scenarios = [
+        Scenario("idle_wave", "何もせずに最初の群れが降りてくるのを待つ", lambda frame: IDLE),
+        Scenario("rapid_fire", "左右に動きながら弾を撃ち続ける", sweep_fire),
+        max_difficulty(clears),
+        Scenario("bounce_spam", "4フレームごとに fire_special_weapon(1) でバウンス弾を撃つ",
+                 sweep_fire, before_step=bounce_spam),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
+
+
+def run_frames(game, scenario, frames, seed, setup, on_frame=None):
+    """シナリオを frames フレーム進める（ゲームオーバーになったら次の seed でやり直す）"""
+    setup(game)
+    inputs = scenario.inputs
+    before_step = scenario.before_step
+    for frame in range(frames):
+        if game.game_over:
+            seed += 1
+            game.reset(seed)
+            setup(game)
+        before_step(game, frame)
+        game.step(inputs(frame))
+        if on_frame is not None:
+            on_frame()
+
+
+def gc_collections():
+    """第0世代のGCの回数"""
+    return gc.get_stats()[0]["collections"]
+
+
+def measure_simulation(scenario, create, frames, seed):
+    """シナリオを計測して結果の辞書を返す（create(seed) でゲームを作る）"""
+    # 1回目: 計測なしの速度とGCの回数
+    sim = create(seed)
+    collections = gc_collections()
+    start = time.perf_counter()
+    run_frames(sim, scenario, frames, seed, scenario.setup)
+    elapsed = time.perf_counter() - start
+    collections = gc_collections() - collections
+
+    # 2回目: 処理ごとの時間
+    sim = create(seed)
+    sim.profiler = FrameProfiler(window=frames)
+    run_frames(sim, scenario, frames, seed, scenario.setup)
+    phases = {name: {"mean_ms": stats["mean"], "p99_ms": stats["p99"]}
+              for name, stats in sim.profiler.summary().items()}
+
+    # 3回目: メモリ確保（tracemalloc は遅いので別に計る）
+    gc.collect()
+    tracemalloc.start()
+    sim = create(seed)
+    run_frames(sim, scenario, frames, seed, scenario.setup)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "fps": frames / elapsed,
+        "gc_per_1k_frames": collections * 1000 / frames,
+        "alloc_peak_kib": peak / 1024,
+        "phases": phases,
+    }
+
+
+def measure_render(scenario, frames, seed, stage, collision):
+    """InvadersGame.draw_game の時間を計測（pyxel が必要）"""
+    from invaders_game_oop import InvadersGame
+
+    game = InvadersGame(seed=seed, run=False, stage=stage, collision=collision)
+    profiler = FrameProfiler(window=frames)
+    run_frames(game.sim, scenario, frames, seed, scenario.setup,
+               on_frame=lambda: profiler.measure("draw", game.draw_game))
+    stats = profiler.summary()["draw"]
+    return {"mean_ms": stats["mean"], "p99_ms": stats["p99"]}
+
+
+def compare(results, baseline, tolerance):
+    """ベースラインより遅くなったか、メモリ確保が増えたシナリオの説明を返す"""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if result["fps"] < base["fps"] * (1 - tolerance):
+            regressions.append(f"{name}: fps {result['fps']:.0f} < baseline {base['fps']:.0f}")
+        limit = base["alloc_peak_kib"] * (1 + tolerance) + ALLOC_SLACK_KIB
+        if result["alloc_peak_kib"] > limit:
+            regressions.append(f"{name}: alloc peak {result['alloc_peak_kib']:.0f} KiB > "
+                               f"baseline {base['alloc_peak_kib']:.0f} KiB")
+    return regressions
+
+
+def over_budget(results, budget_ms):
+    """1フレームの処理の p99 が予算を超えたシナリオの説明を返す"""
+    return [f"{name}: step p99 {result['phases']['step']['p99_ms']:.2f} ms > "
+            f"budget {budget_ms:.2f} ms"
+            for name, result in results["scenarios"].items()
+            if result["phases"]["step"]["p99_ms"] > budget_ms]
+
+
+def print_results(results):
+    """結果を表にして表示"""
+    print(f"engine: {results['engine']}  stage: {results['stage']}  "
+          f"collision: {results['collision']}  frames: {results['frames']}  python: {results['python']}")
+    print(f"{'scenario':<16}{'fps':>10}{'gc/1k':>8}{'alloc KiB':>11}"
+          f"{'step ms':>9}{'draw ms':>9}")
+    for name, result in results["scenarios"].items():
+        step = result["phases"]["step"]["mean_ms"]
+        draw = f"{result['render']['mean_ms']:.3f}" if "render" in result else "-"
+        print(f"{name:<16}{result['fps']:>10.0f}{result['gc_per_1k_frames']:>8.1f}"
+              f"{result['alloc_peak_kib']:>11.1f}{step:>9.4f}{draw:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ゲームロジックのベンチマーク")
+    parser.add_argument("--scenario", action="append", help="実行するシナリオ（複数可、省略時は全部）")
+    parser.add_argument("--frames", type=int, default=3000, help="シナリオごとのフレーム数")
+    parser.add_argument("--seed", type=int, default=0, help="ゲームの seed")
+    parser.add_argument("--clears", type=int, default=10,
+                        help="max_difficulty で全滅させたことにする回数")
+    parser.add_argument("--engine", choices=("object", "array"), default="object",
+                        help="object: Simulation, array: ArraySimulation（要NumPy）")
+    parser.add_argument("--stage", default="classic", help="ステージの名前か JSON ファイル")
+    parser.add_argument("--collision", choices=Simulation.COLLISION_MODES, default="discrete",
+                        help="弾の当たり判定の方式")
+    parser.add_argument("--budget-ms", type=float, default=1000 / TICK_RATE,
+                        help="1フレームの処理の p99 の上限（ミリ秒）")
+    parser.add_argument("--render", action="store_true", help="描画の時間も計測（要pyxel）")
+    parser.add_argument("--output", metavar="PATH", help="結果を書き出す JSON ファイル")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="比較するベースラインの JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="結果をベースラインとして保存")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="ベースラインからの許容幅")
+    args = parser.parse_args()
+
+    if args.engine == "array":
+        from entity_store import ArraySimulation as simulation_class
+    else:
+        simulation_class = Simulation
+    try:
+        stage = load_stage(args.stage)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    scenarios = create_scenarios(args.clears)
+    names = args.scenario or list(scenarios)
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)} (choose from {', '.join(scenarios)})")
+
+    results = {
+        "engine": args.engine,
+        "stage": stage.name,
+        "collision": args.collision,
+        "frames": args.frames,
+        "python": platform.python_version(),
+        "scenarios": {},
+    }
+    for name in names:
+        scenario = scenarios[name]
+        result = measure_simulation(
+            scenario, lambda seed: simulation_class.from_stage(stage, seed,
+                                                               collision=args.collision),
+            args.frames, args.seed)
+        if args.render:
+            result["render"] = measure_render(scenario, args.frames, args.seed, stage,
+                                              args.collision)
+        results["scenarios"][name] = result
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    slow = over_budget(results, args.budget_ms)
+    if slow:
+        print(f"FAIL: {len(slow)} scenario(s) over the frame budget")
+        for line in slow:
+            print(f"  {line}")
+        sys.exit(1)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline: {args.baseline} (create one with --save-baseline)")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    recorded = (baseline.get("engine"), baseline.get("stage", "classic"),
+                baseline.get("collision", "discrete"), baseline.get("frames"))
+    if recorded != (args.engine, stage.name, args.collision, args.frames):
+        print("baseline was recorded with a different engine, stage, collision mode or "
+              "frame count; not compared")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"FAIL: {len(regressions)} regression(s) against {args.baseline}")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"OK: within {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""衝突判定のブロードフェーズ（一様グリッド）
+
+画面をセルに分割して各オブジェクトを重なるセルに登録し、近くにあるものだけを
+衝突判定の候補として返す。全組み合わせを調べる総当たりの代わりに使う。
+"""
+
+# 問い合わせがこの回数以下ならグリッドを作らずに総当たりで調べる
+# （少数の弾に対してはグリッドの構築コストの方が高くつくため）
+BRUTE_FORCE_QUERIES = 4
+
+
+class UniformGrid:
+    """一様グリッドによる空間ハッシュ"""
+    def __init__(self, width, height, cell_size=16):
+        self.cell_size = cell_size
+        self.cols = max(1, -(-width // cell_size))  # 切り上げ
+        self.rows = max(1, -(-height // cell_size))
+        self.cells = [[] for _ in range(self.cols * self.rows)]
+        self.items = []  # 登録順のオブジェクト（セルにはこの添字を入れる）
+        self._used_cells = []  # 前回から使ったセル（クリアを最小限にするため）
+        self._all = None  # 総当たりのときに候補として返す全オブジェクト
+
+    def clear(self):
+        """登録済みのオブジェクトをすべて取り除く"""
+        for cell in self._used_cells:
+            cell.clear()
+        self._used_cells.clear()
+        self.items.clear()
+        self._all = None
+
+    def _cell_range(self, x, y, width, height):
+        """矩形が重なるセルの範囲を返す（画面外は端のセルに丸める）"""
+        size = self.cell_size
+        last_col = self.cols - 1
+        last_row = self.rows - 1
+        col0 = int(x) // size
+        col1 = int(x + width) // size
+        row0 = int(y) // size
+        row1 = int(y + height) // size
+        if col0 < 0:
+            col0 = 0
+        if col1 > last_col:
+            col1 = last_col
+        if row0 < 0:
+            row0 = 0
+        if row1 > last_row:
+            row1 = last_row
+        if col0 > col1:  # 完全に画面外の場合は一番近いセルに入れる
+            col0 = col1 = col1 if col1 >= 0 else 0
+        if row0 > row1:
+            row0 = row1 = row1 if row1 >= 0 else 0
+        return col0, col1, row0, row1
+
+    def insert(self, obj):
+        """オブジェクトを登録"""
+        items = self.items
+        index = len(items)
+        items.append(obj)
+        cells = self.cells
+        used_cells = self._used_cells
+        cols = self.cols
+        col0, col1, row0, row1 = self._cell_range(obj.x, obj.y, obj.width, obj.height)
+        for row in range(row0, row1 + 1):
+            base = row * cols
+            for col in range(col0, col1 + 1):
+                cell = cells[base + col]
+                if not cell:
+                    used_cells.append(cell)
+                cell.append(index)
+
+    def rebuild(self, objects):
+        """有効なオブジェクトだけでグリッドを作り直す"""
+        self.clear()
+        for obj in objects:
+            if obj.is_active:
+                self.insert(obj)
+
+    def prepare(self, objects, query_count):
+        """問い合わせ回数に応じてグリッドを作り直すか総当たりにするかを決める"""
+        if query_count <= BRUTE_FORCE_QUERIES:
+            self.clear()
+            self._all = objects
+        else:
+            self.rebuild(objects)
+
+    def query_rect(self, x, y, width, height):
+        """矩形の近くにあるオブジェクトを登録順で返す"""
+        if self._all is not None:
+            return self._all
+
+        cells = self.cells
+        col0, col1, row0, row1 = self._cell_range(x, y, width, height)
+        if col0 == col1 and row0 == row1:
+            # 1つのセルに収まる場合は重複がないのでそのまま返す
+            return [self.items[i] for i in cells[row0 * self.cols + col0]]
+
+        found = set()
+        for row in range(row0, row1 + 1):
+            base = row * self.cols
+            for col in range(col0, col1 + 1):
+                found.update(cells[base + col])
+        items = self.items
+        return [items[i] for i in sorted(found)]
+
+    def query(self, obj):
+        """オブジェクトと衝突しうる候補を登録順で返す"""
+        return self.query_rect(obj.x, obj.y, obj.width, obj.height)
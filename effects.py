@@ -0,0 +1,203 @@
+"""爆発と破片のパーティクル
+
+敵を倒したイベント（events.EnemyKilled）から、倒した位置に爆発のスプライトと
+飛び散る破片を出す。パーティクルは1つずつのオブジェクトにせず、最初に確保した
+NumPy の配列をリングバッファとして使う（満杯なら一番古いものから上書きする）。
+移動と寿命の更新は配列演算でまとめて行う。
+
+1tick に出すパーティクルの数には上限（spawn_limit）があり、超えた分は出さない。
+パーティクルの更新と描画の時間が予算（budget_ms）を超えたときや、ゲームが描画に
+追いつけずに1フレームで複数 tick 進めたときは、1体あたりの破片を減らし、描く
+パーティクルを間引く。余裕が戻れば少しずつ元に戻す。
+
+見た目だけのものなので、乱数はゲームの rng ではなく専用の乱数生成器を使う
+（リプレイや Simulation の結果には影響しない）。描画は render.draw_particles が行う。
+
+NumPyはオプションの依存関係で、インストールされていない環境（Web版など）では
+パーティクルは出ない。
+"""
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPyがない環境ではパーティクルを使えない
+    np = None
+
+DEBRIS = 0  # 破片（点）
+EXPLOSION = 1  # 爆発（スプライト）
+
+DEBRIS_COLORS = (8, 9, 10)  # 敵タイプごとの破片の色（スプライトの色に合わせる）
+EXPLOSION_LIFE = 8  # 爆発を表示する tick 数
+DEBRIS_LIFE = (10, 20)  # 破片の寿命の範囲（tick 数）
+DEBRIS_SPEED = 1.5  # 破片の初速の最大値
+GRAVITY = 0.1  # 破片の落ちる加速度
+MAX_STRIDE = 8  # 間引くときに描く間隔の最大値
+
+
+class Particles:
+    """リングバッファの配列に持つパーティクル"""
+    def __init__(self, capacity=1024, spawn_limit=128, debris=6, budget_ms=2.0, seed=None):
+        if np is None:
+            raise ImportError("Particles を使うには NumPy が必要です")
+        self.capacity = capacity  # 同時に存在できるパーティクルの数
+        self.spawn_limit = spawn_limit  # 1tick に出せるパーティクルの数
+        self.max_debris = debris  # 倒した敵1体あたりの破片の数
+        self.debris = debris  # 今の破片の数（予算を超えると減らす）
+        self.stride = 1  # 描くパーティクルの間隔（予算を超えると間引く）
+        self.budget = budget_ms / 1000  # 1フレームの更新と描画の時間の予算（秒）
+        self.rng = np.random.default_rng(seed)
+
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.vx = np.zeros(capacity, np.float32)
+        self.vy = np.zeros(capacity, np.float32)
+        self.life = np.zeros(capacity, np.int16)  # 残りの tick 数（0なら空き）
+        self.kind = np.zeros(capacity, np.uint8)
+        self.color = np.zeros(capacity, np.uint8)
+        self.head = 0  # 次に書き込む位置
+
+        self.spawned = 0  # この tick に出した数
+        self.dropped = 0  # 上限のために出さなかった数（累計）
+        self.update_time = 0.0  # 直前の update の時間（秒）
+        self.draw_time = 0.0  # 直前の描画の時間（秒、render.draw_particles が入れる）
+
+    def clear(self):
+        """すべてのパーティクルを消す"""
+        self.life[:] = 0
+        self.head = 0
+        self.spawned = 0
+
+    def spawn_kills(self, events):
+        """敵を倒したイベントのリストから爆発と破片を出す（Simulation.subscribe に渡す）"""
+        count = len(events)
+        x = np.fromiter((event.x for event in events), np.float32, count)
+        y = np.fromiter((event.y for event in events), np.float32, count)
+        enemy_type = np.fromiter((event.enemy_type for event in events), np.intp, count)
+        room = self.spawn_limit - self.spawned
+        if count > room:
+            self.dropped += (count - room) * (1 + self.debris)
+            x, y, enemy_type = x[:room], y[:room], enemy_type[:room]
+            count = room
+        if not count:
+            return
+        self.spawn(EXPLOSION, x, y, 0, 0, EXPLOSION_LIFE, 0)
+
+        # 破片は爆発の中心から飛び散る（出せる数が足りなければ先の敵の破片から出す）
+        room -= count
+        total = min(count * self.debris, room)
+        self.dropped += count * self.debris - total
+        if total <= 0:
+            return
+        source = np.repeat(np.arange(count), self.debris)[:total]
+        angle = self.rng.uniform(0, 2 * np.pi, total)
+        speed = self.rng.uniform(0.3, DEBRIS_SPEED, total)
+        self.spawn(DEBRIS, x[source] + 4, y[source] + 4,
+                   np.cos(angle) * speed, np.sin(angle) * speed - 0.5,
+                   self.rng.integers(*DEBRIS_LIFE, total),
+                   np.take(DEBRIS_COLORS, enemy_type[source], mode="wrap"))
+
+    def spawn(self, kind, x, y, vx, vy, life, color):
+        """パーティクルをリングバッファの head から書き込む（古いものは上書きする）"""
+        count = len(x)
+        index = (self.head + np.arange(count)) % self.capacity
+        self.x[index] = x
+        self.y[index] = y
+        self.vx[index] = vx
+        self.vy[index] = vy
+        self.life[index] = life
+        self.kind[index] = kind
+        self.color[index] = color
+        self.head = int(index[-1] + 1) % self.capacity
+        self.spawned += count
+
+    def update(self, behind=False):
+        """1tick 進める（behind はゲームが描画に追いつけていないとき True）"""
+        start = time.perf_counter()
+        self.adapt(behind or self.update_time + self.draw_time > self.budget)
+        self.spawned = 0
+
+        live = self.life > 0
+        if live.any():
+            np.add(self.x, self.vx, out=self.x, where=live)
+            np.add(self.y, self.vy, out=self.y, where=live)
+            debris = live & (self.kind == DEBRIS)
+            np.add(self.vy, GRAVITY, out=self.vy, where=debris)
+            np.subtract(self.life, 1, out=self.life, where=live)
+        self.update_time = time.perf_counter() - start
+
+    def adapt(self, over_budget):
+        """予算を超えたら破片を減らして間引き、余裕があれば少しずつ戻す"""
+        if over_budget:
+            self.debris //= 2
+            self.stride = min(self.stride * 2, MAX_STRIDE)
+        elif self.update_time + self.draw_time < self.budget / 4:
+            if self.stride > 1:
+                self.stride //= 2
+            elif self.debris < self.max_debris:
+                self.debris += 1
+
+    def visible(self):
+        """描くパーティクルの (爆発の (x, y) のリスト, 破片の (x, y, 色) のリスト)
+
+        間引いているときは stride 個に1個だけ返す。
+        """
+        index = np.flatnonzero(self.life > 0)[::self.stride]
+        if not index.size:
+            return [], []
+        x = self.x[index].astype(np.int32)
+        y = self.y[index].astype(np.int32)
+        explosion = self.kind[index] == EXPLOSION
+        debris = ~explosion
+        return (list(zip(x[explosion].tolist(), y[explosion].tolist())),
+                list(zip(x[debris].tolist(), y[debris].tolist(),
+                         self.color[index][debris].tolist())))
+
+    def stats(self):
+        """今の状態を辞書で返す"""
+        return {
+            "live": int(np.count_nonzero(self.life > 0)),
+            "dropped": self.dropped,
+            "debris": self.debris,
+            "stride": self.stride,
+            "update_ms": self.update_time * 1000,
+            "draw_ms": self.draw_time * 1000,
+        }
+
+
+def main():
+    """stress ステージを描画なしで進め、パーティクルの数と更新の時間を表示"""
+    import argparse
+
+    from events import EnemyKilled
+    from policies import create_policy
+    from simulation import Simulation
+    from stages import STAGES
+
+    parser = argparse.ArgumentParser(description="パーティクルの更新の時間を計測")
+    parser.add_argument("--stage", default="stress", choices=sorted(STAGES))
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    sim = Simulation.from_stage(STAGES[args.stage], args.seed)
+    particles = Particles(seed=args.seed)
+    sim.subscribe(EnemyKilled, particles.spawn_kills)
+    policy = create_policy("tracker", args.seed)
+    times = []
+    peak = 0
+    while sim.frame_count < args.frames and not sim.game_over:
+        sim.step(policy(sim))
+        particles.update()
+        particles.visible()
+        times.append(particles.update_time)
+        peak = max(peak, particles.stats()["live"])
+    times.sort()
+    stats = particles.stats()
+    print(f"{args.stage}: {sim.frame_count} ticks, score {sim.score}, peak {peak} particles, "
+          f"dropped {stats['dropped']}")
+    print(f"update p50 {times[len(times) // 2] * 1000:.3f} ms  "
+          f"p99 {times[int(len(times) * 0.99)] * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
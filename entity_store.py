@@ -0,0 +1,723 @@
+"""配列ベース（struct-of-arrays）のエンティティストア
+
+弾と敵を1体ずつのオブジェクトではなく、種類ごとのNumPy配列で持つ。
+移動・画面外の削除・矩形の当たり判定を配列演算でまとめて行うため、
+エンティティ数が多いときに Simulation より大幅に速い。
+
+NumPyはオプションの依存関係で、インストールされていない環境（Web版など）では
+このモジュールを使わずにオブジェクト版の Simulation を使う。
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPyがない環境ではオブジェクト版のみ使える
+    np = None
+
+from events import EnemyKilled, ShotFired
+from pool import compact
+from simulation import ENEMY_SPRITE_ORIGINS, Enemy, EnemyBullet, PlayerBullet, Simulation
+from sweep import NO_HIT
+
+
+def _axis_times(start, delta, size, target, target_size):
+    """sweep._axis の配列版"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t0 = (target - size - start) / delta
+        t1 = (target + target_size - start) / delta
+    moving = delta != 0
+    static = (start < target + target_size) & (start + size > target)
+    enter = np.where(moving, np.minimum(t0, t1), np.where(static, -np.inf, np.inf))
+    leave = np.where(moving, np.maximum(t0, t1), np.where(static, np.inf, -np.inf))
+    return enter, leave
+
+
+def sweep_times(x, y, dx, dy, width, height, target_x, target_y, target_width, target_height):
+    """sweep.sweep の配列版（引数はブロードキャストできる配列、重ならない組は NO_HIT）
+
+    ブロードキャストで弾の数 x 相手の数の時刻の行列も作れる。
+    """
+    enter_x, exit_x = _axis_times(x, dx, width, target_x, target_width)
+    enter_y, exit_y = _axis_times(y, dy, height, target_y, target_height)
+    enter = np.maximum(enter_x, enter_y)
+    leave = np.minimum(exit_x, exit_y)
+    hit = (enter < leave) & (enter < 1.0) & (leave > 0.0)
+    return np.where(hit, np.maximum(enter, 0.0), NO_HIT)
+
+
+class EntityArrays:
+    """同じ種類のエンティティを配列で持つストア
+
+    有効な要素は先頭の count 個で、compact() で無効な要素を詰める。
+    color や sprite_x などの見た目は種類ごとに共通なのでストアに1つだけ持つ。
+    prev_x と prev_y は直前の tick の位置で、補間描画に使う（ArraySimulation.save_positions）。
+    """
+    FLOAT_FIELDS = ("x", "y", "prev_x", "prev_y", "width", "height", "speed")
+    INT_FIELDS = ()
+
+    def __init__(self, color, sprite_x=None, sprite_y=None, direction=0, capacity=64,
+                 sprite_bank=0):
+        if np is None:
+            raise ImportError("EntityArrays を使うには NumPy が必要です")
+
+        self.color = color
+        self.sprite_bank = sprite_bank
+        self.sprite_x = sprite_x
+        self.sprite_y = sprite_y
+        self.direction = direction  # Y方向の移動の向き（-1: 上, 1: 下）
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """配列を確保（既存の要素は引き継ぐ）"""
+        n = self.count
+        for name in self.FLOAT_FIELDS:
+            array = np.zeros(capacity, dtype=np.float64)
+            if n:
+                array[:n] = getattr(self, name)[:n]
+            setattr(self, name, array)
+        for name in self.INT_FIELDS:
+            array = np.zeros(capacity, dtype=np.int64)
+            if n:
+                array[:n] = getattr(self, name)[:n]
+            setattr(self, name, array)
+        active = np.zeros(capacity, dtype=bool)
+        if n:
+            active[:n] = self.active[:n]
+        self.active = active
+        self.capacity = capacity
+
+    def _reserve(self, extra):
+        """extra 個を追加できるように容量を確保"""
+        needed = self.count + extra
+        if needed > self.capacity:
+            capacity = self.capacity
+            while capacity < needed:
+                capacity *= 2
+            self._allocate(capacity)
+
+    def clear(self):
+        """すべての要素を取り除く"""
+        self.active[:self.count] = False
+        self.count = 0
+
+    def spawn(self, x, y, width, height, speed=0.0, **fields):
+        """要素を1つ追加して添字を返す"""
+        self._reserve(1)
+        i = self.count
+        self.x[i] = self.prev_x[i] = x
+        self.y[i] = self.prev_y[i] = y
+        self.width[i] = width
+        self.height[i] = height
+        self.speed[i] = speed
+        for name, value in fields.items():
+            getattr(self, name)[i] = value
+        self.active[i] = True
+        self.count = i + 1
+        return i
+
+    def spawn_many(self, xs, ys, width, height, speed=0.0):
+        """要素をまとめて追加"""
+        k = len(xs)
+        if k == 0:
+            return
+        self._reserve(k)
+        start = self.count
+        end = start + k
+        self.x[start:end] = self.prev_x[start:end] = xs
+        self.y[start:end] = self.prev_y[start:end] = ys
+        self.width[start:end] = width
+        self.height[start:end] = height
+        self.speed[start:end] = speed
+        self.active[start:end] = True
+        self.count = end
+
+    def move(self):
+        """有効な要素を速度と向きに従ってY方向に動かす"""
+        n = self.count
+        np.add(self.y[:n], self.speed[:n] * self.direction, out=self.y[:n],
+               where=self.active[:n])
+
+    def save_positions(self):
+        """今の位置を直前の位置として記録"""
+        n = self.count
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+
+    def cull(self, min_y, max_y):
+        """Y座標が範囲外になった要素を無効にする"""
+        n = self.count
+        y = self.y[:n]
+        self.active[:n] &= (y >= min_y) & (y <= max_y)
+
+    def compact(self):
+        """無効な要素を取り除いて有効な要素を先頭に詰める"""
+        n = self.count
+        keep = self.active[:n]
+        k = int(np.count_nonzero(keep))
+        if k == n:
+            return
+        for name in self.FLOAT_FIELDS + self.INT_FIELDS:
+            array = getattr(self, name)
+            array[:k] = array[:n][keep]
+        self.active[:k] = True
+        self.active[k:n] = False
+        self.count = k
+
+    def overlaps(self, x, y, width, height):
+        """矩形と重なっている有効な要素のマスクを返す"""
+        n = self.count
+        return (self.active[:n] &
+                (self.x[:n] < x + width) & (self.x[:n] + self.width[:n] > x) &
+                (self.y[:n] < y + height) & (self.y[:n] + self.height[:n] > y))
+
+    def swept_bounds(self):
+        """有効な要素がこの tick に動いた範囲の矩形 (x, y, 幅, 高さ) の配列
+
+        要素はY方向にまっすぐ動くので、この矩形と重なることと動いた範囲で重なることは同じ。
+        """
+        n = self.count
+        dy = self.speed[:n] * self.direction
+        return (self.x[:n], self.y[:n] - np.maximum(dy, 0.0), self.width[:n],
+                self.height[:n] + np.abs(dy))
+
+    def swept_overlaps(self, x, y, width, height):
+        """この tick に動いた範囲で矩形と重なった有効な要素のマスクを返す"""
+        n = self.count
+        sx, sy, sw, sh = self.swept_bounds()
+        return (self.active[:n] &
+                (sx < x + width) & (sx + sw > x) & (sy < y + height) & (sy + sh > y))
+
+    def swept_overlap_matrix(self, other):
+        """有効な要素がこの tick に動いた範囲と other の有効な要素の重なりを
+        (self.count, other.count) の行列で返す（other は止まっているものとする）"""
+        n = self.count
+        m = other.count
+        sx, sy, sw, sh = (v[:, None] for v in self.swept_bounds())
+        ox = other.x[None, :m]
+        oy = other.y[None, :m]
+        return (self.active[:n, None] & other.active[None, :m] &
+                (sx < ox + other.width[None, :m]) & (sx + sw > ox) &
+                (sy < oy + other.height[None, :m]) & (sy + sh > oy))
+
+    def sweep_times(self, index, x, y, width, height):
+        """index の要素（配列でもよい）がこの tick に動いた範囲で矩形と最初に重なる時刻"""
+        dy = self.speed[index] * self.direction
+        return sweep_times(self.x[index], self.y[index] - dy, 0.0, dy, self.width[index],
+                           self.height[index], x, y, width, height)
+
+    def overlap_matrix(self, other):
+        """有効な要素同士の重なりを (self.count, other.count) の行列で返す"""
+        n = self.count
+        m = other.count
+        x = self.x[:n, None]
+        y = self.y[:n, None]
+        ox = other.x[None, :m]
+        oy = other.y[None, :m]
+        return (self.active[:n, None] & other.active[None, :m] &
+                (x < ox + other.width[None, :m]) & (x + self.width[:n, None] > ox) &
+                (y < oy + other.height[None, :m]) & (y + self.height[:n, None] > oy))
+
+    def view(self, index):
+        """添字の要素をオブジェクトとして扱うビューを返す"""
+        return EntityView(self, index)
+
+    def views(self):
+        """有効な要素のビューのリストを返す"""
+        return [self.view(i) for i in np.flatnonzero(self.active[:self.count])]
+
+
+class EnemyArrays(EntityArrays):
+    """敵のストア（敵タイプと発射確率、次に撃つフレームを要素ごとに持つ）"""
+    FLOAT_FIELDS = EntityArrays.FLOAT_FIELDS + ("shoot_chance",)
+    INT_FIELDS = ("enemy_type", "next_fire")
+
+    def view(self, index):
+        return EnemyView(self, index)
+
+
+def _array_property(name):
+    """ストアの配列の1要素を読み書きするプロパティを作る"""
+    def fget(self):
+        return getattr(self.store, name)[self.index].item()
+
+    def fset(self, value):
+        getattr(self.store, name)[self.index] = value
+
+    return property(fget, fset)
+
+
+class EntityView:
+    """ストアの1要素を従来のゲームオブジェクトと同じ属性で扱うビュー
+
+    描画やデバッグなど、オブジェクトを前提にしたコードとの互換のために使う。
+    ストアが compact() されると添字がずれるので、ビューはその都度取り直すこと。
+    """
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = int(index)
+
+    x = _array_property("x")
+    y = _array_property("y")
+    prev_x = _array_property("prev_x")
+    prev_y = _array_property("prev_y")
+    width = _array_property("width")
+    height = _array_property("height")
+    speed = _array_property("speed")
+    is_active = _array_property("active")
+
+    @property
+    def color(self):
+        return self.store.color
+
+    @property
+    def sprite_bank(self):
+        return self.store.sprite_bank
+
+    @property
+    def sprite_x(self):
+        return self.store.sprite_x
+
+    @property
+    def sprite_y(self):
+        return self.store.sprite_y
+
+    def collides_with(self, other):
+        """他のオブジェクトとの衝突判定"""
+        if not self.is_active or not other.is_active:
+            return False
+
+        return (self.x < other.x + other.width and
+                self.x + self.width > other.x and
+                self.y < other.y + other.height and
+                self.y + self.height > other.y)
+
+
+class EnemyView(EntityView):
+    """敵のビュー"""
+    __slots__ = ()
+
+    enemy_type = _array_property("enemy_type")
+    shoot_chance = _array_property("shoot_chance")
+
+    # 敵タイプに応じて異なるスプライト
+    @property
+    def sprite_bank(self):
+        return ENEMY_SPRITE_ORIGINS[self.enemy_type][0]
+
+    @property
+    def sprite_x(self):
+        return ENEMY_SPRITE_ORIGINS[self.enemy_type][1]
+
+    @property
+    def sprite_y(self):
+        return ENEMY_SPRITE_ORIGINS[self.enemy_type][2]
+
+
+# 撃たない敵の next_fire（フレーム数を足してもあふれない大きさ）
+NEVER = 2 ** 62
+
+
+def fire_intervals(rng, chance):
+    """発射確率の配列から、次に撃つまでのフレーム数（1以上）を引く
+
+    firing.fire_interval の配列版。確率が0以下の敵は撃たない（NEVER を返す）。
+    """
+    intervals = np.full(chance.shape, NEVER, dtype=np.int64)
+    shooting = chance > 0
+    if shooting.any():
+        intervals[shooting] = rng.geometric(np.minimum(chance[shooting], 1.0))
+    return intervals
+
+
+class ArrayEnemyManager:
+    """敵の集団を配列で管理するクラス（EnemyManager と同じルール）
+
+    発射は EnemyManager と同じく、次に撃つフレームを幾何分布から引いておき、
+    そのフレームになった敵だけ撃って次のフレームを引き直す。
+    """
+    def __init__(self, game_width, game_height, rng, speed=0.5, shoot_chance=0.005,
+                 speed_step=0.2, shoot_chance_step=0.002, rows=3, columns=6, origin_x=20,
+                 origin_y=5, spacing_x=20, spacing_y=10, enemy_types=(0, 1, 2), drop=3):
+        self.game_width = game_width
+        self.game_height = game_height
+        self.rng = rng  # NumPyの乱数生成器
+        self.store = EnemyArrays(Enemy.color)  # スプライトは敵タイプごとに EnemyView が引く
+        self.rows = rows
+        self.columns = columns
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.spacing_x = spacing_x
+        self.spacing_y = spacing_y
+        self.enemy_types = enemy_types
+        self.drop = drop
+        self.move_dir = 1  # 1: 右, -1: 左
+        self.speed = speed
+        self.shoot_chance = shoot_chance
+        self.speed_step = speed_step
+        self.shoot_chance_step = shoot_chance_step
+        self.waves_cleared = 0  # 全滅させた群れの数
+        self.alive = 0  # 生きている敵の数
+        self.frame = 0  # update() を呼んだ回数
+
+    @property
+    def enemies(self):
+        """互換用：有効な敵のビュー"""
+        return self.store.views()
+
+    def create_enemies(self):
+        """敵を配置"""
+        store = self.store
+        store.clear()
+        enemy_types = self.enemy_types
+        for y in range(self.rows):
+            enemy_type = enemy_types[y % len(enemy_types)]
+            for x in range(self.columns):
+                store.spawn(self.origin_x + x * self.spacing_x, self.origin_y + y * self.spacing_y,
+                            Enemy.width, Enemy.height, enemy_type=enemy_type,
+                            shoot_chance=self.shoot_chance)
+        self.alive = store.count
+        self.reschedule()
+
+    def reschedule(self):
+        """今のフレームから発射予定を引き直す（発射確率を変えたときに呼ぶ）"""
+        store = self.store
+        n = store.count
+        store.next_fire[:n] = self.frame + fire_intervals(self.rng, store.shoot_chance[:n])
+
+    def set_shoot_chance(self, shoot_chance):
+        """群れの途中で発射確率を変える（発射予定も引き直す）"""
+        self.shoot_chance = shoot_chance
+        self.store.shoot_chance[:self.store.count] = shoot_chance
+        self.reschedule()
+
+    def next_wave(self):
+        """難易度を上げて次の敵の群れを配置"""
+        self.waves_cleared += 1
+        self.speed += self.speed_step
+        self.shoot_chance += self.shoot_chance_step
+        self.create_enemies()
+
+    def update(self, game):
+        """敵の移動と弾の発射"""
+        store = self.store
+        n = store.count
+        alive = store.active[:n]
+        x = store.x[:n]
+        y = store.y[:n]
+        width = store.width[:n]
+        height = store.height[:n]
+
+        # 移動方向の判定
+        if self.move_dir > 0:
+            move_down = bool(np.any(alive & (x >= self.game_width - width)))
+        else:
+            move_down = bool(np.any(alive & (x <= 0)))
+
+        # 移動処理
+        if move_down:
+            self.move_dir *= -1
+            np.add(y, self.drop, out=y, where=alive)
+        else:
+            np.add(x, self.move_dir * self.speed, out=x, where=alive)
+
+        # 弾の発射（このフレームに撃つ予定の敵だけ、次の予定を引き直す）
+        self.frame += 1
+        next_fire = store.next_fire[:n]
+        shooters = alive & (next_fire <= self.frame)
+        if shooters.any():
+            next_fire[shooters] = self.frame + fire_intervals(
+                self.rng, store.shoot_chance[:n][shooters])
+            game.add_enemy_bullets(x[shooters] + game.enemy_bullet_offset,
+                                   y[shooters] + height[shooters])
+
+        # 全滅判定
+        if not self.alive:
+            self.next_wave()
+
+        # プレイヤーに到達判定（敵はこの後のフレームの処理では動かないので、ここで1回だけ判定する）
+        if self.bottom() >= game.player.y:
+            game.end_game("invasion")
+
+    def bottom(self):
+        """有効な敵の下端のY座標（いなければ負の無限大）"""
+        store = self.store
+        n = store.count
+        alive = store.active[:n]
+        if not alive.any():
+            return float("-inf")
+        return float(np.max(store.y[:n][alive] + store.height[:n][alive]))
+
+    def kill(self, index):
+        """敵を倒す"""
+        self.store.active[index] = False
+        self.alive -= 1
+
+
+class ArraySimulation(Simulation):
+    """プレイヤーの弾・敵の弾・敵を配列で持つ Simulation
+
+    ルールは Simulation と同じ。必殺技の弾は数が少なく動きも複雑なので
+    オブジェクトのまま扱う。player_bullets と enemy_bullets は互換用のビューを返す。
+    """
+    def __init__(self, width=160, height=120, seed=None, enemy_settings=None,
+                 max_enemy_bullets=None, collision="discrete", rules=None):
+        if np is None:
+            raise ImportError("ArraySimulation を使うには NumPy が必要です")
+        super().__init__(width, height, seed, enemy_settings, max_enemy_bullets, collision,
+                         rules)
+
+    @staticmethod
+    def bullet_store(cls, direction):
+        """弾のクラスと同じ見た目の弾のストアを作る"""
+        return EntityArrays(cls.color, cls.sprite_x, cls.sprite_y, direction,
+                            sprite_bank=cls.sprite_bank)
+
+    def reset_entities(self):
+        """弾と敵を初期状態にする"""
+        # 敵の発射判定はまとめて引くので、Simulation と同じ seed から別の乱数列になる
+        self.np_rng = np.random.default_rng(self.seed)
+        self.player_bullet_store = self.bullet_store(PlayerBullet, direction=-1)
+        self.enemy_bullet_store = self.bullet_store(EnemyBullet, direction=1)
+        self.special_bullets = []  # 必殺技の弾リスト
+        self.enemy_manager = ArrayEnemyManager(self.WIDTH, self.HEIGHT, self.np_rng,
+                                               **self.enemy_settings)
+        self.enemy_manager.create_enemies()
+
+    @property
+    def player_bullets(self):
+        return self.player_bullet_store.views()
+
+    @property
+    def enemy_bullets(self):
+        return self.enemy_bullet_store.views()
+
+    def save_positions(self):
+        """補間描画のために今の位置を直前の位置として記録（step の前に呼ぶ）"""
+        for obj in (self.player, *self.special_bullets):
+            obj.prev_x = obj.x
+            obj.prev_y = obj.y
+        self.player_bullet_store.save_positions()
+        self.enemy_bullet_store.save_positions()
+        self.enemy_manager.store.save_positions()
+
+    def kill_enemy(self, index, points):
+        """敵を倒して得点を加える（敵はストアの添字で渡す）"""
+        self.enemy_manager.kill(index)
+        self.score += points
+        if self.events is not None:
+            store = self.enemy_manager.store
+            self.events.emit(EnemyKilled, self.frame_count, store.x[index].item(),
+                             store.y[index].item(), store.enemy_type[index].item(), points)
+
+    def add_player_bullet(self, x, y):
+        """プレイヤーの弾を追加"""
+        self.player_bullet_store.spawn(x, y, PlayerBullet.width, PlayerBullet.height,
+                                       self.player_bullet_speed)
+        if self.events is not None:
+            self.events.emit(ShotFired, self.frame_count, x, y, "player")
+
+    def add_enemy_bullet(self, x, y):
+        """敵の弾を追加（上限に達していれば出さない）"""
+        limit = self.max_enemy_bullets
+        if limit is not None and self.enemy_bullet_store.count >= limit:
+            return
+        self.enemy_bullet_store.spawn(x, y, EnemyBullet.width, EnemyBullet.height,
+                                      self.enemy_bullet_speed)
+        if self.events is not None:
+            self.events.emit(ShotFired, self.frame_count, x, y, "enemy")
+
+    def add_enemy_bullets(self, xs, ys):
+        """敵の弾をまとめて追加（上限を超える分は出さない）"""
+        limit = self.max_enemy_bullets
+        if limit is not None:
+            room = max(limit - self.enemy_bullet_store.count, 0)
+            xs = xs[:room]
+            ys = ys[:room]
+        self.enemy_bullet_store.spawn_many(xs, ys, EnemyBullet.width, EnemyBullet.height,
+                                           self.enemy_bullet_speed)
+        events = self.events
+        if events is not None and events.wants(ShotFired):
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                events.emit(ShotFired, self.frame_count, x, y, "enemy")
+
+    def update_bullets(self):
+        """弾の更新"""
+        self.player_bullet_store.move()
+        self.enemy_bullet_store.move()
+        self.cull_bullets()
+
+        for bullet in self.special_bullets:
+            bullet.update(self)
+
+    def cull_bullets(self):
+        """画面の外に出たプレイヤーの弾と敵の弾を無効にする"""
+        self.player_bullet_store.cull(0, float("inf"))
+        self.enemy_bullet_store.cull(float("-inf"), self.HEIGHT)
+
+    def collide_player_bullets(self):
+        """衝突判定（プレイヤーの弾と敵）"""
+        bullets = self.player_bullet_store
+        enemies = self.enemy_manager.store
+        if not bullets.count or not enemies.count:
+            return
+
+        hits = bullets.overlap_matrix(enemies)
+        # 当たりのある弾だけを順番に処理（先の弾が倒した敵には当たらない）
+        enemy_active = enemies.active[:enemies.count]
+        for i in np.flatnonzero(hits.any(axis=1)):
+            targets = np.flatnonzero(hits[i] & enemy_active)
+            if targets.size:
+                bullets.active[i] = False
+                self.kill_enemy(targets[0], PlayerBullet.points)
+
+    def collide_special_bullets(self):
+        """衝突判定（必殺技の弾と敵）"""
+        enemies = self.enemy_manager.store
+        for bullet in self.special_bullets:
+            if not bullet.is_active:
+                continue
+
+            targets = np.flatnonzero(
+                enemies.overlaps(bullet.x, bullet.y, bullet.width, bullet.height))
+            if not targets.size:
+                continue
+            if not bullet.penetrate:  # 貫通弾でなければ最初の1体だけ倒して消滅
+                targets = targets[:1]
+                bullet.is_active = False
+            for j in targets:
+                self.kill_enemy(j, bullet.points)
+
+    def collide_enemy_bullets(self):
+        """衝突判定（敵の弾とプレイヤー）"""
+        player = self.player
+        hits = np.flatnonzero(self.enemy_bullet_store.overlaps(
+            player.x, player.y, player.width, player.height))
+        if hits.size:
+            self.enemy_bullet_store.active[hits[0]] = False
+            self.hit_player()
+
+    def collide_special_and_enemy_bullets(self):
+        """衝突判定（必殺技の弾と敵の弾）"""
+        bullets = self.enemy_bullet_store
+        for special in self.special_bullets:
+            if not special.is_active:
+                continue
+
+            hits = np.flatnonzero(
+                bullets.overlaps(special.x, special.y, special.width, special.height))
+            if not hits.size:
+                continue
+            if special.penetrate:
+                bullets.active[hits] = False
+            else:  # 貫通弾でなければ1発だけ消して消滅
+                bullets.active[hits[0]] = False
+                special.is_active = False
+
+    # collision="swept" の処理（Simulation と同じく必殺技の弾は prev_x, prev_y から動いた範囲で、
+    # 画面の外に出た弾は判定の後に無効にする）
+
+    def update_bullets_swept(self):
+        """弾の更新（必殺技の弾は動かす前の位置を残し、画面の外に出た弾も判定まで残す）"""
+        for bullet in self.special_bullets:
+            bullet.prev_x = bullet.x
+            bullet.prev_y = bullet.y
+        self.player_bullet_store.move()
+        self.enemy_bullet_store.move()
+        self.update_leaving(self.special_bullets)
+
+    def sweep_player_bullets(self):
+        """衝突判定（プレイヤーの弾と敵、弾が動いた範囲で判定）"""
+        bullets = self.player_bullet_store
+        enemies = self.enemy_manager.store
+        if not bullets.count or not enemies.count:
+            return
+
+        hits = bullets.swept_overlap_matrix(enemies)
+        # 当たりのある弾だけを順番に処理（先の弾が倒した敵には当たらない）
+        enemy_active = enemies.active[:enemies.count]
+        for i in np.flatnonzero(hits.any(axis=1)):
+            targets = np.flatnonzero(hits[i] & enemy_active)
+            if targets.size:
+                target = targets[0]
+                if targets.size > 1:  # 弾の進む先で最初に当たる敵
+                    times = bullets.sweep_times(i, enemies.x[targets], enemies.y[targets],
+                                                enemies.width[targets], enemies.height[targets])
+                    target = targets[times.argmin()]
+                bullets.active[i] = False
+                self.kill_enemy(target, PlayerBullet.points)
+
+    def swept_targets(self, special, store):
+        """必殺技の弾がこの tick に動いた範囲で重なる store の有効な要素の添字を当たった順に返す
+
+        貫通弾でなければ最初の1つだけを返す。
+        """
+        x0, y0 = special.prev_x, special.prev_y
+        dx, dy = special.x - x0, special.y - y0
+        # 動いた範囲を囲む矩形で候補を絞ってから、候補だけ時刻を求める
+        candidates = np.flatnonzero(store.overlaps(
+            min(x0, special.x), min(y0, special.y),
+            special.width + abs(dx), special.height + abs(dy)))
+        if not candidates.size:
+            return candidates
+        times = sweep_times(x0, y0, dx, dy, special.width, special.height,
+                            store.x[candidates], store.y[candidates],
+                            store.width[candidates], store.height[candidates])
+        hit = times != NO_HIT
+        targets = candidates[hit][np.argsort(times[hit], kind="stable")]
+        return targets if special.penetrate else targets[:1]
+
+    def sweep_special_bullets(self):
+        """衝突判定（必殺技の弾と敵、弾が動いた範囲で判定）"""
+        enemies = self.enemy_manager.store
+        for bullet in self.special_bullets:
+            if not bullet.is_active:
+                continue
+
+            targets = self.swept_targets(bullet, enemies)
+            if not targets.size:
+                continue
+            if not bullet.penetrate:  # 貫通弾でなければ最初の1体だけ倒して消滅
+                bullet.is_active = False
+            for j in targets:
+                self.kill_enemy(j, bullet.points)
+
+    def sweep_enemy_bullets(self):
+        """衝突判定（敵の弾とプレイヤー、弾が動いた範囲で判定）"""
+        player = self.player
+        bullets = self.enemy_bullet_store
+        hits = np.flatnonzero(bullets.swept_overlaps(
+            player.x, player.y, player.width, player.height))
+        if hits.size:
+            hit = hits[0]
+            if hits.size > 1:  # 最初に当たる弾
+                times = bullets.sweep_times(hits, player.x, player.y, player.width,
+                                            player.height)
+                hit = hits[times.argmin()]
+            bullets.active[hit] = False
+            self.hit_player()
+
+    def sweep_special_and_enemy_bullets(self):
+        """衝突判定（必殺技の弾と敵の弾、必殺技の弾が動いた範囲で判定）"""
+        bullets = self.enemy_bullet_store
+        for special in self.special_bullets:
+            if not special.is_active:
+                continue
+
+            targets = self.swept_targets(special, bullets)
+            if not targets.size:
+                continue
+            bullets.active[targets] = False
+            if not special.penetrate:  # 貫通弾でなければ1発だけ消して消滅
+                special.is_active = False
+
+    def remove_inactive_swept(self):
+        """不要なオブジェクトの削除（画面の外に出た弾をここで無効にする）"""
+        self.cull_bullets()
+        super().remove_inactive_swept()
+
+    def remove_inactive(self):
+        """不要なオブジェクトの削除"""
+        self.player_bullet_store.compact()
+        self.enemy_bullet_store.compact()
+        compact(self.special_bullets, self.release_bullet)
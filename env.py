@@ -0,0 +1,221 @@
+"""強化学習用の環境インターフェース
+
+ゲームのルール（Simulation）を Gymnasium と同じ形の API で包む。
+gymnasium 自体には依存しない。
+
+    env = InvadersEnv()
+    observation, info = env.reset(seed=0)
+    observation, reward, terminated, truncated, info = env.step(action)
+
+行動は Inputs のビットマスク（0〜15: 左・右・スペース・Z の組み合わせ）で、
+報酬はそのフレームで増えたスコア。観測は次のどちらか。
+
+- "entities": エンティティの位置などを 0〜1 に正規化して固定長に並べた float32 の配列
+- "frame": 画面をパレット番号で塗った uint8 の画像（scale 分の1に縮小）
+
+VectorInvadersEnv は N 個の独立したゲームを同時に進め、観測・報酬などを
+先頭の次元が N の配列でまとめて返す。終わったゲームはその場でリセットする。
+
+NumPyが必要（entity_store.py と同じくオプションの依存関係）。
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPyがない環境では使えない
+    np = None
+
+from simulation import Inputs, Simulation
+from stages import STAGES
+
+# 行動の数（Inputs のビットマスクのうちポーズを除いた4ビット）
+ACTION_COUNT = 16
+
+# エンティティの観測に入れる最大数（超えた分は入らない）
+MAX_ENEMIES = 18
+MAX_PLAYER_BULLETS = 8
+MAX_ENEMY_BULLETS = 32
+MAX_SPECIAL_BULLETS = 4
+
+GLOBAL_FEATURES = 8  # プレイヤーと敵の群れの状態
+SLOT_FEATURES = 3  # 1エンティティあたり (x, y, 有効なら1)
+ENTITY_OBSERVATION_SIZE = GLOBAL_FEATURES + SLOT_FEATURES * (
+    MAX_ENEMIES + MAX_PLAYER_BULLETS + MAX_ENEMY_BULLETS + MAX_SPECIAL_BULLETS)
+
+
+def _require_numpy(name):
+    if np is None:
+        raise ImportError(f"{name} を使うには NumPy が必要です")
+
+
+def encode_entities(sim, out):
+    """エンティティの観測を out（長さ ENTITY_OBSERVATION_SIZE の float32 配列）に書く"""
+    width = sim.WIDTH
+    height = sim.HEIGHT
+    player = sim.player
+    manager = sim.enemy_manager
+    values = [
+        player.x / width,
+        player.y / height,
+        player.lives / sim.rules["lives"],
+        player.special_charge / player.special_max_charge,
+        player.special_cooldown / player.special_max_cooldown,
+        player.special_type,
+        manager.move_dir,
+        manager.speed,
+    ]
+    for objects, limit in ((manager.enemies, MAX_ENEMIES),
+                           (sim.player_bullets, MAX_PLAYER_BULLETS),
+                           (sim.enemy_bullets, MAX_ENEMY_BULLETS),
+                           (sim.special_bullets, MAX_SPECIAL_BULLETS)):
+        count = 0
+        for obj in objects:
+            if count == limit:
+                break
+            if obj.is_active:
+                values.extend((obj.x / width, obj.y / height, 1.0))
+                count += 1
+        values.extend((0.0,) * (SLOT_FEATURES * (limit - count)))
+    out[:] = values
+
+
+def render_frame(sim, out, scale=2):
+    """画面をパレット番号で out（高さ HEIGHT//scale、幅 WIDTH//scale の uint8 配列）に塗る
+
+    スプライトの代わりに各オブジェクトの色の矩形で塗る。
+    """
+    out.fill(0)
+    rows, cols = out.shape
+    manager = sim.enemy_manager
+    for objects in ((sim.player,), manager.enemies, sim.player_bullets, sim.enemy_bullets,
+                    sim.special_bullets):
+        for obj in objects:
+            if not obj.is_active:
+                continue
+            x0 = max(int(obj.x) // scale, 0)
+            y0 = max(int(obj.y) // scale, 0)
+            x1 = min(-(-int(obj.x + obj.width) // scale), cols)  # 切り上げ
+            y1 = min(-(-int(obj.y + obj.height) // scale), rows)
+            if x0 < x1 and y0 < y1:
+                out[y0:y1, x0:x1] = obj.color
+
+
+class InvadersEnv:
+    """1ゲーム分の環境（stage で stages.Stage の画面や隊列を使う）"""
+    def __init__(self, observation="entities", scale=2, max_steps=30 * 60 * 10,
+                 simulation_class=Simulation, enemy_settings=None, stage=None):
+        _require_numpy("InvadersEnv")
+        if observation not in ("entities", "frame"):
+            raise ValueError(f"observation must be 'entities' or 'frame': {observation}")
+        self.observation = observation
+        self.scale = scale
+        self.max_steps = max_steps
+        self.simulation_class = simulation_class
+        self.enemy_settings = enemy_settings
+        self.stage = stage or STAGES["classic"]
+        self.sim = None
+
+    @property
+    def observation_shape(self):
+        """観測の配列の形"""
+        if self.observation == "entities":
+            return (ENTITY_OBSERVATION_SIZE,)
+        return (self.stage.height // self.scale, self.stage.width // self.scale)
+
+    @property
+    def observation_dtype(self):
+        return np.float32 if self.observation == "entities" else np.uint8
+
+    def observe(self, out=None):
+        """今の状態の観測を返す（out を渡すとそこに書く）"""
+        if out is None:
+            out = np.empty(self.observation_shape, self.observation_dtype)
+        if self.observation == "entities":
+            encode_entities(self.sim, out)
+        else:
+            render_frame(self.sim, out, self.scale)
+        return out
+
+    def info(self):
+        """観測以外のゲームの情報"""
+        sim = self.sim
+        return {
+            "score": sim.score,
+            "lives": sim.player.lives,
+            "waves_cleared": sim.enemy_manager.waves_cleared,
+            "frames": sim.frame_count,
+            "cause": sim.death_cause,
+        }
+
+    def reset(self, seed=None):
+        """ゲームを始め直して (観測, 情報) を返す"""
+        if self.sim is None:
+            self.sim = self.simulation_class.from_stage(self.stage, seed, self.enemy_settings)
+        else:
+            self.sim.reset(seed)
+        return self.observe(), self.info()
+
+    def apply(self, action):
+        """行動で1フレーム進めて (報酬, 終了, 打ち切り) を返す"""
+        sim = self.sim
+        score = sim.score
+        sim.step(Inputs.from_mask(int(action) & (ACTION_COUNT - 1)))
+        return sim.score - score, sim.game_over, sim.frame_count >= self.max_steps
+
+    def step(self, action):
+        """行動で1フレーム進めて (観測, 報酬, 終了, 打ち切り, 情報) を返す"""
+        reward, terminated, truncated = self.apply(action)
+        return self.observe(), reward, terminated, truncated, self.info()
+
+
+class VectorInvadersEnv:
+    """num_envs 個のゲームを同時に進める環境
+
+    reset(seed) では i 番目のゲームに seed + i を使い、途中でリセットしたゲームには
+    続きの seed を使う。観測などは毎回同じ配列に書いて返すので、残しておく場合はコピーすること。
+    """
+    def __init__(self, num_envs, observation="entities", scale=2, max_steps=30 * 60 * 10,
+                 simulation_class=Simulation, enemy_settings=None, stage=None):
+        _require_numpy("VectorInvadersEnv")
+        self.num_envs = num_envs
+        self.envs = [InvadersEnv(observation, scale, max_steps, simulation_class, enemy_settings,
+                                 stage)
+                     for _ in range(num_envs)]
+        env = self.envs[0]
+        self.observations = np.zeros((num_envs,) + env.observation_shape, env.observation_dtype)
+        self.rewards = np.zeros(num_envs, np.float32)
+        self.terminated = np.zeros(num_envs, bool)
+        self.truncated = np.zeros(num_envs, bool)
+        self.final_scores = np.zeros(num_envs, np.int64)  # 終わったゲームの最終スコア
+        self.next_seed = 0
+
+    def reset(self, seed=None):
+        """全部のゲームを始め直して観測の配列を返す"""
+        if seed is None:
+            seed = int.from_bytes(np.random.default_rng().bytes(4), "little")
+        for i, env in enumerate(self.envs):
+            env.reset(seed + i)
+            env.observe(self.observations[i])
+        self.next_seed = seed + self.num_envs
+        return self.observations
+
+    def step(self, actions):
+        """行動の配列で全部のゲームを1フレーム進めて (観測, 報酬, 終了, 打ち切り, 最終スコア) を返す
+
+        終了か打ち切りになったゲームはリセットし、観測は新しいゲームのものになる。
+        最終スコアは終わったゲームのところだけ意味がある。
+        """
+        observations = self.observations
+        rewards = self.rewards
+        terminated = self.terminated
+        truncated = self.truncated
+        final_scores = self.final_scores
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            reward, done, cut = env.apply(action)
+            rewards[i] = reward
+            terminated[i] = done
+            truncated[i] = cut
+            if done or cut:
+                final_scores[i] = env.sim.score
+                env.sim.reset(self.next_seed)
+                self.next_seed += 1
+            env.observe(observations[i])
+        return observations, rewards, terminated, truncated, final_scores
@@ -0,0 +1,65 @@
+"""1tick ごとのゲームのイベント
+
+Simulation は敵を倒したとき・プレイヤーが被弾したとき・弾を撃ったとき・群れを全滅させた
+ときにイベントを EventBus にためておき、tick の最後に種類ごとにまとめて購読者に渡す。
+効果音や演出、統計などはイベントの購読者として作れば、当たり判定のループの中に処理を
+増やさずに済む。
+
+購読者がいない種類のイベントは作らないので、購読しない描画なしの実行（リプレイ、
+バッチ、強化学習）ではイベントの負担はほとんどない。
+
+    sim.subscribe(EnemyKilled, lambda events: print(len(events), "kills"))
+"""
+from collections import namedtuple
+
+# frame はイベントが起きた tick（Simulation.frame_count）
+EnemyKilled = namedtuple("EnemyKilled", "frame x y enemy_type points")
+# lives は被弾した後の残りライフ（0ならゲームオーバー）
+PlayerHit = namedtuple("PlayerHit", "frame x y lives")
+# kind は "player"（通常弾）, "enemy"（敵の弾）, "special"（必殺技の弾）
+ShotFired = namedtuple("ShotFired", "frame x y kind")
+# waves_cleared は全滅させた群れの数、speed と shoot_chance は次の群れの値
+WaveCleared = namedtuple("WaveCleared", "frame waves_cleared speed shoot_chance")
+
+EVENT_TYPES = (EnemyKilled, PlayerHit, ShotFired, WaveCleared)
+
+
+class EventBus:
+    """イベントを種類ごとにためておき、dispatch() でまとめて購読者に渡す"""
+    def __init__(self):
+        self.subscribers = {}  # イベントの種類 -> 購読者（イベントのリストを受け取る関数）
+        self.queues = {}  # イベントの種類 -> この tick のイベント（購読者がいる種類だけ）
+
+    def subscribe(self, event_type, callback):
+        """event_type のイベントを tick ごとにリストで受け取る"""
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"unknown event type: {event_type!r}")
+        self.subscribers.setdefault(event_type, []).append(callback)
+        self.queues.setdefault(event_type, [])
+
+    def unsubscribe(self, event_type, callback):
+        """購読をやめる（購読者がいなくなった種類のイベントは作らない）"""
+        callbacks = self.subscribers[event_type]
+        callbacks.remove(callback)
+        if not callbacks:
+            del self.subscribers[event_type]
+            del self.queues[event_type]
+
+    def wants(self, event_type):
+        """event_type に購読者がいるか"""
+        return event_type in self.queues
+
+    def emit(self, event_type, *fields):
+        """イベントをためる（購読者がいなければ何もしない）"""
+        queue = self.queues.get(event_type)
+        if queue is not None:
+            queue.append(event_type(*fields))
+
+    def dispatch(self):
+        """ためたイベントを種類ごとに購読者に渡して空にする（tick の最後に呼ぶ）"""
+        queues = self.queues
+        for event_type, events in list(queues.items()):
+            if events:
+                queues[event_type] = []
+                for callback in self.subscribers[event_type]:
+                    callback(events)
@@ -0,0 +1,69 @@
+"""敵の弾の発射スケジューラ
+
+敵は毎フレーム shoot_chance の確率で弾を撃つ。これを毎フレーム全員分の乱数で判定する
+代わりに、次に撃つまでのフレーム数を同じ分布（成功確率 shoot_chance の幾何分布）から
+撃つたびに1回だけ引き、撃つフレームの順に min-heap に入れておく。1フレームの処理は
+実際に撃った敵の数に比例し、敵の数には比例しない。
+
+幾何分布には記憶がないので、発射確率が変わったときは変わったフレームから引き直せば
+毎フレーム判定するのと同じ分布になる（reschedule）。
+"""
+import heapq
+import math
+
+
+def fire_interval(rng, chance):
+    """確率 chance の判定を毎フレーム行ったとき、何フレーム目で初めて当たるか（1以上）
+
+    chance が0以下なら撃たないので None を返す。
+    """
+    if chance <= 0:
+        return None
+    if chance >= 1:
+        return 1
+    return int(math.log(1.0 - rng.random()) / math.log1p(-chance)) + 1
+
+
+class FireScheduler:
+    """次に撃つフレームの順に敵を並べておくキュー
+
+    キューの要素は (撃つフレーム, 並び順, 敵)。同じフレームに撃つ敵は並び順
+    （schedule に渡した順）に撃つ。倒された敵は撃つフレームが来たときに捨てる。
+    """
+    def __init__(self, rng):
+        self.rng = rng
+        self.frame = 0  # due() を呼んだ回数
+        self.queue = []
+        self.shooters = []
+
+    def schedule(self, shooters):
+        """敵の発射予定を作り直す（各敵の shoot_chance を使う）"""
+        self.shooters = list(shooters)
+        self.reschedule()
+
+    def reschedule(self):
+        """今のフレームから発射予定を引き直す（発射確率を変えたときに呼ぶ）"""
+        queue = []
+        for order, shooter in enumerate(self.shooters):
+            if shooter.is_active:
+                interval = fire_interval(self.rng, shooter.shoot_chance)
+                if interval is not None:
+                    queue.append((self.frame + interval, order, shooter))
+        heapq.heapify(queue)
+        self.queue = queue
+
+    def due(self):
+        """1フレーム進めて、このフレームに撃つ敵のリストを返す（次の予定も入れる）"""
+        self.frame += 1
+        frame = self.frame
+        queue = self.queue
+        shooters = []
+        while queue and queue[0][0] <= frame:
+            _, order, shooter = heapq.heappop(queue)
+            if not shooter.is_active:
+                continue
+            shooters.append(shooter)
+            interval = fire_interval(self.rng, shooter.shoot_chance)
+            if interval is not None:
+                heapq.heappush(queue, (frame + interval, order, shooter))
+        return shooters
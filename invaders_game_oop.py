@@ -1,526 +1,301 @@
-import pyxel
-import random
-from abc import ABC, abstractmethod
-
-class GameObject(ABC):
-    """ゲームオブジェクトの基底クラス"""
-    def __init__(self, x, y, width, height, color, sprite_x=None, sprite_y=None):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.color = color
-        self.is_active = True
-        self.sprite_x = sprite_x  # スプライトのX座標（画像内）
-        self.sprite_y = sprite_y  # スプライトのY座標（画像内）
-    
-    @abstractmethod
-    def update(self, game):
-        """オブジェクトの状態を更新"""
-        pass
-    
-    def draw(self):
-        """オブジェクトを描画"""
-        if self.is_active:
-            if self.sprite_x is not None and self.sprite_y is not None:
-                # スプライトを描画
-                pyxel.blt(self.x, self.y, 0, self.sprite_x, self.sprite_y, self.width, self.height, 0)
-            else:
-                # スプライトがない場合は四角形を描画
-                pyxel.rect(self.x, self.y, self.width, self.height, self.color)
-    
-    def collides_with(self, other):
-        """他のオブジェクトとの衝突判定"""
-        if not self.is_active or not other.is_active:
-            return False
-        
-        return (self.x < other.x + other.width and
-                self.x + self.width > other.x and
-                self.y < other.y + other.height and
-                self.y + self.height > other.y)
-
-
-class Player(GameObject):
-    """プレイヤークラス"""
-    def __init__(self, x, y, game_width):
-        super().__init__(x, y, 8, 8, 11, 0, 0)  # スプライト座標(0,0)を追加
-        self.speed = 3
-        self.game_width = game_width
-        self.bullet_cooldown = 0
-        self.lives = 5
-        self.invincible = False
-        self.invincible_timer = 0
-        self.blink_timer = 0
-        
-        # 必殺技関連
-        self.special_charge = 0  # 必殺技のチャージ量
-        self.special_max_charge = 100  # 必殺技の最大チャージ量
-        self.special_charging = False  # チャージ中かどうか
-        self.special_cooldown = 0  # 必殺技のクールダウン
-        self.special_type = 0  # 0: 貫通弾, 1: バウンス弾
-    
-    def update(self, game):
-        # 左右移動
-        if pyxel.btn(pyxel.KEY_LEFT) and self.x > 0:
-            self.x -= self.speed
-        if pyxel.btn(pyxel.KEY_RIGHT) and self.x < self.game_width - self.width:
-            self.x += self.speed
-        
-        # 弾の発射はゲームクラスで処理
-        if self.bullet_cooldown > 0:
-            self.bullet_cooldown -= 1
-            
-        # 必殺技のチャージと発射
-        if pyxel.btn(pyxel.KEY_Z):  # Zキーでチャージ
-            self.special_charging = True
-            if self.special_charge < self.special_max_charge:
-                self.special_charge += 1
-        elif self.special_charging:  # Zキーを離したとき
-            self.special_charging = False
-            if self.special_charge >= self.special_max_charge and self.special_cooldown <= 0:
-                # 必殺技発射
-                game.fire_special_weapon(self.special_type)
-                self.special_charge = 0
-                self.special_cooldown = 180  # 3秒間のクールダウン
-                # 必殺技タイプの切り替え
-                self.special_type = (self.special_type + 1) % 2
-        
-        # 必殺技のクールダウン
-        if self.special_cooldown > 0:
-            self.special_cooldown -= 1
-            
-        # 無敵時間の処理
-        if self.invincible:
-            self.invincible_timer -= 1
-            self.blink_timer = (self.blink_timer + 1) % 6
-            if self.invincible_timer <= 0:
-                self.invincible = False
-    
-    def hit(self):
-        """敵の弾に当たった時の処理"""
-        if not self.invincible:
-            self.lives -= 1
-            if self.lives > 0:
-                self.invincible = True
-                self.invincible_timer = 60
-                return False
-            return True
-        return False
-    
-    def draw(self):
-        """プレイヤーを描画（無敵時は点滅）"""
-        if not self.invincible or self.blink_timer < 3:
-            super().draw()
-        
-        # チャージゲージの描画（サイズを小さくして位置を調整）
-        # プレイヤーの上部に表示して、下部の情報と重ならないようにする
-        charge_width = int((self.special_charge / self.special_max_charge) * 16)
-        pyxel.rect(self.x - 4, self.y - 4, 16, 2, 1)
-        if charge_width > 0:
-            pyxel.rect(self.x - 4, self.y - 4, charge_width, 2, 
-                      10 if self.special_charge < self.special_max_charge else 11)
-
-
-class Bullet(GameObject):
-    """弾の基底クラス"""
-    def __init__(self, x, y, width, height, color, sprite_x=None, sprite_y=None, speed=4):
-        super().__init__(x, y, width, height, color, sprite_x, sprite_y)
-        self.speed = speed
-
+import sys
+import threading
 
-class PlayerBullet(Bullet):
-    """プレイヤーの弾クラス"""
-    def __init__(self, x, y):
-        super().__init__(x, y, 2, 4, 10, 0, 8)  # スプライト座標(0,8)を追加
-        self.speed = 5
-    
-    def update(self, game):
-        self.y -= self.speed
-        if self.y < 0:
-            self.is_active = False
+import pyxel
 
+# ゲームのルールはpyxelに依存しない simulation.py に実装されている
+# （既存のクラスはこのモジュールからも参照できるようにしておく）
+from simulation import (
+    BouncingBullet,
+    Bullet,
+    Enemy,
+    EnemyBullet,
+    EnemyManager,
+    GameObject,
+    Inputs,
+    PenetratingBullet,
+    Player,
+    PlayerBullet,
+    Simulation,
+    SpecialBullet,
+)
+from events import EnemyKilled
+from profiler import FrameProfiler
+from render import Renderer
+from replay import Replay
+from scores import DEFAULT_PATH as DEFAULT_SCORES_PATH, ScoreWriter, game_result
+from stages import STAGES, load_stage
+from timestep import TICK_RATE, FixedTimestep
 
-class EnemyBullet(Bullet):
-    """敵の弾クラス"""
-    def __init__(self, x, y):
-        super().__init__(x, y, 2, 4, 8, 2, 8)  # スプライト座標(2,8)を追加
-        self.speed = 1
-    
-    def update(self, game):
-        self.y += self.speed
-        if self.y > game.HEIGHT:
-            self.is_active = False
 
+def read_inputs():
+    """pyxelのキー入力をシミュレーションの入力に変換"""
+    return Inputs(
+        left=pyxel.btn(pyxel.KEY_LEFT),
+        right=pyxel.btn(pyxel.KEY_RIGHT),
+        space=pyxel.btn(pyxel.KEY_SPACE),
+        z=pyxel.btn(pyxel.KEY_Z),
+        pause=pyxel.btnp(pyxel.KEY_P),
+    )
 
-class SpecialBullet(Bullet):
-    """必殺技の弾の基底クラス"""
-    def __init__(self, x, y, width, height, color, sprite_x=None, sprite_y=None, speed=4):
-        super().__init__(x, y, width, height, color, sprite_x, sprite_y, speed)
-        self.penetrate = False  # 貫通するかどうか
-        self.bounce = False  # 跳ね返るかどうか
-        self.bounce_count = 0  # 跳ね返った回数
-        self.max_bounce = 5  # 最大跳ね返り回数
-        self.dx = 0  # X方向の移動量
-        self.dy = 0  # Y方向の移動量
 
+def draw_profiler(profiler, draw_calls):
+    """処理ごとのフレーム時間（p50/p99、ミリ秒）と描画命令の数を画面左上に表示"""
+    summary = profiler.summary()
+    pyxel.rect(0, 12, 84, 14 + len(summary) * 6, 1)
+    pyxel.text(2, 14, "PHASE      P50   P99", 7)
+    for i, (name, stats) in enumerate(summary.items()):
+        pyxel.text(2, 20 + i * 6, f"{name:<9}{stats['p50']:6.2f}{stats['p99']:6.2f}", 7)
+    pyxel.text(2, 20 + len(summary) * 6, f"CALLS {draw_calls}", 7)
 
-class PenetratingBullet(SpecialBullet):
-    """貫通弾クラス"""
-    def __init__(self, x, y):
-        super().__init__(x, y, 4, 8, 9, 4, 8)  # スプライト座標(4,8)を追加
-        self.penetrate = True
-    
-    def update(self, game):
-        self.y -= self.speed
-        if self.y < 0:
-            self.is_active = False
 
+class InvadersGame:
+    """ゲームのメインクラス（入力と描画を担当するフロントエンド）
 
-class BouncingBullet(SpecialBullet):
-    """バウンス弾クラス"""
-    def __init__(self, x, y, direction):
-        super().__init__(x, y, 4, 4, 12, 8, 8)  # スプライト座標(8,8)を追加
-        self.bounce = True
-        self.dx = direction  # 方向係数（絶対値が大きいほど水平方向の動きが大きい）
-        self.dy = -1 if direction > 0 else -1  # 上向き
-    
-    def update(self, game):
-        # 移動
-        self.x += self.dx
-        self.y += self.dy * self.speed
-        
-        # 左右の壁での跳ね返り
-        if self.x <= 0 or self.x >= game.WIDTH - self.width:
-            self.dx *= -1
-            self.bounce_count += 1
-        
-        # 上下の壁での跳ね返り（上端も跳ね返るように変更）
-        if self.y <= 0:
-            self.dy *= -1  # 上端でも跳ね返る
-            self.bounce_count += 1
-        elif self.y >= game.HEIGHT - self.height:
-            self.is_active = False  # 下端に到達したら消滅
-        
-        # 最大跳ね返り回数を超えたら消滅
-        if self.bounce_count >= self.max_bounce:
-            self.is_active = False
-
-
-class Enemy(GameObject):
-    """敵クラス"""
-    def __init__(self, x, y, enemy_type=0):
-        # 敵タイプに応じてスプライト座標を設定
-        sprite_x = 8 + (enemy_type * 8)  # 敵タイプに応じて異なるスプライト
-        sprite_y = 0
-        super().__init__(x, y, 8, 8, 8, sprite_x, sprite_y)
-        self.shoot_chance = 0.005  # 発射確率を0.01から0.005に減少
-        self.enemy_type = enemy_type
-    
-    def update(self, game):
-        # 移動は EnemyManager で一括管理
-        pass
-    
-    def try_shoot(self, game):
-        """一定確率で弾を発射"""
-        if self.is_active and random.random() < self.shoot_chance:
-            bullet_x = self.x + self.width // 2 - 1
-            game.add_enemy_bullet(bullet_x, self.y + self.height)
+    record_path を指定すると、プレイした入力をリプレイとして保存する
+    （ゲームオーバー時と終了時に書き出す）。
+    Fキーでフレーム時間の計測と表示を切り替える（profile=True で最初から表示）。
+    run=False のときはゲームループを始めない（描画のベンチマーク用）。
 
+    ゲームは描画のフレームとは別に tick_rate 回/秒の固定 tick で進める。描画が遅れても
+    ゲームの速さは変わらず、fps を tick_rate より上げた場合は interpolate=True で
+    tick の間の位置を補間して描く。
 
-class EnemyManager:
-    """敵の集団を管理するクラス"""
-    def __init__(self, game_width, game_height):
-        self.game_width = game_width
-        self.game_height = game_height
-        self.enemies = []
-        self.move_dir = 1  # 1: 右, -1: 左
-        self.speed = 0.5  # 移動速度を1から0.5に減速
-        self.shoot_chance = 0.005  # 発射確率を0.01から0.005に減少
-    
-    def create_enemies(self):
-        """敵を配置"""
-        self.enemies = []
-        # 敵の初期位置をより上に配置（y座標を変更）
-        for y in range(3):  # 行数を5から3に減らす
-            for x in range(6):
-                # 行ごとに異なる敵タイプを使用
-                enemy_type = y % 3  # 0, 1, 2 の3種類
-                enemy = Enemy(20 + x * 20, 5 + y * 10, enemy_type)  # y座標を10から5に変更
-                enemy.shoot_chance = self.shoot_chance
-                self.enemies.append(enemy)
-    
-    def update(self, game):
-        """敵の移動と弾の発射"""
-        # 移動方向の判定
-        move_down = False
-        for enemy in self.enemies:
-            if not enemy.is_active:
-                continue
-            
-            if ((enemy.x >= self.game_width - enemy.width and self.move_dir > 0) or 
-                (enemy.x <= 0 and self.move_dir < 0)):
-                move_down = True
-                break
-        
-        # 移動処理
-        if move_down:
-            self.move_dir *= -1
-            for enemy in self.enemies:
-                if enemy.is_active:
-                    enemy.y += 3  # 下降幅を5から3に減少
-        else:
-            for enemy in self.enemies:
-                if enemy.is_active:
-                    enemy.x += self.move_dir * self.speed
-        
-        # 弾の発射
-        for enemy in self.enemies:
-            enemy.try_shoot(game)
-        
-        # 全滅判定
-        if all(not enemy.is_active for enemy in self.enemies):
-            self.speed += 0.2  # 難易度上昇を緩やかに（0.5から0.2に）
-            self.shoot_chance += 0.002  # 難易度上昇を緩やかに（0.005から0.002に）
-            self.create_enemies()
-        
-        # プレイヤーに到達判定
-        for enemy in self.enemies:
-            if enemy.is_active and enemy.y + enemy.height >= game.player.y:
-                game.game_over = True
-                break
-    
-    def draw(self):
-        """敵の描画"""
-        for enemy in self.enemies:
-            enemy.draw()
-
-
-class InvadersGame:
-    """ゲームのメインクラス"""
-    def __init__(self):
+    stage（stages.Stage）で画面の大きさや敵の隊列を変えられる。
+    collision は弾の当たり判定の方式（Simulation を参照）。
+    scores_path を指定すると、ゲームの結果をそのファイル（web版では localStorage）に
+    保存し、ステージのハイスコアを表示する（scores.py）。
+    effects=True なら敵を倒したときに爆発と破片のパーティクルを出す（effects.py、要NumPy）。
+    NumPy の読み込みは時間がかかるので、最初のフレームを描いた後に別スレッドで用意する。
+    """
+    def __init__(self, seed=None, record_path=None, profile=False, run=True,
+                 tick_rate=TICK_RATE, fps=30, interpolate=False, stage=None,
+                 collision="discrete", scores_path=None, effects=True):
         # ゲームの初期設定
-        self.WIDTH = 160
-        self.HEIGHT = 120
+        self.stage = stage or STAGES["classic"]
+        self.collision = collision
+        self.WIDTH = self.stage.width
+        self.HEIGHT = self.stage.height
+        self.seed = seed  # 最初のゲームの seed（リスタート後は毎回新しい seed）
+        self.record_path = record_path
+        self.profiler = FrameProfiler(window=90)  # 直近3秒分
+        self.show_profiler = profile
+        self.timestep = FixedTimestep(tick_rate)
+        self.interpolate = interpolate
+        self.paused = False  # ポーズ状態
+        # ゲームの結果の保存（書き込みは別スレッドで行う）
+        self.scores = ScoreWriter(self.stage.name, scores_path) if scores_path else None
+        self.effects = effects
+        self.effects_started = False  # パーティクルの用意を始めたか
         
         # Pyxelの初期化（最初の1回だけ）
-        pyxel.init(self.WIDTH, self.HEIGHT, title="AWS Invaders Game")
+        pyxel.init(self.WIDTH, self.HEIGHT, title="AWS Invaders Game", fps=fps)
         
-        # リソースファイルの読み込み
-        pyxel.load("invaders_assets.pyxres")
+        # 描画（スプライトのイメージバンクは最初に描くときに読み込む）
+        self.renderer = Renderer(self.WIDTH, self.HEIGHT)
         
         # ゲームの初期状態をセット
         self.reset_game()
         
-        # ポーズ状態
-        self.paused = False
-        
         # ゲームループの開始
-        pyxel.run(self.update, self.draw)
+        if run:
+            pyxel.run(self.update, self.draw)
     
     def reset_game(self):
         """ゲームの状態をリセット"""
-        self.score = 0
-        self.game_over = False
-        self.start_time = pyxel.frame_count  # ゲーム開始時間を記録
-        self.pause_start_time = 0  # ポーズ開始時間
-        self.total_pause_time = 0  # 合計ポーズ時間
-        
-        # ゲームオブジェクト
-        self.player = Player(self.WIDTH // 2, self.HEIGHT - 20, self.WIDTH)
-        self.player_bullets = []
-        self.enemy_bullets = []
-        self.special_bullets = []  # 必殺技の弾リスト
-        self.enemy_manager = EnemyManager(self.WIDTH, self.HEIGHT)
-        self.enemy_manager.create_enemies()
-    
-    def add_player_bullet(self, x, y):
-        """プレイヤーの弾を追加"""
-        self.player_bullets.append(PlayerBullet(x, y))
-    
-    def add_enemy_bullet(self, x, y):
-        """敵の弾を追加"""
-        self.enemy_bullets.append(EnemyBullet(x, y))
-    
-    def fire_special_weapon(self, special_type):
-        """必殺技を発射"""
-        if special_type == 0:  # 貫通弾
-            self.special_bullets.append(PenetratingBullet(
-                self.player.x + self.player.width // 2 - 2,
-                self.player.y
-            ))
-        else:  # バウンス弾（角度を調整して発射）
-            # 左右に2発発射、より水平方向に近い角度で
-            self.special_bullets.append(BouncingBullet(
-                self.player.x + self.player.width // 2 - 2,
-                self.player.y,
-                -1.5  # より水平に近い角度（左方向）
-            ))
-            self.special_bullets.append(BouncingBullet(
-                self.player.x + self.player.width // 2 - 2,
-                self.player.y,
-                1.5   # より水平に近い角度（右方向）
-            ))
+        self.timestep.reset()
+        
+        # ゲームのルールはシミュレーションが管理する
+        self.sim = Simulation.from_stage(self.stage, self.seed, collision=self.collision)
+        self.seed = None
+        self.replay = Replay(self.sim.seed, self.WIDTH, self.HEIGHT)
+        self.sim.profiler = self.profiler if self.show_profiler else None
+        self.sim.subscribe(EnemyKilled, self.spawn_particles)
+        if self.renderer.particles is not None:
+            self.renderer.particles.clear()
+
+    def start_particles(self):
+        """パーティクルの用意を別スレッドで始める（スレッドを使えない web版ではその場で行う）"""
+        self.effects_started = True
+        try:
+            threading.Thread(target=self.load_particles, name="load-particles",
+                             daemon=True).start()
+        except RuntimeError:
+            self.load_particles()
+
+    def load_particles(self):
+        """パーティクルを用意する（用意できるまでに倒した敵には出さない）"""
+        try:
+            from effects import Particles
+            self.renderer.particles = Particles()
+        except ImportError:  # NumPyがない環境ではパーティクルを出さない
+            pass
+
+    def spawn_particles(self, events):
+        """敵を倒したイベントから爆発と破片を出す"""
+        particles = self.renderer.particles
+        if particles is not None:
+            particles.spawn_kills(events)
+
+    def update_particles(self, behind=False):
+        """パーティクルを1tick 進める"""
+        particles = self.renderer.particles
+        if particles is not None:
+            particles.update(behind)
+
+    def save_replay(self):
+        """記録中のリプレイを保存"""
+        if self.record_path:
+            self.replay.save(self.record_path)
+
+    def save_result(self):
+        """ゲームの結果を書き込み待ちにする（ゲームオーバー時と、途中で終了したとき）"""
+        if self.scores is not None and self.sim.frame_count:
+            self.scores.write(game_result(self.sim, self.stage.name, self.play_time(),
+                                          self.collision))
+
+    def high_score(self):
+        """表示するハイスコア（保存していないときは None）"""
+        if self.scores is None:
+            return None
+        return max(self.scores.high_score, self.sim.score)
     
     def update(self):
+        """ゲームの状態更新（計測中は時間を記録する）"""
+        if self.show_profiler:
+            self.profiler.measure("update", self.update_game)
+        else:
+            self.update_game()
+
+    def draw(self):
+        """ゲームの描画（計測中は時間を記録する）"""
+        if self.show_profiler:
+            self.profiler.measure("draw", self.draw_game)
+            draw_profiler(self.profiler, self.renderer.draw_calls)
+        else:
+            self.draw_game()
+        if self.effects and not self.effects_started:
+            self.start_particles()
+
+    def toggle_profiler(self):
+        """フレーム時間の計測と表示を切り替える"""
+        self.show_profiler = not self.show_profiler
+        self.profiler.clear()
+        self.sim.profiler = self.profiler if self.show_profiler else None
+
+    def update_game(self):
         """ゲームの状態更新"""
         # ゲーム終了
         if pyxel.btnp(pyxel.KEY_Q):
+            self.save_replay()
+            if self.scores is not None:
+                if not self.sim.game_over:
+                    self.save_result()
+                self.scores.close()
             pyxel.quit()
         
+        # フレーム時間の表示切り替え（Fキー）
+        if pyxel.btnp(pyxel.KEY_F):
+            self.toggle_profiler()
+        
+        if self.sim.game_over:
+            if self.scores is not None:
+                self.scores.flush()  # スレッドを使えないときはゲームオーバーの画面で書き込む
+            self.update_particles()  # 最後の爆発は消えるまで動かす
+            if pyxel.btnp(pyxel.KEY_R):
+                self.reset_game()
+            return
+        
+        inputs = read_inputs()
+        
         # ポーズ切り替え（Pキー）
-        if pyxel.btnp(pyxel.KEY_P):
+        if inputs.pause:
             self.paused = not self.paused
+            # ポーズ中の時間を取り戻そうとしないように測り直す
+            self.timestep.reset()
             if self.paused:
-                # ポーズ開始時間を記録
-                self.pause_start_time = pyxel.frame_count
+                self.replay.record(inputs)  # リプレイでもこのフレームは進めない
             else:
-                # ポーズ解除時に合計ポーズ時間を更新
-                self.total_pause_time += pyxel.frame_count - self.pause_start_time
+                self.step(inputs)  # 解除したフレームは1tick 進める（リプレイと同じ）
+            return
         
         # ポーズ中は更新しない
         if self.paused:
             return
         
-        if self.game_over:
-            if pyxel.btnp(pyxel.KEY_R):
-                self.reset_game()
-            return
-        
-        # プレイヤーの更新
-        self.player.update(self)
-        
-        # 敵の更新
-        self.enemy_manager.update(self)
-        
-        # 弾の更新
-        for bullet in self.player_bullets:
-            bullet.update(self)
-        
-        for bullet in self.enemy_bullets:
-            bullet.update(self)
-        
-        for bullet in self.special_bullets:
-            bullet.update(self)
-        
-        # 衝突判定（プレイヤーの弾と敵）
-        for bullet in self.player_bullets[:]:
-            if not bullet.is_active:
-                continue
-                
-            for enemy in self.enemy_manager.enemies:
-                if enemy.is_active and bullet.collides_with(enemy):
-                    enemy.is_active = False
-                    bullet.is_active = False
-                    self.score += 10
-                    break
-        
-        # 衝突判定（必殺技の弾と敵）
-        for bullet in self.special_bullets[:]:
-            if not bullet.is_active:
-                continue
-                
-            for enemy in self.enemy_manager.enemies:
-                if enemy.is_active and bullet.collides_with(enemy):
-                    enemy.is_active = False
-                    self.score += 20  # 必殺技は高得点
-                    if not bullet.penetrate:  # 貫通弾でなければ消滅
-                        bullet.is_active = False
-                        break
-        
-        # 衝突判定（敵の弾とプレイヤー）
-        for bullet in self.enemy_bullets[:]:
-            if bullet.is_active and bullet.collides_with(self.player):
-                bullet.is_active = False
-                if self.player.hit():
-                    self.game_over = True
+        # 経過時間に応じた tick 数だけ進める
+        # 1フレームで複数 tick 進めるのは描画が追いついていないとき（パーティクルを減らす）
+        ticks = self.timestep.advance()
+        for tick in range(ticks):
+            if self.interpolate and tick == ticks - 1:
+                self.sim.save_positions()  # 補間描画は最後の tick の前後の位置を使う
+            self.step(inputs)
+            self.update_particles(ticks > 1)
+            if self.sim.game_over:
                 break
-        
-        # 衝突判定（必殺技の弾と敵の弾）
-        for special in self.special_bullets[:]:
-            if not special.is_active:
-                continue
-                
-            for bullet in self.enemy_bullets[:]:
-                if bullet.is_active and special.collides_with(bullet):
-                    bullet.is_active = False
-                    if not special.penetrate:  # 貫通弾でなければ消滅
-                        special.is_active = False
-                        break
-        
-        # 敵がプレイヤーに到達したらゲームオーバー
-        for enemy in self.enemy_manager.enemies:
-            if enemy.is_active and enemy.y + enemy.height >= self.player.y:
-                self.game_over = True
-                break
-        
-        # 不要なオブジェクトの削除
-        self.player_bullets = [b for b in self.player_bullets if b.is_active]
-        self.enemy_bullets = [b for b in self.enemy_bullets if b.is_active]
-        self.special_bullets = [b for b in self.special_bullets if b.is_active]
-        
-        # 連射機能（SPACEキーを押し続けると一定間隔で発射）
-        if pyxel.btn(pyxel.KEY_SPACE) and self.player.bullet_cooldown <= 0:
-            bullet_x = self.player.x + self.player.width // 2 - 1
-            self.add_player_bullet(bullet_x, self.player.y)
-            self.player.bullet_cooldown = 8
     
-    def draw(self):
+    def step(self, inputs):
+        """ゲームを1tick 進めてリプレイに記録"""
+        self.replay.record(inputs)
+        self.sim.step(inputs)
+        if self.sim.game_over:
+            self.save_replay()
+            self.save_result()
+    
+    def play_time(self):
+        """プレイ時間（秒単位）- ポーズ中は tick が進まないので含まれない"""
+        return self.sim.frame_count // self.timestep.tick_rate
+    
+    def draw_game(self):
         """ゲームの描画"""
-        pyxel.cls(0)
-        
-        # プレイヤーの描画
-        self.player.draw()
-        
-        # 敵の描画
-        self.enemy_manager.draw()
-        
-        # 弾の描画
-        for bullet in self.player_bullets:
-            bullet.draw()
-        
-        for bullet in self.enemy_bullets:
-            bullet.draw()
-        
-        for bullet in self.special_bullets:
-            bullet.draw()
-        
-        # プレイ時間の計算（秒単位）- ポーズ時間を考慮
-        play_time = (pyxel.frame_count - self.start_time - self.total_pause_time) // 30  # 30FPSとして計算
-        minutes = play_time // 60
-        seconds = play_time % 60
-        
-        # スコア、ライフ、プレイ時間の表示（位置を調整）
-        pyxel.text(5, 5, f"SCORE: {self.score}", 7)
-        pyxel.text(self.WIDTH - 40, 5, f"LIVES: {self.player.lives}", 7)
-        pyxel.text(self.WIDTH // 2 - 30, 5, f"TIME: {minutes:02d}:{seconds:02d}", 7)
-        
-        # 必殺技の情報表示（位置を調整、文字を小さく）
-        special_type_name = "PENETRATE" if self.player.special_type == 0 else "BOUNCE"
-        pyxel.text(5, self.HEIGHT - 6, f"SP:{special_type_name}", 7)
-        
-        # 必殺技のクールダウン表示（位置を調整）
-        if self.player.special_cooldown > 0:
-            cooldown_percent = self.player.special_cooldown / 180
-            pyxel.rect(70, self.HEIGHT - 6, 40, 2, 1)
-            pyxel.rect(70, self.HEIGHT - 6, int(40 * (1 - cooldown_percent)), 2, 11)
-        
-        # ゲームオーバー表示
-        if self.game_over:
-            pyxel.text(self.WIDTH // 2 - 30, self.HEIGHT // 2, "GAME OVER", 8)
-            pyxel.text(self.WIDTH // 2 - 40, self.HEIGHT // 2 + 10, "PRESS R TO RESTART", 8)
-        
-        # ポーズ中の表示
-        if self.paused:
-            # 半透明の黒い背景
-            for y in range(self.HEIGHT):
-                for x in range(0, self.WIDTH, 2):
-                    offset = y % 2
-                    pyxel.pset(x + offset, y, 0)
-            
-            # ポーズメッセージ
-            pyxel.text(self.WIDTH // 2 - 18, self.HEIGHT // 2, "GAME PAUSED", 7)
-            pyxel.text(self.WIDTH // 2 - 35, self.HEIGHT // 2 + 10, "PRESS P TO CONTINUE", 7)
+        alpha = self.timestep.alpha if self.interpolate and not self.paused else None
+        self.renderer.draw(self.sim, self.play_time(), self.paused, alpha, self.high_score())
+
+
+def main(argv=None):
+    """コマンドラインの引数を読んでゲームを始める
+
+    web版のランチャーのように引数がないときは、argparse を読み込まずに既定の設定で始める。
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        InvadersGame(scores_path=DEFAULT_SCORES_PATH)
+        return
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AWS Invaders Game")
+    parser.add_argument("--seed", type=int, help="最初のゲームの乱数の seed")
+    parser.add_argument("--record", metavar="PATH", help="プレイをリプレイとして保存するファイル")
+    parser.add_argument("--profile", action="store_true", help="フレーム時間を最初から表示")
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE,
+                        help="ゲームを進める1秒あたりの tick 数（ゲームの速さが変わる）")
+    parser.add_argument("--fps", type=int, default=30, help="描画の1秒あたりのフレーム数")
+    parser.add_argument("--interpolate", action="store_true", help="tick の間の位置を補間して描く")
+    parser.add_argument("--stage", default="classic",
+                        help=f"ステージ（{', '.join(STAGES)} か JSON ファイル）")
+    parser.add_argument("--scores", metavar="PATH", default=DEFAULT_SCORES_PATH,
+                        help="ハイスコアと結果を保存する SQLite ファイル")
+    parser.add_argument("--no-scores", action="store_true", help="結果を保存しない")
+    parser.add_argument("--no-effects", action="store_true", help="爆発と破片のパーティクルを出さない")
+    parser.add_argument("--collision", choices=Simulation.COLLISION_MODES, default="discrete",
+                        help="弾の当たり判定の方式（swept: 弾が動いた範囲で判定）")
+    args = parser.parse_args(argv)
+    try:
+        stage = load_stage(args.stage)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.record and stage.name != "classic":
+        # リプレイには画面の大きさと seed しか記録しないので、元のステージでしか再現できない
+        parser.error("--record can only be used with the classic stage")
+    if args.record and args.collision != "discrete":
+        # リプレイは当たり判定の方式も記録しないので、既定の方式でしか再現できない
+        parser.error("--record can only be used with the discrete collision mode")
+    InvadersGame(args.seed, args.record, args.profile, tick_rate=args.tick_rate, fps=args.fps,
+                 interpolate=args.interpolate, stage=stage, collision=args.collision,
+                 scores_path=None if args.no_scores else args.scores,
+                 effects=not args.no_effects)
 
 
 if __name__ == "__main__":
-    InvadersGame()
+    main()
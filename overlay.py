@@ -0,0 +1,77 @@
+"""静的なUIレイヤーのキャッシュ
+
+ポーズ画面の暗幕やゲームオーバーの表示など、毎フレーム変わらないUIを
+予備のイメージバンクに一度だけ描いておき、表示するときは blt 1回で済ませる。
+レイヤーは最初に表示するときに描くので、ポーズ画面のように起動直後には使わない
+レイヤーは起動時の処理を増やさない。
+レイヤーの外側や透過させたい部分は TRANSPARENT の色で塗っておき、
+blt のカラーキーとして抜く。
+"""
+import pyxel
+
+# 透過色（レイヤーの中では描画に使わない色）
+TRANSPARENT = 14
+
+# レイヤーを置くイメージバンク（0番はスプライトが使っている）
+OVERLAY_BANK = 2
+
+
+class OverlayCache:
+    """静的なUIレイヤーをイメージバンクに詰めて保持する
+
+    レイヤーは左上から横に並べ、入らなくなったら下の段に移る（シェルフ方式）。
+    """
+    def __init__(self, bank=OVERLAY_BANK, colkey=TRANSPARENT):
+        self.bank = bank
+        self.colkey = colkey
+        self.image = pyxel.images[bank]
+        self.layers = {}  # 名前 -> (u, v, 幅, 高さ, 描画関数)
+        self.stale = set()  # 次に表示するときに描き直すレイヤーの名前
+        self._shelf_x = 0  # 今の段で次のレイヤーを置くX座標
+        self._shelf_y = 0  # 今の段のY座標
+        self._shelf_height = 0  # 今の段で一番高いレイヤーの高さ
+
+    def _allocate(self, width, height):
+        """イメージバンク内の空き領域を確保して左上の座標を返す"""
+        image = self.image
+        if self._shelf_x + width > image.width:
+            # 次の段へ
+            self._shelf_x = 0
+            self._shelf_y += self._shelf_height
+            self._shelf_height = 0
+        if width > image.width or self._shelf_y + height > image.height:
+            raise ValueError(f"イメージバンク{self.bank}にレイヤーの空きがありません")
+
+        u, v = self._shelf_x, self._shelf_y
+        self._shelf_x += width
+        self._shelf_height = max(self._shelf_height, height)
+        return u, v
+
+    def add(self, name, width, height, render):
+        """レイヤーを追加する（描くのは最初に表示するとき）
+
+        render(image, u, v) はイメージバンクの (u, v) を左上としてレイヤーを描く。
+        """
+        if name in self.layers:
+            raise ValueError(f"レイヤー {name} はすでにあります")
+        u, v = self._allocate(width, height)
+        self.layers[name] = (u, v, width, height, render)
+        self.stale.add(name)
+
+    def _render(self, name):
+        """レイヤーを透過色で塗りつぶしてから描き直す"""
+        u, v, width, height, render = self.layers[name]
+        self.image.rect(u, v, width, height, self.colkey)
+        render(self.image, u, v)
+
+    def invalidate(self, name):
+        """レイヤーの内容が変わったときに呼ぶ（次に表示するときに描き直す）"""
+        self.stale.add(name)
+
+    def draw(self, name, x, y):
+        """レイヤーを画面の (x, y) に表示"""
+        if name in self.stale:
+            self.stale.discard(name)
+            self._render(name)
+        u, v, width, height, _ = self.layers[name]
+        pyxel.blt(x, y, self.bank, u, v, width, height, self.colkey)
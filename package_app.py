@@ -0,0 +1,85 @@
+"""web版や配布用のアプリ（.pyxapp）を作るスクリプト
+
+invaders_game_oop.py から読み込まれるこのリポジトリのモジュールだけを集め、
+スプライトの画像とアトラス（assets.py で作ったもの）と一緒に pyxel package でまとめる。
+ベンチマークや強化学習用のモジュール、リソースファイル（.pyxres）は入れないので、
+web版のランチャーが取得して読み込むファイルが少なくなる。
+
+    python package_app.py            # dist/invaders.pyxapp を作る
+    python package_app.py --html     # dist/invaders.html も作る
+    pyxel play dist/invaders.pyxapp
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+from modulefinder import ModuleFinder
+
+from atlas import ASSET_DIR, MANIFEST_FILE
+
+APP_NAME = "invaders"
+STARTUP_SCRIPT = "invaders_game_oop.py"
+
+
+def app_modules(script=STARTUP_SCRIPT):
+    """script から読み込まれる（関数の中で読み込むものも含む）このリポジトリのモジュール"""
+    finder = ModuleFinder(path=[ASSET_DIR])
+    finder.run_script(os.path.join(ASSET_DIR, script))
+    paths = set()
+    for module in finder.modules.values():
+        path = module.__file__
+        if path and os.path.dirname(os.path.abspath(path)) == ASSET_DIR:
+            paths.add(os.path.basename(path))
+    paths.discard(script)
+    return sorted(paths)
+
+
+def asset_files():
+    """アトラスの JSON とそこに書かれたイメージバンクの画像"""
+    path = os.path.join(ASSET_DIR, MANIFEST_FILE)
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"{path} がありません。python assets.py でスプライトを作ってください") from None
+    return [MANIFEST_FILE] + sorted(manifest["banks"].values())
+
+
+def stage_app(app_dir, script=STARTUP_SCRIPT):
+    """アプリに入れるファイルを app_dir にコピーし、コピーしたファイル名を返す"""
+    if os.path.exists(app_dir):
+        shutil.rmtree(app_dir)
+    os.makedirs(app_dir)
+    files = [script] + app_modules(script) + asset_files()
+    for name in files:
+        shutil.copy2(os.path.join(ASSET_DIR, name), os.path.join(app_dir, name))
+    return files
+
+
+def build(dist_dir, html=False):
+    """dist_dir に .pyxapp（html=True なら .html も）を作り、アプリのパスを返す"""
+    app_dir = os.path.join(dist_dir, APP_NAME)
+    files = stage_app(app_dir)
+    print(f"{len(files)} files: {' '.join(files)}")
+
+    pyxel = shutil.which("pyxel")
+    if pyxel is None:
+        sys.exit("pyxel コマンドが見つかりません（pip install pyxel）")
+    # pyxel package と app2html は今のディレクトリに書き出す
+    subprocess.run([pyxel, "package", APP_NAME, os.path.join(APP_NAME, STARTUP_SCRIPT)],
+                   cwd=dist_dir, check=True, stdout=subprocess.DEVNULL)
+    app_file = os.path.join(dist_dir, APP_NAME + ".pyxapp")
+    if html:
+        subprocess.run([pyxel, "app2html", APP_NAME + ".pyxapp"], cwd=dist_dir, check=True)
+    return app_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ゲームを .pyxapp にまとめる")
+    parser.add_argument("--dist", default=os.path.join(ASSET_DIR, "dist"), help="書き出すディレクトリ")
+    parser.add_argument("--html", action="store_true", help="web ブラウザで開ける .html も作る")
+    args = parser.parse_args()
+    app_file = build(args.dist, args.html)
+    print(f"{app_file}: {os.path.getsize(app_file)} bytes")
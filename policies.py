@@ -0,0 +1,104 @@
+"""自動でプレイする方策（ポリシー）
+
+バランス調整のための大量のシミュレーションやベンチマークで、人の代わりに入力を決める。
+方策は policy(sim) で今のフレームの Inputs を返す。乱数を使う方策は seed で再現できる。
+"""
+import random
+
+from simulation import Inputs
+
+LEFT = Inputs.LEFT
+RIGHT = Inputs.RIGHT
+SPACE = Inputs.SPACE
+Z = Inputs.Z
+
+
+class Policy:
+    """方策の基底クラス"""
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def __call__(self, sim):
+        """今のフレームの入力を返す"""
+        return Inputs.from_mask(self.act(sim))
+
+    def act(self, sim):
+        """今のフレームの入力をビットマスクで返す"""
+        raise NotImplementedError
+
+
+class IdlePolicy(Policy):
+    """何もしない"""
+    def act(self, sim):
+        return 0
+
+
+class RandomPolicy(Policy):
+    """ランダムなキーを数フレームずつ押し続ける"""
+    def __init__(self, seed=None, min_hold=4, max_hold=20):
+        super().__init__(seed)
+        self.min_hold = min_hold
+        self.max_hold = max_hold
+        self.mask = 0
+        self.hold = 0  # 今の入力をあと何フレーム続けるか
+
+    def act(self, sim):
+        if self.hold <= 0:
+            self.mask = self.rng.randrange(16)  # 左・右・スペース・Z の組み合わせ
+            self.hold = self.rng.randint(self.min_hold, self.max_hold)
+        self.hold -= 1
+        return self.mask
+
+
+class SweepPolicy(Policy):
+    """弾を撃ち続けながら左右の端まで往復する"""
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.direction = RIGHT
+
+    def act(self, sim):
+        player = sim.player
+        if player.x <= 0:
+            self.direction = RIGHT
+        elif player.x >= sim.WIDTH - player.width:
+            self.direction = LEFT
+        return self.direction | SPACE
+
+
+class TrackerPolicy(Policy):
+    """一番低い位置の敵の真下に移動して撃ち、必殺技は溜まったらすぐ撃つ"""
+    def act(self, sim):
+        player = sim.player
+        mask = SPACE
+
+        target = None
+        for enemy in sim.enemy_manager.enemies:
+            if enemy.is_active and (target is None or enemy.y > target.y):
+                target = enemy
+        if target is not None:
+            offset = (target.x + target.width / 2) - (player.x + player.width / 2)
+            if offset < -player.speed:
+                mask |= LEFT
+            elif offset > player.speed:
+                mask |= RIGHT
+
+        # チャージが満タンでクールダウンが終わっていればZを離して発射する
+        if player.special_charge < player.special_max_charge or player.special_cooldown > 0:
+            mask |= Z
+        return mask
+
+
+POLICIES = {
+    "idle": IdlePolicy,
+    "random": RandomPolicy,
+    "sweep": SweepPolicy,
+    "tracker": TrackerPolicy,
+}
+
+
+def create_policy(name, seed=None):
+    """名前から方策を作る"""
+    try:
+        return POLICIES[name](seed)
+    except KeyError:
+        raise ValueError(f"unknown policy: {name} (choose from {', '.join(POLICIES)})") from None
@@ -0,0 +1,63 @@
+"""弾などの使い回しのためのオブジェクトプール
+
+毎フレームの生成と破棄をなくしてGCの負担を減らす。
+プールから取り出したオブジェクトは reset() で初期化してから使う。
+"""
+
+
+class ObjectPool:
+    """固定容量のオブジェクトプール"""
+    def __init__(self, factory, capacity):
+        self.factory = factory  # プールが空のときに新しく作る関数
+        self.capacity = capacity  # 保持しておく空きオブジェクトの最大数
+        self.free = [factory() for _ in range(capacity)]  # 最初に全部作っておく
+
+        # 統計
+        self.hits = 0  # プールから取り出せた回数
+        self.misses = 0  # プールが空で新しく作った回数
+        self.in_use = 0  # 使用中の数
+        self.high_water = 0  # 使用中の数の最大値
+
+    def acquire(self, *args):
+        """オブジェクトを取り出して reset(*args) で初期化する"""
+        if self.free:
+            obj = self.free.pop()
+            self.hits += 1
+        else:
+            obj = self.factory()
+            self.misses += 1
+        obj.reset(*args)
+
+        self.in_use += 1
+        if self.in_use > self.high_water:
+            self.high_water = self.in_use
+        return obj
+
+    def release(self, obj):
+        """使い終わったオブジェクトを返す（容量を超える分は捨てる）"""
+        self.in_use -= 1
+        if len(self.free) < self.capacity:
+            self.free.append(obj)
+
+    def stats(self):
+        """統計を辞書で返す"""
+        return {
+            "capacity": self.capacity,
+            "free": len(self.free),
+            "in_use": self.in_use,
+            "hits": self.hits,
+            "misses": self.misses,
+            "high_water": self.high_water,
+        }
+
+
+def compact(objects, release):
+    """無効なオブジェクトを release に渡し、リストをその場で詰める"""
+    write = 0
+    for obj in objects:
+        if obj.is_active:
+            objects[write] = obj
+            write += 1
+        else:
+            release(obj)
+    del objects[write:]
@@ -0,0 +1,163 @@
+"""フレーム時間の計測
+
+Simulation.step の処理（Simulation.PHASES）ごと、およびフロントエンドの
+update と draw の時間を直近のフレーム分だけ記録し、p50/p99 を求める。
+Simulation.profiler が None のときは計測しないので、無効時の負担はほぼない。
+
+描画なしで計測して CSV や JSON に書き出す場合:
+
+    python profiler.py --frames 3000 --csv timings.csv --json timings.json
+    python profiler.py game.rep --json timings.json
+
+ゲームからも読み込まれるので、書き出しやコマンドラインにだけ使うモジュールは
+使うときに読み込む。
+"""
+import time
+from collections import deque
+
+from simulation import Inputs, Simulation
+
+
+class FrameProfiler:
+    """処理ごとの時間（ミリ秒）を直近 window フレーム分だけ保持する"""
+    def __init__(self, window=300, clock=time.perf_counter):
+        self.window = window
+        self.clock = clock
+        self.samples = {}  # 処理の名前 -> 直近の時間（ミリ秒）
+        self.counts = {}  # 処理の名前 -> 記録した回数の合計
+
+    def record(self, name, seconds):
+        """1回分の時間を記録"""
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+            self.counts[name] = 0
+        samples.append(seconds * 1000.0)
+        self.counts[name] += 1
+
+    def measure(self, name, func):
+        """func を呼び出して時間を記録"""
+        start = self.clock()
+        func()
+        self.record(name, self.clock() - start)
+
+    def run(self, phases):
+        """(名前, 関数) の列を順番に呼び出してそれぞれの時間と合計を記録"""
+        clock = self.clock
+        record = self.record
+        start = last = clock()
+        for name, phase in phases:
+            phase()
+            now = clock()
+            record(name, now - last)
+            last = now
+        record("step", last - start)
+
+    def clear(self):
+        """記録をすべて消す"""
+        self.samples.clear()
+        self.counts.clear()
+
+    def summary(self):
+        """処理ごとの統計（ミリ秒）を記録した順に返す"""
+        result = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[name] = {
+                "count": self.counts[name],
+                "mean": sum(ordered) / len(ordered),
+                "p50": percentile(ordered, 50),
+                "p99": percentile(ordered, 99),
+                "max": ordered[-1],
+            }
+        return result
+
+    def write_csv(self, path):
+        """統計を CSV で書き出す"""
+        import csv
+
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("phase", "count", "mean_ms", "p50_ms", "p99_ms", "max_ms"))
+            for name, stats in self.summary().items():
+                writer.writerow((name, stats["count"], stats["mean"], stats["p50"],
+                                 stats["p99"], stats["max"]))
+
+    def write_json(self, path):
+        """統計を JSON で書き出す"""
+        import json
+
+        with open(path, "w") as f:
+            json.dump({"window": self.window, "unit": "ms", "phases": self.summary()},
+                      f, indent=2)
+
+
+def percentile(ordered, p):
+    """昇順に並んだ値の p パーセンタイル（最近接順位法）"""
+    if not ordered:
+        return 0.0
+    rank = -(-len(ordered) * p // 100)  # 切り上げ
+    return ordered[max(0, int(rank) - 1)]
+
+
+def random_inputs(seed):
+    """計測用のランダムな入力を無限に返す（seed が同じなら同じ列）"""
+    import random
+
+    rng = random.Random(seed)
+    while True:
+        yield Inputs(rng.random() < 0.4, rng.random() < 0.4,
+                     rng.random() < 0.5, rng.random() < 0.7)
+
+
+def profile(inputs, frames, simulation_class=Simulation, seed=0, width=160, height=120,
+            window=None):
+    """描画なしで frames フレームを計測した FrameProfiler を返す
+
+    ゲームオーバーになったら次の seed でリセットして続ける。
+    """
+    profiler = FrameProfiler(window or frames)
+    sim = simulation_class(width, height, seed)
+    sim.profiler = profiler
+    for _, frame_inputs in zip(range(frames), inputs):
+        if sim.game_over:
+            seed += 1
+            sim.reset(seed)
+        sim.step(frame_inputs)
+    return profiler
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="描画なしでフレーム時間を計測")
+    parser.add_argument("replay", nargs="?", help="再生するリプレイ（省略時はランダムな入力）")
+    parser.add_argument("--frames", type=int, default=3000, help="ランダムな入力で進めるフレーム数")
+    parser.add_argument("--seed", type=int, default=0, help="ゲームと入力の seed")
+    parser.add_argument("--csv", metavar="PATH", help="統計を書き出す CSV ファイル")
+    parser.add_argument("--json", metavar="PATH", help="統計を書き出す JSON ファイル")
+    args = parser.parse_args()
+
+    if args.replay:
+        from replay import Replay  # リプレイを使うときだけ読み込む
+
+        replay = Replay.load(args.replay)
+        frames = list(replay.stepped_inputs())
+        profiler = profile(iter(frames), len(frames), seed=replay.seed,
+                           width=replay.width, height=replay.height)
+    else:
+        profiler = profile(random_inputs(args.seed), args.frames, seed=args.seed)
+
+    if args.csv:
+        profiler.write_csv(args.csv)
+    if args.json:
+        profiler.write_json(args.json)
+
+    print(f"{'phase':<10}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, stats in profiler.summary().items():
+        print(f"{name:<10}{stats['count']:>8}{stats['p50']:>10.4f}{stats['p99']:>10.4f}"
+              f"{stats['max']:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""レイヤーごとの描画
+
+背景・敵・弾・プレイヤー・パーティクル・HUD・オーバーレイの順に描く。同じスプライトの
+オブジェクトはまとめて描き、スプライトの座標や大きさは1グループに1回だけ読む。
+HUDは値が変わったときだけイメージバンクに描き直し、毎フレームは blt するだけにする。
+スプライトのイメージバンクは、そのバンクのスプライトを最初に描くときに読み込む（SpriteBanks）。
+Renderer.draw_calls は直前のフレームで画面に出した描画命令の数。
+
+alpha（0〜1）を渡すと、オブジェクトを直前の tick の位置（prev_x, prev_y）から
+今の位置までの間に補間して描く（timestep.FixedTimestep.alpha を参照）。
+"""
+import time
+from operator import attrgetter
+
+import pyxel
+
+from atlas import SPRITES, bank_path
+from overlay import OverlayCache
+
+_enemy_type = attrgetter("enemy_type")
+
+# 画面がイメージバンクに入らないときにポーズの暗幕を敷き詰めるタイルの大きさ（偶数）
+PAUSE_TILE = 64
+
+
+class SpriteBanks:
+    """スプライトのイメージバンクを使うときに読み込む
+
+    assets.py が書き出したバンクごとの画像を、そのバンクを初めて使うときに
+    pyxel.images に読み込む。使わないバンクは読み込まない。
+    """
+    def __init__(self):
+        self.loaded = set()
+        self.load_time = 0.0  # 読み込みにかかった秒数の合計（起動時間の計測用）
+
+    def require(self, bank):
+        """バンクを読み込んでおき、バンク番号を返す"""
+        if bank not in self.loaded:
+            path = bank_path(bank)
+            start = time.perf_counter()
+            try:
+                pyxel.images[bank].load(0, 0, path)
+            except FileNotFoundError:
+                raise FileNotFoundError(
+                    f"{path} がありません。python assets.py でスプライトを作ってください") from None
+            self.load_time += time.perf_counter() - start
+            self.loaded.add(bank)
+        return bank
+
+
+sprite_banks = SpriteBanks()
+
+
+def group_active(objects, key):
+    """有効なオブジェクトを key の値ごとにまとめる"""
+    groups = {}
+    for obj in objects:
+        if obj.is_active:
+            k = key(obj)
+            group = groups.get(k)
+            if group is None:
+                groups[k] = [obj]
+            else:
+                group.append(obj)
+    return groups
+
+
+def draw_batch(objects, template, alpha=None):
+    """template と同じ見た目の有効なオブジェクトをまとめて描画し、描画命令の数を返す"""
+    u = template.sprite_x
+    v = template.sprite_y
+    width = template.width
+    height = template.height
+    if u is None or v is None:
+        # スプライトがない場合は四角形を描画
+        return draw_rects(objects, width, height, template.color, alpha)
+
+    # スプライトを描画
+    bank = sprite_banks.require(template.sprite_bank)
+    blt = pyxel.blt
+    count = 0
+    if alpha is None:
+        for obj in objects:
+            if obj.is_active:
+                blt(obj.x, obj.y, bank, u, v, width, height, 0)
+                count += 1
+    else:
+        for obj in objects:
+            if obj.is_active:
+                x = obj.prev_x + (obj.x - obj.prev_x) * alpha
+                y = obj.prev_y + (obj.y - obj.prev_y) * alpha
+                blt(x, y, bank, u, v, width, height, 0)
+                count += 1
+    return count
+
+
+def draw_rects(objects, width, height, color, alpha=None):
+    """スプライトのないオブジェクトを四角形でまとめて描画し、描画命令の数を返す"""
+    rect = pyxel.rect
+    count = 0
+    for obj in objects:
+        if obj.is_active:
+            x, y = obj.x, obj.y
+            if alpha is not None:
+                x = obj.prev_x + (x - obj.prev_x) * alpha
+                y = obj.prev_y + (y - obj.prev_y) * alpha
+            rect(x, y, width, height, color)
+            count += 1
+    return count
+
+
+def draw_groups(groups, alpha=None):
+    """group_active でまとめたグループを描画し、描画命令の数を返す"""
+    count = 0
+    for group in groups.values():
+        count += draw_batch(group, group[0], alpha)
+    return count
+
+
+def draw_player(player, alpha=None):
+    """プレイヤーを描画（無敵時は点滅）し、描画命令の数を返す"""
+    count = 0
+    if not player.invincible or player.blink_timer < 3:
+        count += draw_batch((player,), player, alpha)
+
+    x, y = player.x, player.y
+    if alpha is not None:
+        x = player.prev_x + (x - player.prev_x) * alpha
+        y = player.prev_y + (y - player.prev_y) * alpha
+
+    # チャージゲージの描画（サイズを小さくして位置を調整）
+    # プレイヤーの上部に表示して、下部の情報と重ならないようにする
+    charge_width = int((player.special_charge / player.special_max_charge) * 16)
+    pyxel.rect(x - 4, y - 4, 16, 2, 1)
+    count += 1
+    if charge_width > 0:
+        pyxel.rect(x - 4, y - 4, charge_width, 2,
+                   10 if player.special_charge < player.special_max_charge else 11)
+        count += 1
+    return count
+
+
+def draw_particles(particles):
+    """爆発（スプライト）と破片（点）を描画し、描画命令の数を返す
+
+    描画にかかった時間は particles.draw_time に入れる（予算を超えたら間引くため）。
+    """
+    start = time.perf_counter()
+    explosions, debris = particles.visible()
+    if explosions:
+        bank, u, v, width, height = SPRITES["explosion"]
+        bank = sprite_banks.require(bank)
+        blt = pyxel.blt
+        for x, y in explosions:
+            blt(x, y, bank, u, v, width, height, 0)
+    pset = pyxel.pset
+    for x, y, color in debris:
+        pset(x, y, color)
+    particles.draw_time = time.perf_counter() - start
+    return len(explosions) + len(debris)
+
+
+class HudLayer:
+    """スコア・プレイ時間・ライフ・必殺技・ハイスコアの表示
+
+    値が前のフレームと同じなら文字列を作らず、イメージバンクの絵をそのまま使う。
+    画面がイメージバンクより広いときは、バンクの幅のHUDを画面の中央に表示する。
+    """
+    def __init__(self, overlays, width, height):
+        self.overlays = overlays
+        self.width = min(width, overlays.image.width)  # HUDの幅
+        self.height = height
+        self.x = (width - self.width) // 2  # HUDの左端の画面上のX座標
+        self.top = None  # 描いてある (スコア, ライフ, プレイ時間の秒数)
+        self.special_type = None  # 描いてある必殺技の種類
+        self.high_score = None  # 描いてあるハイスコア
+        self.redraws = 0  # イメージバンクに描き直した回数
+        overlays.add("hud_top", self.width, 6, self.render_top)
+        overlays.add("hud_bottom", self.width, 6, self.render_bottom)
+
+    def render_top(self, image, u, v):
+        """スコア、ライフ、プレイ時間（位置を調整）"""
+        if self.top is None:
+            return
+        score, lives, play_time = self.top
+        minutes = play_time // 60
+        seconds = play_time % 60
+        image.text(u + 5, v, f"SCORE: {score}", 7)
+        image.text(u + self.width - 40, v, f"LIVES: {lives}", 7)
+        image.text(u + self.width // 2 - 30, v, f"TIME: {minutes:02d}:{seconds:02d}", 7)
+
+    def render_bottom(self, image, u, v):
+        """必殺技の情報とハイスコア（位置を調整、文字を小さく）"""
+        if self.special_type is None:
+            return
+        special_type_name = "PENETRATE" if self.special_type == 0 else "BOUNCE"
+        image.text(u + 5, v, f"SP:{special_type_name}", 7)
+        if self.high_score is not None:
+            image.text(u + self.width - 40, v, f"HI:{self.high_score}", 7)
+
+    def draw(self, sim, play_time, high_score=None):
+        """HUDを描画し、描画命令の数を返す（high_score が None ならハイスコアは表示しない）"""
+        player = sim.player
+        top = (sim.score, player.lives, play_time)
+        if top != self.top:
+            self.top = top
+            self.overlays.invalidate("hud_top")
+            self.redraws += 1
+        if player.special_type != self.special_type or high_score != self.high_score:
+            self.special_type = player.special_type
+            self.high_score = high_score
+            self.overlays.invalidate("hud_bottom")
+            self.redraws += 1
+
+        self.overlays.draw("hud_top", self.x, 5)
+        self.overlays.draw("hud_bottom", self.x, self.height - 6)
+        count = 2
+
+        # 必殺技のクールダウン表示（毎フレーム変わるので直接描く）
+        if player.special_cooldown > 0:
+            cooldown_percent = player.special_cooldown / player.special_max_cooldown
+            pyxel.rect(self.x + 70, self.height - 6, 40, 2, 1)
+            pyxel.rect(self.x + 70, self.height - 6, int(40 * (1 - cooldown_percent)), 2, 11)
+            count += 2
+        return count
+
+
+class Renderer:
+    """ゲーム画面をレイヤーの順に描画する"""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.draw_calls = 0  # 直前のフレームの描画命令の数
+        self.particles = None  # effects.Particles（入れると爆発と破片を描く）
+        self.overlays = OverlayCache()
+        self.hud = HudLayer(self.overlays, width, height)
+        self.overlays.add("game_over", 80, 16, self.render_game_over)
+        try:
+            self.overlays.add("pause", width, height, self.render_pause)
+            self.pause_tiled = False
+        except ValueError:
+            # 画面がイメージバンクに入らない（大きなステージ）ときは、暗幕のタイルを
+            # 敷き詰めてからメッセージを重ねる
+            self.overlays.add("pause_tile", PAUSE_TILE, PAUSE_TILE, self.render_pause_tile)
+            self.overlays.add("pause_text", 76, 16, self.render_pause_text)
+            self.pause_tiled = True
+
+    def render_game_over(self, image, u, v):
+        image.text(u + 10, v, "GAME OVER", 8)
+        image.text(u, v + 10, "PRESS R TO RESTART", 8)
+
+    def render_dither(self, image, u, v, width, height):
+        """半透明の黒い背景（市松模様）"""
+        for y in range(height):
+            for x in range(y % 2, width, 2):
+                image.pset(u + x, v + y, 0)
+
+    def render_pause(self, image, u, v):
+        self.render_dither(image, u, v, self.width, self.height)
+
+        # ポーズメッセージ
+        self.render_pause_text(image, u + self.width // 2 - 35, v + self.height // 2)
+
+    def render_pause_tile(self, image, u, v):
+        self.render_dither(image, u, v, PAUSE_TILE, PAUSE_TILE)
+
+    def render_pause_text(self, image, u, v):
+        image.text(u + 17, v, "GAME PAUSED", 7)
+        image.text(u, v + 10, "PRESS P TO CONTINUE", 7)
+
+    def draw_pause(self):
+        """ポーズ中の表示を描画し、描画命令の数を返す"""
+        if not self.pause_tiled:
+            # 暗幕とメッセージをまとめて1回で描く
+            self.overlays.draw("pause", 0, 0)
+            return 1
+
+        count = 0
+        for y in range(0, self.height, PAUSE_TILE):
+            for x in range(0, self.width, PAUSE_TILE):
+                self.overlays.draw("pause_tile", x, y)
+                count += 1
+        self.overlays.draw("pause_text", self.width // 2 - 35, self.height // 2)
+        return count + 1
+
+    def draw(self, sim, play_time, paused, alpha=None, high_score=None):
+        """1フレームを描画（play_time はポーズを除いたプレイ時間の秒数）"""
+        # 背景
+        pyxel.cls(0)
+        count = 1
+
+        # プレイヤー
+        count += draw_player(sim.player, alpha)
+
+        # 敵（種類ごとにスプライトが違う）
+        count += draw_groups(group_active(sim.enemy_manager.enemies, _enemy_type), alpha)
+
+        # 弾（リストごとに同じ種類）
+        if sim.player_bullets:
+            count += draw_batch(sim.player_bullets, sim.player_bullets[0], alpha)
+        if sim.enemy_bullets:
+            count += draw_batch(sim.enemy_bullets, sim.enemy_bullets[0], alpha)
+        count += draw_groups(group_active(sim.special_bullets, type), alpha)
+
+        # パーティクル
+        if self.particles is not None:
+            count += draw_particles(self.particles)
+
+        # HUD
+        count += self.hud.draw(sim, play_time, high_score)
+
+        # ゲームオーバー表示
+        if sim.game_over:
+            self.overlays.draw("game_over", self.width // 2 - 40, self.height // 2)
+            count += 1
+
+        # ポーズ中の表示
+        if paused:
+            count += self.draw_pause()
+
+        self.draw_calls = count
@@ -0,0 +1,130 @@
+"""入力のリプレイの記録と再生
+
+リプレイはゲームの seed と、フレームごとの入力のビットマスク（Inputs.to_mask）を
+1フレーム1バイトで並べたもの。Simulation は seed と入力だけで決まるので、
+描画なしで全速力で再シミュレーションすれば同じゲームが再現できる。
+性能の退行の再現や、バージョン間で同じシナリオを計測するのに使う。
+
+    python replay.py game.rep
+"""
+import struct
+import time
+
+from simulation import Inputs, Simulation
+
+MAGIC = b"INVR"
+# ゲームのルールや乱数の使い方が変わって同じ seed と入力から同じゲームにならなくなったら上げる
+# （2: 敵の発射を FireScheduler で決めるようにした）
+VERSION = 2
+
+# マジック, バージョン, 画面の幅, 高さ, seed, フレーム数（リトルエンディアン）
+HEADER = struct.Struct("<4sBHHQI")
+
+# 入力のビットマスクの上限（Inputs の5ビット）
+MASK_LIMIT = Inputs.PAUSE * 2
+
+
+class ReplayError(ValueError):
+    """リプレイのデータが壊れているか形式が違う"""
+
+
+class Replay:
+    """1ゲーム分の seed と入力の記録"""
+    def __init__(self, seed, width=160, height=120, frames=None):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.frames = bytearray(frames or b"")  # フレームごとの入力のビットマスク
+
+    def __len__(self):
+        return len(self.frames)
+
+    def record(self, inputs):
+        """1フレーム分の入力を記録"""
+        self.frames.append(inputs.to_mask())
+
+    def inputs(self):
+        """記録した入力を順番に返す"""
+        from_mask = Inputs.from_mask
+        for mask in self.frames:
+            yield from_mask(mask)
+
+    def stepped_inputs(self):
+        """ゲームを進めるフレームの入力だけを返す
+
+        フロントエンドと同じく、Pキーでポーズを切り替え、ポーズ中のフレームは飛ばす。
+        """
+        paused = False
+        for inputs in self.inputs():
+            if inputs.pause:
+                paused = not paused
+            if not paused:
+                yield inputs
+
+    def to_bytes(self):
+        """バイナリ形式に変換"""
+        header = HEADER.pack(MAGIC, VERSION, self.width, self.height, self.seed,
+                             len(self.frames))
+        return header + bytes(self.frames)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """バイナリ形式から読み込む"""
+        if len(data) < HEADER.size:
+            raise ReplayError("リプレイのヘッダが足りません")
+        magic, version, width, height, seed, count = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("リプレイのファイルではありません")
+        if version != VERSION:
+            raise ReplayError(f"対応していないリプレイのバージョンです: {version}")
+        if not width or not height:
+            raise ReplayError(f"リプレイの画面の大きさが不正です: {width}x{height}")
+        frames = data[HEADER.size:]
+        if len(frames) != count:
+            raise ReplayError("リプレイのフレーム数が合いません")
+        if max(frames, default=0) >= MASK_LIMIT:
+            raise ReplayError("リプレイに不正な入力があります")
+        return cls(seed, width, height, frames)
+
+    def save(self, path):
+        """ファイルに保存"""
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """ファイルから読み込む"""
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def play(replay, simulation_class=Simulation):
+    """リプレイを描画なしで再生し、最後の状態の Simulation を返す"""
+    sim = simulation_class(replay.width, replay.height, replay.seed)
+    for inputs in replay.stepped_inputs():
+        if sim.game_over:
+            break
+        sim.step(inputs)
+    return sim
+
+
+def main():
+    import argparse  # ゲームからも読み込まれるので、コマンドラインで使うときだけ読み込む
+
+    parser = argparse.ArgumentParser(description="リプレイを描画なしで再生")
+    parser.add_argument("path", help="リプレイのファイル")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    start = time.perf_counter()
+    sim = play(replay)
+    elapsed = time.perf_counter() - start
+
+    print(f"seed: {replay.seed}")
+    print(f"frames: {len(replay)} recorded, {sim.frame_count} simulated")
+    print(f"score: {sim.score}  lives: {sim.player.lives}  game over: {sim.game_over}")
+    print(f"time: {elapsed:.3f}s ({sim.frame_count / elapsed if elapsed else 0:.0f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""ハイスコアとプレイの記録の保存
+
+1ゲームの結果（スコア、全滅させた群れの数、プレイ時間、ゲームオーバーの原因など）を
+ステージごとに保存し、上位のスコアと集計を返す。保存先はローカルでは SQLite の
+ファイル、web版（Pyodide）ではブラウザの localStorage。
+
+ゲームからは ScoreWriter を使う。結果はキューに入れるだけで、ファイルへの書き込みは
+別スレッドがまとめて行うので、ディスクの読み書きでフレームが止まらない。スレッドを
+使えない web版では flush()（ゲームオーバーの画面で呼ぶ）までためておく。
+
+    python scores.py                      # classic ステージの上位10件と集計
+    python scores.py --stage stress --top 20
+"""
+import os
+import queue
+import sys
+import threading
+
+# 1ゲームの結果の項目（SQLite の列と同じ順）
+RESULT_FIELDS = ("played_at", "stage", "collision", "seed", "score", "waves_cleared", "frames",
+                 "play_time", "cause", "lives")
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".aws_invaders", "scores.sqlite3")
+STORAGE_KEY = "aws_invaders_scores"  # web版の localStorage のキー
+
+# web版（Pyodide）ではスレッドを起動できない
+THREADS = sys.platform != "emscripten"
+
+
+def game_result(sim, stage, play_time, collision="discrete"):
+    """終わったゲームの結果を辞書にする（play_time はポーズを除いた秒数）"""
+    import time
+
+    return {
+        "played_at": time.time(),
+        "stage": stage,
+        "collision": collision,
+        "seed": str(sim.seed),  # 64ビットの seed は SQLite の整数に入らない
+        "score": sim.score,
+        "waves_cleared": sim.enemy_manager.waves_cleared,
+        "frames": sim.frame_count,
+        "play_time": play_time,
+        "cause": sim.death_cause or "quit",
+        "lives": sim.player.lives,
+    }
+
+
+class SqliteStore:
+    """SQLite のファイルに結果を保存する（上位のスコアはステージとスコアの索引で引く）"""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            played_at REAL NOT NULL,
+            stage TEXT NOT NULL,
+            collision TEXT NOT NULL,
+            seed TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            waves_cleared INTEGER NOT NULL,
+            frames INTEGER NOT NULL,
+            play_time INTEGER NOT NULL,
+            cause TEXT NOT NULL,
+            lives INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS runs_top ON runs (stage, score DESC);
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        import sqlite3
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        # 書き込み中でも別のプロセス（scores.py）から読めるようにする
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(self.SCHEMA)
+
+    def write_many(self, results):
+        """結果をまとめて1つのトランザクションで書き込む"""
+        placeholders = ", ".join("?" * len(RESULT_FIELDS))
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT INTO runs ({', '.join(RESULT_FIELDS)}) VALUES ({placeholders})",
+                [tuple(result[name] for name in RESULT_FIELDS) for result in results])
+
+    def top(self, stage, count=10):
+        """ステージの上位 count 件の結果（スコアの高い順）"""
+        rows = self.connection.execute(
+            "SELECT * FROM runs WHERE stage = ? ORDER BY score DESC LIMIT ?", (stage, count))
+        return [{name: row[name] for name in RESULT_FIELDS} for row in rows]
+
+    def best(self, stage):
+        """ステージの最高スコア（記録がなければ0）"""
+        row = self.connection.execute(
+            "SELECT MAX(score) FROM runs WHERE stage = ?", (stage,)).fetchone()
+        return row[0] or 0
+
+    def stats(self, stage):
+        """ステージの集計（ゲーム数、最高スコア、スコアとプレイ時間の合計、原因ごとの数）"""
+        games, best, total_score, play_time, max_waves = self.connection.execute(
+            "SELECT COUNT(*), MAX(score), SUM(score), SUM(play_time), MAX(waves_cleared) "
+            "FROM runs WHERE stage = ?", (stage,)).fetchone()
+        causes = dict(self.connection.execute(
+            "SELECT cause, COUNT(*) FROM runs WHERE stage = ? GROUP BY cause", (stage,)))
+        return {"games": games, "best": best or 0, "total_score": total_score or 0,
+                "play_time": play_time or 0, "max_waves": max_waves or 0, "causes": causes}
+
+    def close(self):
+        self.connection.close()
+
+
+class BrowserStore:
+    """web版でブラウザの localStorage に結果を保存する
+
+    localStorage には文字列しか入らないので、ステージごとにスコアの高い順に並べた
+    上位 limit 件と集計を1つの JSON にまとめて書き込む（上位のスコアは先頭から取り出すだけ）。
+    """
+    def __init__(self, key=STORAGE_KEY, limit=100):
+        import json
+
+        from js import localStorage  # Pyodide のときだけある
+
+        self.json = json
+        self.storage = localStorage
+        self.key = key
+        self.limit = limit
+        data = localStorage.getItem(key)
+        self.data = json.loads(data) if data else {}
+
+    def write_many(self, results):
+        for result in results:
+            entry = self.data.setdefault(result["stage"], {
+                "top": [], "games": 0, "total_score": 0, "play_time": 0, "max_waves": 0,
+                "causes": {}})
+            entry["games"] += 1
+            entry["total_score"] += result["score"]
+            entry["play_time"] += result["play_time"]
+            entry["max_waves"] = max(entry["max_waves"], result["waves_cleared"])
+            entry["causes"][result["cause"]] = entry["causes"].get(result["cause"], 0) + 1
+
+            # 同じスコアなら先に記録したものを上にする
+            top = entry["top"]
+            index = len(top)
+            while index and top[index - 1]["score"] < result["score"]:
+                index -= 1
+            top.insert(index, result)
+            del top[self.limit:]
+        self.storage.setItem(self.key, self.json.dumps(self.data, separators=(",", ":")))
+
+    def top(self, stage, count=10):
+        return self.data.get(stage, {}).get("top", [])[:count]
+
+    def best(self, stage):
+        top = self.top(stage, 1)
+        return top[0]["score"] if top else 0
+
+    def stats(self, stage):
+        entry = self.data.get(stage)
+        if entry is None:
+            return {"games": 0, "best": 0, "total_score": 0, "play_time": 0, "max_waves": 0,
+                    "causes": {}}
+        stats = {name: value for name, value in entry.items() if name != "top"}
+        stats["best"] = self.best(stage)
+        return stats
+
+    def close(self):
+        pass
+
+
+def _store_errors():
+    """保存先を開けないときに出る例外（web版には sqlite3 がないことがある）"""
+    try:
+        import sqlite3
+    except ImportError:
+        return (OSError,)
+    return (OSError, sqlite3.Error)
+
+
+def open_store(path=DEFAULT_PATH):
+    """環境に合った保存先を開く（web版では path は使わない）"""
+    if sys.platform == "emscripten":
+        return BrowserStore()
+    return SqliteStore(path)
+
+
+class ScoreWriter:
+    """ゲームの結果をゲームのスレッドの外でまとめて保存する
+
+    write() はキューに入れるだけ。書き込み用のスレッドが保存先を開いてステージの最高
+    スコアを high_score に入れ、届いた結果を最大 batch_size 件ずつ（interval 秒待っても
+    次が来なければそこまでで）1回で書き込む。スレッドを使えないときは flush() で書き込む。
+
+    保存先を開けないとき（ディレクトリが作れない、ファイルが壊れているなど）は一度だけ
+    警告を出して保存をやめ、それからの write()、flush()、close() は何もしない。
+    """
+    def __init__(self, stage, path=DEFAULT_PATH, batch_size=32, interval=0.5):
+        self.stage = stage
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        self.high_score = 0  # 保存してある最高スコア（読み込むまでは0）
+        self.queue = queue.SimpleQueue()
+        self.store = None  # スレッドを使わないときの保存先
+        self.pending = []  # スレッドを使わないときの書き込み待ち
+        self.disabled = False  # 保存先を開けず保存をやめた
+        if THREADS:
+            self.thread = threading.Thread(target=self.run, name="score-writer", daemon=True)
+            self.thread.start()
+        else:
+            self.thread = None
+            self.store = self.open()
+
+    def open(self):
+        """保存先を開いて最高スコアを読み込む（開けなければ保存をやめて None を返す）"""
+        store = None
+        try:
+            store = open_store(self.path)
+            self.high_score = max(self.high_score, store.best(self.stage))
+        except _store_errors() as error:
+            if store is not None:
+                store.close()
+            print(f"スコアの保存先を開けないので保存しません: {self.path}: {error}", file=sys.stderr)
+            self.disabled = True
+            return None
+        return store
+
+    def write(self, result):
+        """結果を書き込み待ちにする（すぐに戻る）"""
+        if result["stage"] == self.stage:
+            self.high_score = max(self.high_score, result["score"])
+        if self.disabled:
+            return
+        if self.thread is None:
+            self.pending.append(result)
+        else:
+            self.queue.put(result)
+
+    def run(self):
+        """書き込み用のスレッドの処理（close() で None が届くまで続ける）"""
+        store = self.open()
+        if store is None:
+            return
+        try:
+            done = False
+            while not done:
+                batch = [self.queue.get()]
+                while len(batch) < self.batch_size and batch[-1] is not None:
+                    try:
+                        batch.append(self.queue.get(timeout=self.interval))
+                    except queue.Empty:
+                        break
+                if batch[-1] is None:
+                    done = True
+                    batch.pop()
+                if batch:
+                    store.write_many(batch)
+        finally:
+            store.close()
+
+    def flush(self):
+        """スレッドを使わないときに、書き込み待ちの結果を書き込む"""
+        if self.pending and not self.disabled:
+            self.store.write_many(self.pending)
+            self.pending = []
+
+    def close(self, timeout=5.0):
+        """残りの結果を書き込んで保存先を閉じる"""
+        if self.disabled:
+            return
+        if self.thread is None:
+            self.flush()
+            self.store.close()
+        else:
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="保存したハイスコアと集計を表示")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="スコアの SQLite ファイル")
+    parser.add_argument("--stage", default="classic", help="ステージの名前")
+    parser.add_argument("--top", type=int, default=10, help="表示する件数")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        sys.exit(f"{args.path} がありません（ゲームオーバーになると作られます）")
+    store = SqliteStore(args.path)
+    print(f"{'#':>3} {'SCORE':>7} {'WAVES':>5} {'TIME':>6}  CAUSE")
+    for rank, result in enumerate(store.top(args.stage, args.top), 1):
+        minutes, seconds = divmod(result["play_time"], 60)
+        print(f"{rank:>3} {result['score']:>7} {result['waves_cleared']:>5} "
+              f"{minutes:>3}:{seconds:02d}  {result['cause']}")
+    stats = store.stats(args.stage)
+    average = stats["total_score"] / stats["games"] if stats["games"] else 0
+    causes = ", ".join(f"{cause} {count}" for cause, count in sorted(stats["causes"].items()))
+    print(f"{stats['games']} games, best {stats['best']}, average {average:.0f}, "
+          f"max waves {stats['max_waves']}, play time {stats['play_time']} s ({causes})")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
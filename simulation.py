@@ -0,0 +1,975 @@
+"""ゲームルールのヘッドレス実装
+
+pyxelに依存しないため、ウィンドウなしで任意の速度でゲームを進められる。
+描画と入力の取得は invaders_game_oop.py のフロントエンドが担当する。
+"""
+import random
+from operator import itemgetter
+
+from atlas import ENEMY_SPRITES, sprite_origin
+from broadphase import UniformGrid
+from events import EnemyKilled, EventBus, PlayerHit, ShotFired, WaveCleared
+from firing import FireScheduler
+from pool import ObjectPool, compact
+from sweep import NO_HIT, sweep
+
+
+class Inputs:
+    """1フレーム分の入力状態
+
+    リプレイでは to_mask() のビットマスクとして1フレーム1バイトで記録する。
+    """
+    __slots__ = ("left", "right", "space", "z", "pause")
+
+    # ビットマスクの各ビット
+    LEFT = 1
+    RIGHT = 2
+    SPACE = 4
+    Z = 8
+    PAUSE = 16
+
+    def __init__(self, left=False, right=False, space=False, z=False, pause=False):
+        self.left = left  # 左矢印キー
+        self.right = right  # 右矢印キー
+        self.space = space  # スペースキー（通常弾）
+        self.z = z  # Zキー（必殺技のチャージ）
+        self.pause = pause  # Pキーを押した瞬間（ポーズ切り替え、フロントエンドが処理）
+
+    def to_mask(self):
+        """入力をビットマスクに変換"""
+        return ((self.LEFT if self.left else 0) |
+                (self.RIGHT if self.right else 0) |
+                (self.SPACE if self.space else 0) |
+                (self.Z if self.z else 0) |
+                (self.PAUSE if self.pause else 0))
+
+    @classmethod
+    def from_mask(cls, mask):
+        """ビットマスクから入力を返す（同じマスクには同じインスタンスを返す）"""
+        return _MASK_INPUTS[mask]
+
+
+# ビットマスクごとの入力（リプレイの再生で毎フレーム生成しないように作っておく）
+_MASK_INPUTS = [Inputs(bool(mask & Inputs.LEFT), bool(mask & Inputs.RIGHT),
+                       bool(mask & Inputs.SPACE), bool(mask & Inputs.Z),
+                       bool(mask & Inputs.PAUSE))
+                for mask in range(32)]
+
+# 何も押していない入力
+NO_INPUTS = _MASK_INPUTS[0]
+
+
+class GameObject:
+    """ゲームオブジェクトの基底クラス
+
+    インスタンスは __slots__ で必要な属性だけを持つ。大きさや色、スプライト座標など
+    種類ごとに共通の値はクラス属性として派生クラスで定義する。
+    prev_x と prev_y は直前の tick の位置で、補間描画に使う（Simulation.save_positions）。
+    """
+    __slots__ = ("x", "y", "prev_x", "prev_y", "is_active")
+
+    width = 0
+    height = 0
+    color = 7
+    sprite_bank = 0  # スプライトのイメージバンク
+    sprite_x = None  # スプライトのX座標（画像内、None ならスプライトなし）
+    sprite_y = None  # スプライトのY座標（画像内）
+
+    def __init__(self, x, y):
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
+        self.is_active = True
+
+    def update(self, game):
+        """オブジェクトの状態を更新（派生クラスで実装する）"""
+        raise NotImplementedError
+
+    def collides_with(self, other):
+        """他のオブジェクトとの衝突判定"""
+        if not self.is_active or not other.is_active:
+            return False
+
+        return (self.x < other.x + other.width and
+                self.x + self.width > other.x and
+                self.y < other.y + other.height and
+                self.y + self.height > other.y)
+
+
+class Player(GameObject):
+    """プレイヤークラス（lives と speed は Simulation の rules で決まる）"""
+    __slots__ = ("game_width", "speed", "bullet_cooldown", "lives", "invincible",
+                 "invincible_timer", "blink_timer", "special_charge", "special_charging",
+                 "special_cooldown", "special_type")
+
+    width = 8
+    height = 8
+    color = 11
+    sprite_bank, sprite_x, sprite_y = sprite_origin("player")
+    special_max_charge = 100  # 必殺技の最大チャージ量
+    special_max_cooldown = 180  # 必殺技を撃った後のクールダウン（3秒間）
+
+    def __init__(self, x, y, game_width, lives=5, speed=3):
+        super().__init__(x, y)
+        self.game_width = game_width
+        self.speed = speed
+        self.bullet_cooldown = 0
+        self.lives = lives
+        self.invincible = False
+        self.invincible_timer = 0
+        self.blink_timer = 0
+
+        # 必殺技関連
+        self.special_charge = 0  # 必殺技のチャージ量
+        self.special_charging = False  # チャージ中かどうか
+        self.special_cooldown = 0  # 必殺技のクールダウン
+        self.special_type = 0  # 0: 貫通弾, 1: バウンス弾
+
+    def update(self, game):
+        inputs = game.inputs
+
+        # 左右移動
+        if inputs.left and self.x > 0:
+            self.x -= self.speed
+        if inputs.right and self.x < self.game_width - self.width:
+            self.x += self.speed
+
+        # 弾の発射はゲームクラスで処理
+        if self.bullet_cooldown > 0:
+            self.bullet_cooldown -= 1
+
+        # 必殺技のチャージと発射
+        if inputs.z:  # Zキーでチャージ
+            self.special_charging = True
+            if self.special_charge < self.special_max_charge:
+                self.special_charge += 1
+        elif self.special_charging:  # Zキーを離したとき
+            self.special_charging = False
+            if self.special_charge >= self.special_max_charge and self.special_cooldown <= 0:
+                # 必殺技発射
+                game.fire_special_weapon(self.special_type)
+                self.special_charge = 0
+                self.special_cooldown = self.special_max_cooldown
+                # 必殺技タイプの切り替え
+                self.special_type = (self.special_type + 1) % 2
+
+        # 必殺技のクールダウン
+        if self.special_cooldown > 0:
+            self.special_cooldown -= 1
+
+        # 無敵時間の処理
+        if self.invincible:
+            self.invincible_timer -= 1
+            self.blink_timer = (self.blink_timer + 1) % 6
+            if self.invincible_timer <= 0:
+                self.invincible = False
+
+    def hit(self):
+        """敵の弾に当たった時の処理"""
+        if not self.invincible:
+            self.lives -= 1
+            if self.lives > 0:
+                self.invincible = True
+                self.invincible_timer = 60
+                return False
+            return True
+        return False
+
+
+class Bullet(GameObject):
+    """弾の基底クラス"""
+    __slots__ = ()
+
+    speed = 4
+
+    def reset(self, x, y):
+        """プールから再利用するときの初期化"""
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
+        self.is_active = True
+
+
+class PlayerBullet(Bullet):
+    """プレイヤーの弾クラス（速さは Simulation の player_bullet_speed）"""
+    __slots__ = ()
+
+    width = 2
+    height = 4
+    color = 10
+    sprite_bank, sprite_x, sprite_y = sprite_origin("player_bullet")
+    speed = 5  # 既定の速さ
+    points = 10  # 敵を倒したときの得点
+
+    def update(self, game):
+        self.y -= game.player_bullet_speed
+        if self.y < 0:
+            self.is_active = False
+
+
+class EnemyBullet(Bullet):
+    """敵の弾クラス（速さは Simulation の enemy_bullet_speed）"""
+    __slots__ = ()
+
+    width = 2
+    height = 4
+    color = 8
+    sprite_bank, sprite_x, sprite_y = sprite_origin("enemy_bullet")
+    speed = 1  # 既定の速さ
+
+    def update(self, game):
+        self.y += game.enemy_bullet_speed
+        if self.y > game.HEIGHT:
+            self.is_active = False
+
+
+class SpecialBullet(Bullet):
+    """必殺技の弾の基底クラス"""
+    __slots__ = ("bounce_count",)
+
+    points = 20  # 敵を倒したときの得点（必殺技は高得点）
+    penetrate = False  # 貫通するかどうか
+    bounce = False  # 跳ね返るかどうか
+    max_bounce = 5  # 最大跳ね返り回数
+    dx = 0  # X方向の移動量
+    dy = 0  # Y方向の移動量
+
+    def __init__(self, x, y):
+        super().__init__(x, y)
+        self.bounce_count = 0  # 跳ね返った回数
+
+    def reset(self, x, y):
+        """プールから再利用するときの初期化"""
+        super().reset(x, y)
+        self.bounce_count = 0
+
+
+class PenetratingBullet(SpecialBullet):
+    """貫通弾クラス"""
+    __slots__ = ()
+
+    width = 4
+    height = 8
+    color = 9
+    sprite_bank, sprite_x, sprite_y = sprite_origin("penetrating_bullet")
+    penetrate = True
+
+    def update(self, game):
+        self.y -= self.speed
+        if self.y < 0:
+            self.is_active = False
+
+
+class BouncingBullet(SpecialBullet):
+    """バウンス弾クラス"""
+    __slots__ = ("dx", "dy")  # 跳ね返るたびに変わるのでインスタンスごとに持つ
+
+    width = 4
+    height = 4
+    color = 12
+    sprite_bank, sprite_x, sprite_y = sprite_origin("bouncing_bullet")
+    bounce = True
+
+    def __init__(self, x, y, direction):
+        super().__init__(x, y)
+        self.dx = direction  # 方向係数（絶対値が大きいほど水平方向の動きが大きい）
+        self.dy = -1  # 上向き
+
+    def reset(self, x, y, direction):
+        """プールから再利用するときの初期化"""
+        super().reset(x, y)
+        self.dx = direction
+        self.dy = -1  # 上向き
+
+    def update(self, game):
+        # 移動
+        self.x += self.dx
+        self.y += self.dy * self.speed
+
+        # 左右の壁での跳ね返り
+        if self.x <= 0 or self.x >= game.WIDTH - self.width:
+            self.dx *= -1
+            self.bounce_count += 1
+
+        # 上下の壁での跳ね返り（上端も跳ね返るように変更）
+        if self.y <= 0:
+            self.dy *= -1  # 上端でも跳ね返る
+            self.bounce_count += 1
+        elif self.y >= game.HEIGHT - self.height:
+            self.is_active = False  # 下端に到達したら消滅
+
+        # 最大跳ね返り回数を超えたら消滅
+        if self.bounce_count >= self.max_bounce:
+            self.is_active = False
+
+
+# enemy_type ごとの敵のスプライトの (イメージバンク, X, Y)
+ENEMY_SPRITE_ORIGINS = tuple(sprite_origin(name) for name in ENEMY_SPRITES)
+
+
+class Enemy(GameObject):
+    """敵クラス
+
+    column と row は隊列の中の列と行の番号。同じ列の敵は同じX座標、同じ行の敵は
+    同じY座標で一緒に動く。
+    """
+    __slots__ = ("shoot_chance", "enemy_type", "column", "row")
+
+    width = 8
+    height = 8
+    color = 8
+
+    def __init__(self, x, y, enemy_type=0, column=0, row=0):
+        super().__init__(x, y)
+        self.shoot_chance = 0.005  # 発射確率を0.01から0.005に減少
+        self.enemy_type = enemy_type
+        self.column = column
+        self.row = row
+
+    # 敵タイプに応じて異なるスプライト
+    @property
+    def sprite_bank(self):
+        return ENEMY_SPRITE_ORIGINS[self.enemy_type][0]
+
+    @property
+    def sprite_x(self):
+        return ENEMY_SPRITE_ORIGINS[self.enemy_type][1]
+
+    @property
+    def sprite_y(self):
+        return ENEMY_SPRITE_ORIGINS[self.enemy_type][2]
+
+    def update(self, game):
+        # 移動は EnemyManager で一括管理
+        pass
+
+    def shoot(self, game):
+        """弾を発射（いつ撃つかは EnemyManager の FireScheduler が決める）"""
+        game.add_enemy_bullet(self.x + game.enemy_bullet_offset, self.y + self.height)
+
+
+class EnemyManager:
+    """敵の集団を管理するクラス
+
+    生きている敵の数と、左端・右端の列と一番下の行の生きている敵を、敵を倒したときに
+    更新しておく。端での折り返し・全滅・到達の判定は毎フレーム全員を調べずにこれで行う。
+    弾を撃つ敵は rng（ゲームの乱数生成器）を使う FireScheduler が決める。
+
+    隊列は rows 行 columns 列で、左上の敵が (origin_x, origin_y)、敵の間隔が
+    spacing_x, spacing_y。行ごとに enemy_types の敵の種類を順に使う（stages.py を参照）。
+    """
+    def __init__(self, game_width, game_height, rng, speed=0.5, shoot_chance=0.005,
+                 speed_step=0.2, shoot_chance_step=0.002, rows=3, columns=6, origin_x=20,
+                 origin_y=5, spacing_x=20, spacing_y=10, enemy_types=(0, 1, 2), drop=3):
+        self.game_width = game_width
+        self.game_height = game_height
+        self.fire_scheduler = FireScheduler(rng)
+        self.rows = rows  # 行数を5から3に減らす
+        self.columns = columns
+        self.origin_x = origin_x
+        self.origin_y = origin_y  # 敵の初期位置をより上に配置（y座標を10から5に変更）
+        self.spacing_x = spacing_x
+        self.spacing_y = spacing_y
+        self.enemy_types = enemy_types  # 行ごとに異なる敵タイプを使用
+        self.drop = drop  # 下降幅を5から3に減少
+        self.enemies = []
+        self.move_dir = 1  # 1: 右, -1: 左
+        self.speed = speed  # 移動速度を1から0.5に減速
+        self.shoot_chance = shoot_chance  # 発射確率を0.01から0.005に減少
+        self.speed_step = speed_step  # 全滅させるごとの速度の上昇（0.5から0.2に）
+        self.shoot_chance_step = shoot_chance_step  # 全滅させるごとの発射確率の上昇（0.005から0.002に）
+        self.waves_cleared = 0  # 全滅させた群れの数
+        self.track_formation()
+
+    def create_enemies(self):
+        """敵を配置"""
+        self.enemies = []
+        enemy_types = self.enemy_types
+        for y in range(self.rows):
+            enemy_type = enemy_types[y % len(enemy_types)]
+            for x in range(self.columns):
+                enemy = Enemy(self.origin_x + x * self.spacing_x,
+                              self.origin_y + y * self.spacing_y, enemy_type, x, y)
+                enemy.shoot_chance = self.shoot_chance
+                self.enemies.append(enemy)
+        self.track_formation()
+        self.fire_scheduler.schedule(self.enemies)
+
+    def track_formation(self):
+        """列と行ごとに敵をまとめ、生きている敵の数と端の敵を求め直す（配置したときに呼ぶ）"""
+        columns = {}
+        rows = {}
+        self.alive = 0  # 生きている敵の数
+        for enemy in self.enemies:
+            columns.setdefault(enemy.column, []).append(enemy)
+            rows.setdefault(enemy.row, []).append(enemy)
+            if enemy.is_active:
+                self.alive += 1
+        self.column_keys = sorted(columns)
+        self.row_keys = sorted(rows)
+        self.column_members = [columns[key] for key in self.column_keys]  # 列ごとの敵（左から）
+        self.row_members = [rows[key] for key in self.row_keys]  # 行ごとの敵（上から）
+        self.column_alive = [sum(e.is_active for e in line) for line in self.column_members]
+        self.row_alive = [sum(e.is_active for e in line) for line in self.row_members]
+        self.column_index = {key: i for i, key in enumerate(self.column_keys)}
+        self.row_index = {key: i for i, key in enumerate(self.row_keys)}
+
+        # 生きている敵のいる左端・右端の列と一番下の行の番号（端から内側にだけ動く）
+        self.left_column = 0
+        self.right_column = len(self.column_members) - 1
+        self.bottom_row = len(self.row_members) - 1
+        self.left = self.find_left()
+        self.right = self.find_right()
+        self.bottom = self.find_bottom()
+
+    def find_left(self):
+        """左端の列の生きている敵（いなければ None）"""
+        alive = self.column_alive
+        while self.left_column < len(alive) and not alive[self.left_column]:
+            self.left_column += 1
+        if self.left_column < len(alive):
+            return _first_active(self.column_members[self.left_column])
+        return None
+
+    def find_right(self):
+        """右端の列の生きている敵（いなければ None）"""
+        alive = self.column_alive
+        while self.right_column >= 0 and not alive[self.right_column]:
+            self.right_column -= 1
+        if self.right_column >= 0:
+            return _first_active(self.column_members[self.right_column])
+        return None
+
+    def find_bottom(self):
+        """一番下の行の生きている敵（いなければ None）"""
+        alive = self.row_alive
+        while self.bottom_row >= 0 and not alive[self.bottom_row]:
+            self.bottom_row -= 1
+        if self.bottom_row >= 0:
+            return _first_active(self.row_members[self.bottom_row])
+        return None
+
+    def kill(self, enemy):
+        """敵を倒す（端の敵だったら次の端の敵を探す）"""
+        enemy.is_active = False
+        self.alive -= 1
+        self.column_alive[self.column_index[enemy.column]] -= 1
+        self.row_alive[self.row_index[enemy.row]] -= 1
+        if enemy is self.left:
+            self.left = self.find_left()
+        if enemy is self.right:
+            self.right = self.find_right()
+        if enemy is self.bottom:
+            self.bottom = self.find_bottom()
+
+    def next_wave(self):
+        """難易度を上げて次の敵の群れを配置"""
+        self.waves_cleared += 1
+        self.speed += self.speed_step
+        self.shoot_chance += self.shoot_chance_step
+        self.create_enemies()
+
+    def set_shoot_chance(self, shoot_chance):
+        """群れの途中で発射確率を変える（発射予定も引き直す）"""
+        self.shoot_chance = shoot_chance
+        for enemy in self.enemies:
+            enemy.shoot_chance = shoot_chance
+        self.fire_scheduler.reschedule()
+
+    def update(self, game):
+        """敵の移動と弾の発射"""
+        # 移動方向の判定（進む側の端の列だけを見る）
+        move_down = False
+        if self.alive:
+            if self.move_dir > 0:
+                move_down = self.right.x >= self.game_width - self.right.width
+            else:
+                move_down = self.left.x <= 0
+
+        # 移動処理
+        if move_down:
+            self.move_dir *= -1
+            drop = self.drop
+            for enemy in self.enemies:
+                if enemy.is_active:
+                    enemy.y += drop
+        else:
+            dx = self.move_dir * self.speed
+            for enemy in self.enemies:
+                if enemy.is_active:
+                    enemy.x += dx
+
+        # 弾の発射（このフレームに撃つ予定の敵だけ）
+        for enemy in self.fire_scheduler.due():
+            enemy.shoot(game)
+
+        # 全滅判定
+        if not self.alive:
+            self.next_wave()
+
+        # プレイヤーに到達判定
+        # （敵はこの後のフレームの処理では動かないので、ここで1回だけ判定すればよい）
+        if self.alive and self.bottom.y + self.bottom.height >= game.player.y:
+            game.end_game("invasion")
+
+
+def _first_active(enemies):
+    """生きている最初の敵"""
+    for enemy in enemies:
+        if enemy.is_active:
+            return enemy
+    return None
+
+
+class Simulation:
+    """ゲームルール全体の状態を持ち、入力を受けて1フレームずつ進めるクラス
+
+    乱数はゲームごとの rng だけを使うので、同じ seed と同じ入力列からは
+    必ず同じゲームが再現される（replay.py を参照）。
+    enemy_settings は EnemyManager の引数（速度や発射確率とその上昇幅、隊列の形）で、
+    バランス調整のために既定値を変えるときに使う。max_enemy_bullets を指定すると
+    画面の敵の弾がその数に達している間は敵が撃っても弾が出ない。
+
+    collision は弾の当たり判定の方式。"discrete" は移動した後の位置だけで判定し、
+    "swept" は弾がその tick に動いた範囲で判定する（sweep.py）。"swept" では速い弾が
+    敵をすり抜けず、1つの弾が複数の敵に当たりうるときは弾の進む先で最初に当たる敵を選ぶ。
+
+    rules はプレイヤーと弾のルール（RULES のキー）で、ステージごとに変えるときに使う。
+
+    subscribe() で購読した種類のイベント（events.py）は tick の最後にまとめて購読者に渡す。
+    """
+    # 1フレームの処理の順番（計測用の名前, メソッド名）
+    PHASES = (
+        ("player", "update_player"),  # プレイヤーの更新
+        ("enemies", "update_enemies"),  # 敵の更新
+        ("bullets", "update_bullets"),  # 弾の更新
+        # 衝突判定
+        ("hit_pb", "collide_player_bullets"),
+        ("hit_sp", "collide_special_bullets"),
+        ("hit_eb", "collide_enemy_bullets"),
+        ("hit_sp_eb", "collide_special_and_enemy_bullets"),
+        ("compact", "remove_inactive"),  # 不要なオブジェクトの削除
+        ("fire", "fire"),  # 連射機能（SPACEキーを押し続けると一定間隔で発射）
+    )
+
+    COLLISION_MODES = ("discrete", "swept")
+
+    # rules の既定値
+    RULES = {
+        "lives": 5,  # 最初のライフ（1なら被弾するとすぐにゲームオーバー）
+        "player_speed": 3,  # プレイヤーの移動の速さ
+        "fire_cooldown": 8,  # 通常弾を撃ってから次に撃てるまでのフレーム数
+        "player_bullet_speed": PlayerBullet.speed,
+        "enemy_bullet_speed": EnemyBullet.speed,
+        "enemy_bullet_offset": Enemy.width // 2 - 1,  # 敵の弾を出すX座標（敵の左端から）
+    }
+
+    # collision="swept" のときに PHASES のメソッドの代わりに使うメソッド
+    SWEPT_PHASES = {
+        "update_bullets": "update_bullets_swept",
+        "collide_player_bullets": "sweep_player_bullets",
+        "collide_special_bullets": "sweep_special_bullets",
+        "collide_enemy_bullets": "sweep_enemy_bullets",
+        "collide_special_and_enemy_bullets": "sweep_special_and_enemy_bullets",
+        "remove_inactive": "remove_inactive_swept",
+    }
+
+    def __init__(self, width=160, height=120, seed=None, enemy_settings=None,
+                 max_enemy_bullets=None, collision="discrete", rules=None):
+        if collision not in self.COLLISION_MODES:
+            raise ValueError(f"unknown collision mode: {collision} "
+                             f"(choose from {', '.join(self.COLLISION_MODES)})")
+        unknown = sorted(set(rules or ()) - set(self.RULES))
+        if unknown:
+            raise ValueError(f"unknown rule: {', '.join(unknown)}")
+        self.WIDTH = width
+        self.HEIGHT = height
+        self.enemy_settings = dict(enemy_settings or {})
+        self.max_enemy_bullets = max_enemy_bullets
+        self.collision = collision
+        self.rules = dict(self.RULES)
+        self.rules.update(rules or {})
+        # 毎フレーム使うルールは属性にしておく
+        self.fire_cooldown = self.rules["fire_cooldown"]
+        self.player_bullet_speed = self.rules["player_bullet_speed"]
+        self.enemy_bullet_speed = self.rules["enemy_bullet_speed"]
+        self.enemy_bullet_offset = self.rules["enemy_bullet_offset"]
+
+        # 衝突判定の候補を絞り込むグリッド（毎フレーム作り直す）
+        self.enemy_grid = UniformGrid(width, height)
+        self.enemy_bullet_grid = UniformGrid(width, height)
+
+        # 弾のプール（リセットをまたいで使い回す）
+        self.pools = {
+            PlayerBullet: ObjectPool(lambda: PlayerBullet(0, 0), 32),
+            EnemyBullet: ObjectPool(lambda: EnemyBullet(0, 0), 128),
+            PenetratingBullet: ObjectPool(lambda: PenetratingBullet(0, 0), 8),
+            BouncingBullet: ObjectPool(lambda: BouncingBullet(0, 0, 1), 16),
+        }
+
+        swept = self.SWEPT_PHASES if collision == "swept" else {}
+        self.phases = [(name, getattr(self, swept.get(method, method)))
+                       for name, method in self.PHASES]
+        self.profiler = None  # profiler.FrameProfiler を入れると処理ごとの時間を計測する
+        self.events = None  # 購読者がいるときの events.EventBus（リセットしても残す）
+        self.leaving = []  # collision="swept" で画面の外に出たが判定が終わるまで残している弾
+
+        self.reset(seed)
+
+    @classmethod
+    def from_stage(cls, stage, seed=None, enemy_settings=None, collision="discrete"):
+        """stages.Stage の設定でゲームを作る（enemy_settings はステージの値を上書きする）"""
+        settings = dict(stage.enemy_settings)
+        settings.update(enemy_settings or {})
+        return cls(stage.width, stage.height, seed, settings, stage.max_enemy_bullets,
+                   collision, stage.rules)
+
+    def reset(self, seed=None):
+        """ゲームの状態をリセット（seed を省略すると新しい seed を選ぶ）"""
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.rng = random.Random(seed)  # ゲームごとの乱数生成器
+
+        self.score = 0
+        self.game_over = False
+        self.death_cause = None  # ゲームオーバーの原因（"shot": 被弾, "invasion": 敵の到達）
+        self.frame_count = 0  # 進めたフレーム数（ポーズ中は増えない）
+        self.inputs = NO_INPUTS
+
+        # ゲームオブジェクト
+        self.player = Player(self.WIDTH // 2, self.HEIGHT - 20, self.WIDTH, self.rules["lives"],
+                             self.rules["player_speed"])
+        self.reset_entities()
+
+    def reset_entities(self):
+        """弾と敵を初期状態にする（使っていた弾はプールに戻す）"""
+        for name in ("player_bullets", "enemy_bullets", "special_bullets"):
+            for bullet in getattr(self, name, ()):
+                self.release_bullet(bullet)
+
+        self.player_bullets = []
+        self.enemy_bullets = []
+        self.special_bullets = []  # 必殺技の弾リスト
+        self.enemy_manager = EnemyManager(self.WIDTH, self.HEIGHT, self.rng,
+                                          **self.enemy_settings)
+        self.enemy_manager.create_enemies()
+
+    def subscribe(self, event_type, callback):
+        """event_type（events.py）のイベントを tick ごとにリストで受け取る"""
+        if self.events is None:
+            self.events = EventBus()
+        self.events.subscribe(event_type, callback)
+
+    def end_game(self, cause):
+        """ゲームオーバーにする（原因は最初のものだけを残す）"""
+        self.game_over = True
+        if self.death_cause is None:
+            self.death_cause = cause
+
+    def release_bullet(self, bullet):
+        """使い終わった弾をプールに戻す"""
+        self.pools[type(bullet)].release(bullet)
+
+    def pool_stats(self):
+        """弾のプールの統計をクラス名ごとに返す"""
+        return {cls.__name__: pool.stats() for cls, pool in self.pools.items()}
+
+    def kill_enemy(self, enemy, points):
+        """敵を倒して得点を加える"""
+        self.enemy_manager.kill(enemy)
+        self.score += points
+        if self.events is not None:
+            self.events.emit(EnemyKilled, self.frame_count, enemy.x, enemy.y, enemy.enemy_type,
+                             points)
+
+    def hit_player(self):
+        """敵の弾がプレイヤーに当たった（無敵中でなければライフを減らす）"""
+        player = self.player
+        lives = player.lives
+        if player.hit():
+            self.end_game("shot")
+        if self.events is not None and player.lives != lives:
+            self.events.emit(PlayerHit, self.frame_count, player.x, player.y, player.lives)
+
+    def add_player_bullet(self, x, y):
+        """プレイヤーの弾を追加"""
+        self.player_bullets.append(self.pools[PlayerBullet].acquire(x, y))
+        if self.events is not None:
+            self.events.emit(ShotFired, self.frame_count, x, y, "player")
+
+    def add_enemy_bullet(self, x, y):
+        """敵の弾を追加（上限に達していれば出さない）"""
+        limit = self.max_enemy_bullets
+        if limit is not None and len(self.enemy_bullets) >= limit:
+            return
+        self.enemy_bullets.append(self.pools[EnemyBullet].acquire(x, y))
+        if self.events is not None:
+            self.events.emit(ShotFired, self.frame_count, x, y, "enemy")
+
+    def fire_special_weapon(self, special_type):
+        """必殺技を発射"""
+        if self.events is not None:
+            self.events.emit(ShotFired, self.frame_count,
+                             self.player.x + self.player.width // 2 - 2, self.player.y, "special")
+        if special_type == 0:  # 貫通弾
+            self.special_bullets.append(self.pools[PenetratingBullet].acquire(
+                self.player.x + self.player.width // 2 - 2,
+                self.player.y
+            ))
+        else:  # バウンス弾（角度を調整して発射）
+            # 左右に2発発射、より水平方向に近い角度で
+            pool = self.pools[BouncingBullet]
+            self.special_bullets.append(pool.acquire(
+                self.player.x + self.player.width // 2 - 2,
+                self.player.y,
+                -1.5  # より水平に近い角度（左方向）
+            ))
+            self.special_bullets.append(pool.acquire(
+                self.player.x + self.player.width // 2 - 2,
+                self.player.y,
+                1.5   # より水平に近い角度（右方向）
+            ))
+
+    def step(self, inputs=NO_INPUTS):
+        """入力を受けてゲームを1フレーム進める"""
+        if self.game_over:
+            return
+
+        self.inputs = inputs
+        self.frame_count += 1
+
+        if self.profiler is not None:  # 計測中は各処理の時間を記録する
+            self.profiler.run(self.phases)
+        else:
+            for _, phase in self.phases:
+                phase()
+
+        if self.events is not None:
+            self.events.dispatch()
+
+    def save_positions(self):
+        """補間描画のために今の位置を直前の位置として記録（step の前に呼ぶ）"""
+        for objects in ((self.player,), self.enemy_manager.enemies, self.player_bullets,
+                        self.enemy_bullets, self.special_bullets):
+            for obj in objects:
+                obj.prev_x = obj.x
+                obj.prev_y = obj.y
+
+    def update_player(self):
+        """プレイヤーの更新"""
+        self.player.update(self)
+
+    def update_enemies(self):
+        """敵の更新"""
+        manager = self.enemy_manager
+        waves_cleared = manager.waves_cleared
+        manager.update(self)
+        if self.events is not None and manager.waves_cleared != waves_cleared:
+            self.events.emit(WaveCleared, self.frame_count, manager.waves_cleared, manager.speed,
+                             manager.shoot_chance)
+
+    def update_bullets(self):
+        """弾の更新"""
+        for bullet in self.player_bullets:
+            bullet.update(self)
+
+        for bullet in self.enemy_bullets:
+            bullet.update(self)
+
+        for bullet in self.special_bullets:
+            bullet.update(self)
+
+    def collide_player_bullets(self):
+        """衝突判定（プレイヤーの弾と敵）"""
+        enemy_grid = self.enemy_grid
+        enemy_grid.prepare(self.enemy_manager.enemies,
+                           len(self.player_bullets) + len(self.special_bullets))
+        for bullet in self.player_bullets:
+            if not bullet.is_active:
+                continue
+
+            for enemy in enemy_grid.query(bullet):
+                if enemy.is_active and bullet.collides_with(enemy):
+                    bullet.is_active = False
+                    self.kill_enemy(enemy, bullet.points)
+                    break
+
+    def collide_special_bullets(self):
+        """衝突判定（必殺技の弾と敵）
+
+        グリッドは collide_player_bullets で作ったものを使う。
+        """
+        for bullet in self.special_bullets:
+            if not bullet.is_active:
+                continue
+
+            for enemy in self.enemy_grid.query(bullet):
+                if enemy.is_active and bullet.collides_with(enemy):
+                    self.kill_enemy(enemy, bullet.points)
+                    if not bullet.penetrate:  # 貫通弾でなければ消滅
+                        bullet.is_active = False
+                        break
+
+    def collide_enemy_bullets(self):
+        """衝突判定（敵の弾とプレイヤー）"""
+        enemy_bullet_grid = self.enemy_bullet_grid
+        enemy_bullet_grid.prepare(self.enemy_bullets, 1 + len(self.special_bullets))
+        for bullet in enemy_bullet_grid.query(self.player):
+            if bullet.is_active and bullet.collides_with(self.player):
+                bullet.is_active = False
+                self.hit_player()
+                break
+
+    def collide_special_and_enemy_bullets(self):
+        """衝突判定（必殺技の弾と敵の弾）
+
+        グリッドは collide_enemy_bullets で作ったものを使う。
+        """
+        for special in self.special_bullets:
+            if not special.is_active:
+                continue
+
+            for bullet in self.enemy_bullet_grid.query(special):
+                if bullet.is_active and special.collides_with(bullet):
+                    bullet.is_active = False
+                    if not special.penetrate:  # 貫通弾でなければ消滅
+                        special.is_active = False
+                        break
+
+    # collision="swept" の処理
+    #
+    # プレイヤーの弾と敵の弾はまっすぐ speed ずつ動くので、tick の始めの位置は今の位置から
+    # 求める。必殺技の弾は動き方が複雑なので、動かす前の位置を prev_x, prev_y に残しておく。
+    # 画面の外に出た弾もその tick に動いた範囲では当たるので、無効にするのは判定の後にする。
+
+    def update_bullets_swept(self):
+        """弾の更新（必殺技の弾は動かす前の位置を残し、画面の外に出た弾も判定まで残す）"""
+        for bullet in self.special_bullets:
+            bullet.prev_x = bullet.x
+            bullet.prev_y = bullet.y
+        self.update_leaving(self.player_bullets)
+        self.update_leaving(self.enemy_bullets)
+        self.update_leaving(self.special_bullets)
+
+    def update_leaving(self, bullets):
+        """弾を動かし、消えることになった弾は有効のまま leaving に入れる"""
+        leaving = self.leaving
+        for bullet in bullets:
+            bullet.update(self)
+            if not bullet.is_active:
+                bullet.is_active = True
+                leaving.append(bullet)
+
+    def sweep_player_bullets(self):
+        """衝突判定（プレイヤーの弾と敵、弾が動いた範囲で判定）"""
+        enemy_grid = self.enemy_grid
+        enemy_grid.prepare(self.enemy_manager.enemies,
+                           len(self.player_bullets) + len(self.special_bullets))
+        for bullet in self.player_bullets:
+            if not bullet.is_active:
+                continue
+
+            # 弾は上にまっすぐ speed 動いたので、動いた範囲は今の矩形を下に speed 伸ばした矩形
+            x, y, width = bullet.x, bullet.y, bullet.width
+            bottom = y + bullet.height + self.player_bullet_speed
+            first = None
+            for enemy in enemy_grid.query_rect(x, y, width, bottom - y):
+                if (enemy.is_active and x < enemy.x + enemy.width and x + width > enemy.x and
+                        y < enemy.y + enemy.height and bottom > enemy.y):
+                    # 上に進む弾が最初に当たるのは下端が一番下の敵
+                    if first is None or enemy.y + enemy.height > first.y + first.height:
+                        first = enemy
+            if first is not None:
+                bullet.is_active = False
+                self.kill_enemy(first, bullet.points)
+
+    def swept_hits(self, bullet, grid):
+        """必殺技の弾がこの tick に動いた範囲で重なる grid の有効なオブジェクトを当たった順に返す"""
+        x0, y0 = bullet.prev_x, bullet.prev_y
+        dx, dy = bullet.x - x0, bullet.y - y0
+        width, height = bullet.width, bullet.height
+        # 動いた範囲を囲む矩形と重なるものだけ時刻を求める
+        left = x0 if dx > 0 else bullet.x
+        top = y0 if dy > 0 else bullet.y
+        right = left + width + abs(dx)
+        bottom = top + height + abs(dy)
+        hits = []
+        for target in grid.query_rect(left, top, right - left, bottom - top):
+            if (target.is_active and left < target.x + target.width and right > target.x and
+                    top < target.y + target.height and bottom > target.y):
+                time = sweep(x0, y0, dx, dy, width, height,
+                             target.x, target.y, target.width, target.height)
+                if time != NO_HIT:
+                    hits.append((time, target))
+        if len(hits) > 1:
+            hits.sort(key=itemgetter(0))
+        return [target for _, target in hits]
+
+    def sweep_special_bullets(self):
+        """衝突判定（必殺技の弾と敵、弾が動いた範囲で判定）
+
+        グリッドは sweep_player_bullets で作ったものを使う。
+        """
+        for bullet in self.special_bullets:
+            if not bullet.is_active:
+                continue
+
+            for enemy in self.swept_hits(bullet, self.enemy_grid):
+                self.kill_enemy(enemy, bullet.points)
+                if not bullet.penetrate:  # 貫通弾でなければ消滅
+                    bullet.is_active = False
+                    break
+
+    def sweep_enemy_bullets(self):
+        """衝突判定（敵の弾とプレイヤー、弾が動いた範囲で判定）"""
+        player = self.player
+        x, y, width, height = player.x, player.y, player.width, player.height
+        enemy_bullet_grid = self.enemy_bullet_grid
+        enemy_bullet_grid.prepare(self.enemy_bullets, 1 + len(self.special_bullets))
+        # 敵の弾は下にまっすぐ speed 動いたので、動いた範囲は今の矩形を上に speed 伸ばした矩形。
+        # 候補はプレイヤーの矩形を下に伸ばした範囲にある
+        speed = self.enemy_bullet_speed
+        first = None
+        for bullet in enemy_bullet_grid.query_rect(x, y, width, height + speed):
+            if (bullet.is_active and bullet.x < x + width and bullet.x + bullet.width > x and
+                    bullet.y - speed < y + height and bullet.y + bullet.height > y):
+                # 下に進む弾が最初に当たるのは下端が一番下の弾
+                if first is None or bullet.y + bullet.height > first.y + first.height:
+                    first = bullet
+        if first is not None:
+            first.is_active = False
+            self.hit_player()
+
+    def sweep_special_and_enemy_bullets(self):
+        """衝突判定（必殺技の弾と敵の弾、必殺技の弾が動いた範囲で判定）
+
+        グリッドは sweep_enemy_bullets で作ったものを使う。
+        """
+        for special in self.special_bullets:
+            if not special.is_active:
+                continue
+
+            for bullet in self.swept_hits(special, self.enemy_bullet_grid):
+                bullet.is_active = False
+                if not special.penetrate:  # 貫通弾でなければ消滅
+                    special.is_active = False
+                    break
+
+    def remove_inactive_swept(self):
+        """不要なオブジェクトの削除（判定まで残していた弾をここで無効にする）"""
+        for bullet in self.leaving:
+            bullet.is_active = False
+        self.leaving.clear()
+        self.remove_inactive()
+
+    def remove_inactive(self):
+        """不要なオブジェクトの削除（リストはその場で詰め、弾はプールに戻す）"""
+        compact(self.player_bullets, self.pools[PlayerBullet].release)
+        compact(self.enemy_bullets, self.pools[EnemyBullet].release)
+        compact(self.special_bullets, self.release_bullet)
+
+    def fire(self):
+        """連射機能（SPACEキーを押し続けると一定間隔で発射）"""
+        if self.inputs.space and self.player.bullet_cooldown <= 0:
+            bullet_x = self.player.x + self.player.width // 2 - 1
+            self.add_player_bullet(bullet_x, self.player.y)
+            self.player.bullet_cooldown = self.fire_cooldown
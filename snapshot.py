@@ -0,0 +1,335 @@
+"""ゲームの状態のスナップショット（保存・読み込みと複製）
+
+Simulation の状態（プレイヤー、敵の隊列と難易度、敵の発射予定、全部の弾のリスト、
+乱数生成器の状態、タイマー）を1つのバイト列にまとめる。数値は種類ごとに
+array に並べて tobytes するので、作るのも戻すのも数十マイクロ秒で済む。
+巻き戻しや探索するボットのための複製（clone）、ゲームの途中からの再開（save / load）に使う。
+
+バイト列はヘッダ、設定（enemy_settings と rules の JSON）、各リストの長さ、数値の配列の順に並ぶ。
+ゲームのルールと弾のプールはスナップショットに含めないので、戻したゲームは
+同じバージョンのコードで、スナップショットを作ったゲームと同じように進む。
+
+    python snapshot.py --frames 600       # 600フレーム進めた状態で作る・戻す時間を計測
+"""
+import json
+import struct
+import sys
+import time
+from array import array
+from operator import attrgetter
+
+from simulation import (BouncingBullet, Enemy, EnemyBullet, EnemyManager, Inputs,
+                        PenetratingBullet, PlayerBullet, Simulation)
+
+MAGIC = b"INVS"
+# スナップショットに入れる状態（下の *_FIELDS やその並び）が変わったら上げる
+# （2: 設定の JSON に rules を加えた）
+VERSION = 2
+
+# マジック, バージョン, 画面の幅, 高さ, 当たり判定の方式, 敵の弾の上限（-1 は上限なし）,
+# seed, 設定の JSON のバイト数（リトルエンディアン）
+HEADER = struct.Struct("<4sBHHBiQI")
+# 敵, 発射予定, プレイヤーの弾, 敵の弾, 必殺技の弾の数
+COUNTS = struct.Struct("<5I")
+
+# random.Random の内部状態（メルセンヌ・ツイスタの624語と位置）
+RNG_STATE_SIZE = 625
+
+DEATH_CAUSES = (None, "shot", "invasion")
+SPECIAL_TYPES = (PenetratingBullet, BouncingBullet)
+
+# 1つずつ保存する値（すべて float の配列に入れ、戻すときに型を直す）
+GAME_FIELDS = (("score", int), ("frame_count", int))
+PLAYER_FIELDS = (
+    ("x", float), ("y", float), ("prev_x", float), ("prev_y", float), ("is_active", bool),
+    ("bullet_cooldown", int), ("lives", int), ("invincible", bool),
+    ("invincible_timer", int), ("blink_timer", int), ("special_charge", int),
+    ("special_charging", bool), ("special_cooldown", int), ("special_type", int),
+)
+MANAGER_FIELDS = (("move_dir", int), ("speed", float), ("shoot_chance", float),
+                  ("waves_cleared", int))
+
+# オブジェクトごとに保存する値
+ENEMY_FIELDS = ("x", "y", "prev_x", "prev_y", "is_active", "shoot_chance", "enemy_type",
+                "column", "row")
+BULLET_FIELDS = ("x", "y", "prev_x", "prev_y", "is_active")
+SPECIAL_FIELDS = BULLET_FIELDS + ("bounce_count", "dx", "dy")
+
+
+class SnapshotError(ValueError):
+    """スナップショットのデータが壊れているか形式が違う"""
+
+
+def _columns(objects, fields):
+    """オブジェクトの値を値の種類ごとにまとめて1つの float の配列に並べる"""
+    values = array("d")
+    for name in fields:
+        values.extend(map(attrgetter(name), objects))
+    return values
+
+
+def _split(values, count):
+    """_columns で並べた配列を値の種類ごとの配列に分ける"""
+    return [values[start:start + count] for start in range(0, len(values), count)] if count else []
+
+
+def dumps(sim):
+    """Simulation の状態をバイト列にする"""
+    if type(sim) is not Simulation:
+        raise TypeError(f"snapshot supports Simulation only, not {type(sim).__name__}")
+    manager = sim.enemy_manager
+    scheduler = manager.fire_scheduler
+    player = sim.player
+
+    # 1つずつの値（最後の3つは入力、ゲームオーバーの原因、乱数の gauss_next）
+    _, internal, gauss_next = sim.rng.getstate()
+    scalars = array("d", [getattr(sim, name) for name, _ in GAME_FIELDS])
+    scalars.extend([getattr(player, name) for name, _ in PLAYER_FIELDS])
+    scalars.extend([getattr(manager, name) for name, _ in MANAGER_FIELDS])
+    scalars.extend((scheduler.frame, sim.inputs.to_mask(), sim.game_over,
+                    DEATH_CAUSES.index(sim.death_cause),
+                    float("nan") if gauss_next is None else gauss_next))
+
+    # 発射予定のキューはヒープの並びのまま（撃つフレーム, 並び順）を入れる
+    # （並び順は shooters の添字で、shooters は敵のリストと同じ並び）
+    queue = array("q", [value for frame, order, _ in scheduler.queue for value in (frame, order)])
+    # 必殺技の弾は貫通弾にない dx, dy を0にし、最後に弾の種類を並べる
+    specials = sim.special_bullets
+    special_values = _columns(specials, SPECIAL_FIELDS[:-2])
+    special_values.extend([getattr(bullet, "dx", 0) for bullet in specials])
+    special_values.extend([getattr(bullet, "dy", 0) for bullet in specials])
+    special_values.extend([SPECIAL_TYPES.index(type(bullet)) for bullet in specials])
+
+    settings = json.dumps({"enemy_settings": sim.enemy_settings, "rules": sim.rules},
+                          separators=(",", ":")).encode()
+    max_enemy_bullets = -1 if sim.max_enemy_bullets is None else sim.max_enemy_bullets
+    return b"".join((
+        HEADER.pack(MAGIC, VERSION, sim.WIDTH, sim.HEIGHT,
+                    Simulation.COLLISION_MODES.index(sim.collision), max_enemy_bullets,
+                    sim.seed, len(settings)),
+        settings,
+        COUNTS.pack(len(manager.enemies), len(scheduler.queue), len(sim.player_bullets),
+                    len(sim.enemy_bullets), len(specials)),
+        scalars.tobytes(),
+        array("I", internal).tobytes(),
+        queue.tobytes(),
+        _columns(manager.enemies, ENEMY_FIELDS).tobytes(),
+        _columns(sim.player_bullets, BULLET_FIELDS).tobytes(),
+        _columns(sim.enemy_bullets, BULLET_FIELDS).tobytes(),
+        special_values.tobytes(),
+    ))
+
+
+class _Reader:
+    """バイト列から順に配列を読み出す"""
+    def __init__(self, data, offset):
+        self.data = memoryview(data)
+        self.offset = offset
+
+    def read(self, typecode, count):
+        values = array(typecode)
+        end = self.offset + values.itemsize * count
+        if end > len(self.data):
+            raise SnapshotError("スナップショットのデータが足りません")
+        values.frombytes(self.data[self.offset:end])
+        self.offset = end
+        return values
+
+
+def _read_header(data):
+    """ヘッダと設定を読み、(ヘッダの値, 設定の辞書, 続きの位置) を返す"""
+    if len(data) < HEADER.size:
+        raise SnapshotError("スナップショットのヘッダが足りません")
+    header = HEADER.unpack_from(data)
+    magic, version = header[:2]
+    if magic != MAGIC:
+        raise SnapshotError("スナップショットのデータではありません")
+    if version != VERSION:
+        raise SnapshotError(f"対応していないスナップショットのバージョンです: {version}")
+    start = HEADER.size
+    end = start + header[-1]
+    try:
+        settings = json.loads(bytes(data[start:end]))
+    except ValueError:
+        settings = None
+    if not isinstance(settings, dict) or settings.keys() != {"enemy_settings", "rules"}:
+        raise SnapshotError("スナップショットの設定が読めません")
+    return header, settings, end
+
+
+def _spawn(sim, objects, cls, values, count):
+    """プールから弾を取り出して値を戻し、objects に加える"""
+    acquire = sim.pools[cls].acquire
+    for x, y, prev_x, prev_y, active in zip(*_split(values, count)):
+        bullet = acquire(x, y)
+        bullet.prev_x = prev_x
+        bullet.prev_y = prev_y
+        bullet.is_active = bool(active)
+        objects.append(bullet)
+
+
+def restore(sim, data):
+    """スナップショットの状態を sim に戻す（sim は同じ画面の大きさと設定で作ったもの）
+
+    今の弾はプールに戻し、弾はプールから取り出し直す。敵と EnemyManager は作り直す。
+    """
+    header, settings, offset = _read_header(data)
+    _, _, width, height, collision, max_enemy_bullets, seed, _ = header
+    if (width, height) != (sim.WIDTH, sim.HEIGHT):
+        raise SnapshotError(f"画面の大きさが違います: {width}x{height}")
+    if Simulation.COLLISION_MODES[collision] != sim.collision:
+        raise SnapshotError(f"当たり判定の方式が違います: {Simulation.COLLISION_MODES[collision]}")
+    if settings["rules"] != sim.rules:
+        raise SnapshotError("プレイヤーと弾のルールが違います")
+    if COUNTS.size > len(data) - offset:
+        raise SnapshotError("スナップショットのデータが足りません")
+    enemy_count, queue_count, player_count, enemy_bullet_count, special_count = \
+        COUNTS.unpack_from(data, offset)
+
+    reader = _Reader(data, offset + COUNTS.size)
+    scalar_count = len(GAME_FIELDS) + len(PLAYER_FIELDS) + len(MANAGER_FIELDS) + 5
+    scalars = reader.read("d", scalar_count)
+    internal = reader.read("I", RNG_STATE_SIZE)
+    queue = reader.read("q", queue_count * 2)
+    enemy_values = reader.read("d", enemy_count * len(ENEMY_FIELDS))
+    player_values = reader.read("d", player_count * len(BULLET_FIELDS))
+    enemy_bullet_values = reader.read("d", enemy_bullet_count * len(BULLET_FIELDS))
+    special_values = reader.read("d", special_count * (len(SPECIAL_FIELDS) + 1))
+    if reader.offset != len(data):
+        raise SnapshotError("スナップショットのデータが余っています")
+
+    # ゲーム全体とプレイヤー
+    sim.seed = seed
+    sim.enemy_settings = settings = settings["enemy_settings"]
+    sim.max_enemy_bullets = None if max_enemy_bullets < 0 else max_enemy_bullets
+    values = iter(scalars)
+    for name, kind in GAME_FIELDS:
+        setattr(sim, name, kind(next(values)))
+    player = sim.player
+    for name, kind in PLAYER_FIELDS:
+        setattr(player, name, kind(next(values)))
+    manager_values = [(name, kind(next(values))) for name, kind in MANAGER_FIELDS]
+    scheduler_frame, mask, game_over, death_cause, gauss_next = values
+    sim.inputs = Inputs.from_mask(int(mask))
+    sim.game_over = bool(game_over)
+    sim.death_cause = DEATH_CAUSES[int(death_cause)]
+    sim.rng.setstate((3, tuple(internal), None if gauss_next != gauss_next else gauss_next))
+
+    # 敵の隊列と発射予定（EnemyManager を作り直し、端や生きている数は数え直す）
+    manager = EnemyManager(sim.WIDTH, sim.HEIGHT, sim.rng, **settings)
+    for name, value in manager_values:
+        setattr(manager, name, value)
+    enemies = []
+    for x, y, prev_x, prev_y, active, shoot_chance, enemy_type, column, row in \
+            zip(*_split(enemy_values, enemy_count)):
+        enemy = Enemy(x, y, int(enemy_type), int(column), int(row))
+        enemy.prev_x = prev_x
+        enemy.prev_y = prev_y
+        enemy.is_active = bool(active)
+        enemy.shoot_chance = shoot_chance
+        enemies.append(enemy)
+    manager.enemies = enemies
+    manager.track_formation()
+    scheduler = manager.fire_scheduler
+    scheduler.frame = int(scheduler_frame)
+    scheduler.shooters = list(enemies)
+    scheduler.queue = [(queue[i], queue[i + 1], enemies[queue[i + 1]])
+                       for i in range(0, len(queue), 2)]
+    sim.enemy_manager = manager
+
+    # 弾（今の弾はプールに戻してから取り出し直す）
+    for bullets in (sim.player_bullets, sim.enemy_bullets, sim.special_bullets):
+        for bullet in bullets:
+            sim.release_bullet(bullet)
+        bullets.clear()
+    _spawn(sim, sim.player_bullets, PlayerBullet, player_values, player_count)
+    _spawn(sim, sim.enemy_bullets, EnemyBullet, enemy_bullet_values, enemy_bullet_count)
+    _restore_specials(sim, special_values, special_count)
+
+
+def _restore_specials(sim, values, count):
+    """必殺技の弾を戻す（dumps と同じく dx, dy と弾の種類は最後に並んでいる）"""
+    pools = sim.pools
+    for x, y, prev_x, prev_y, active, bounce_count, dx, dy, kind in \
+            zip(*_split(values, count)):
+        cls = SPECIAL_TYPES[int(kind)]
+        if cls is BouncingBullet:
+            bullet = pools[cls].acquire(x, y, dx)
+            bullet.dy = dy
+        else:
+            bullet = pools[cls].acquire(x, y)
+        bullet.prev_x = prev_x
+        bullet.prev_y = prev_y
+        bullet.is_active = bool(active)
+        bullet.bounce_count = int(bounce_count)
+        sim.special_bullets.append(bullet)
+
+
+def loads(data):
+    """バイト列から新しい Simulation を作る"""
+    header, settings, _ = _read_header(data)
+    _, _, width, height, collision, max_enemy_bullets, seed, _ = header
+    sim = Simulation(width, height, seed, settings["enemy_settings"],
+                     None if max_enemy_bullets < 0 else max_enemy_bullets,
+                     Simulation.COLLISION_MODES[collision], settings["rules"])
+    restore(sim, data)
+    return sim
+
+
+def clone(sim):
+    """sim と同じ状態の新しい Simulation を作る（元の sim とは何も共有しない）"""
+    return loads(dumps(sim))
+
+
+def save(sim, path):
+    """Simulation の状態をファイルに保存"""
+    with open(path, "wb") as f:
+        f.write(dumps(sim))
+
+
+def load(path):
+    """ファイルに保存した状態から新しい Simulation を作る"""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def main():
+    """決まった seed と方策で進めたゲームで、スナップショットを作る・戻す時間を計測"""
+    import argparse
+
+    from policies import create_policy
+    from stages import STAGES
+
+    parser = argparse.ArgumentParser(description="スナップショットの大きさと時間を計測")
+    parser.add_argument("--stage", default="classic", choices=sorted(STAGES))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--frames", type=int, default=600, help="計測の前に進めるフレーム数")
+    parser.add_argument("--runs", type=int, default=1000, help="計測の繰り返し回数")
+    parser.add_argument("--save", metavar="PATH", help="作ったスナップショットを保存するファイル")
+    args = parser.parse_args()
+
+    sim = Simulation.from_stage(STAGES[args.stage], args.seed)
+    policy = create_policy("tracker", args.seed)
+    while sim.frame_count < args.frames and not sim.game_over:
+        sim.step(policy(sim))
+    data = dumps(sim)
+    if args.save:
+        save(sim, args.save)
+
+    def per_call(func, *func_args):
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            func(*func_args)
+        return (time.perf_counter() - start) / args.runs * 1e6
+
+    target = Simulation.from_stage(STAGES[args.stage], args.seed)
+    print(f"{args.stage} frame {sim.frame_count}: {len(data)} bytes, "
+          f"{len(sim.enemy_manager.enemies)} enemies, "
+          f"{len(sim.player_bullets) + len(sim.enemy_bullets) + len(sim.special_bullets)} bullets")
+    print(f"dumps   {per_call(dumps, sim):8.1f} us")
+    print(f"restore {per_call(restore, target, data):8.1f} us")
+    print(f"clone   {per_call(clone, sim):8.1f} us")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
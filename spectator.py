@@ -0,0 +1,361 @@
+"""ネットワーク越しにゲームを観戦するサーバーとクライアント
+
+サーバーは asyncio のループの中で Simulation を方策（policies.py）で進め、tick ごとに
+statestream の差分のフレームを1回だけ作って、つながっているすべての観戦者に同じ
+バイト列を送る。1つのプロセスで多くの観戦者に配信できる。
+
+- 途中からつないだ観戦者には、最初にキーフレーム（すべてのエンティティ）を送る
+- 送信が追いつかない観戦者（送信バッファが max_buffer を超えた）にはフレームを送らず、
+  バッファが減ったらキーフレームから送り直す（遅い観戦者のために他を待たせない）
+- ゲームオーバーになったら GAME_OVER_TICKS だけ止めてから新しいゲームを始め、全員に
+  キーフレームを送る
+
+フレームは4バイトの長さ（リトルエンディアン）の後にフレームの本体を続けて送る。
+観戦者からは何も送らない。
+
+    python spectator.py serve --port 8765 --stage classic
+    python spectator.py watch --port 8765
+    python spectator.py bench --clients 1,10,100 --ticks 600   # ローカルの負荷計測
+
+bench はサーバーを同じプロセスで、観戦者を子プロセスで動かし、1tick あたりの
+送信バイト数と、観戦者1人あたりのサーバーの CPU 時間を表示する。
+"""
+import argparse
+import asyncio
+import json
+import struct
+import sys
+import time
+
+from policies import POLICIES, create_policy
+from simulation import Simulation
+from stages import STAGES
+from statestream import GROUPS, StateEncoder, StreamState, visible_groups
+from timestep import TICK_RATE
+
+LENGTH = struct.Struct("<I")  # フレームの長さ
+MAX_BUFFER = 256 * 1024  # 観戦者ごとの送信バッファの上限（バイト）
+BACKLOG = 1024  # 同時につなぎに来る観戦者の数の上限（多くの観戦者が一度につなぐため）
+GAME_OVER_TICKS = 3 * TICK_RATE  # ゲームオーバーの画面を見せる tick 数
+
+
+class Spectator:
+    """サーバーにつながっている観戦者"""
+    def __init__(self, writer):
+        self.writer = writer
+        self.needs_keyframe = True  # 次はキーフレームを送る
+        self.skipped = 0  # 送信が追いつかずに送らなかったフレームの数
+
+
+class SpectatorServer:
+    """Simulation を進めて観戦者にフレームを配信する"""
+    def __init__(self, sim, policy, tick_rate=TICK_RATE, max_buffer=MAX_BUFFER):
+        self.sim = sim
+        self.policy = policy
+        self.tick_rate = tick_rate
+        self.max_buffer = max_buffer
+        self.encoder = StateEncoder()
+        self.spectators = set()
+        self.server = None
+        self.last_tick = None  # 最後に送ったフレームの tick
+        self.game_over_ticks = 0
+
+        # 計測用（bench）
+        self.ticks = 0
+        self.delta_bytes = 0  # 差分のフレームの合計バイト数
+        self.keyframes = 0  # 送ったキーフレームの数
+        self.keyframe_bytes = 0
+        self.sent_bytes = 0  # 観戦者全員に送った合計バイト数
+        self.sim_time = 0.0  # Simulation を進めた時間（秒）
+        self.encode_time = 0.0  # フレームを作った時間（秒）
+        self.send_time = 0.0  # 観戦者に書き込んだ時間（秒）
+
+    async def start(self, host="127.0.0.1", port=0):
+        """接続の受け付けを始めて、待ち受けているポートを返す"""
+        self.server = await asyncio.start_server(self.handle, host, port, backlog=BACKLOG)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        """1人の観戦者の接続（切れるまで待つ）"""
+        spectator = Spectator(writer)
+        self.spectators.add(spectator)
+        try:
+            while await reader.read(1024):  # 観戦者からは何も来ない
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.spectators.discard(spectator)
+            writer.close()
+
+    def tick(self):
+        """ゲームを1tick 進めて、観戦者にフレームを送る"""
+        sim = self.sim
+        if sim.game_over:
+            self.game_over_ticks += 1
+            if self.game_over_ticks < GAME_OVER_TICKS:
+                return  # 何も変わらないので送らない
+            self.game_over_ticks = 0
+            sim.reset()
+
+        start = time.perf_counter()
+        sim.step(self.policy(sim))
+        encoded = time.perf_counter()
+        delta = self.encoder.encode(sim)
+        frame = LENGTH.pack(len(delta)) + delta
+        # 新しいゲームになったら差分ではつながらないので全員にキーフレームを送る
+        restarted = sim.frame_count != (self.last_tick or 0) + 1
+        self.last_tick = sim.frame_count
+        keyframe = None
+        sending = time.perf_counter()
+
+        sent = 0
+        for spectator in self.spectators:
+            writer = spectator.writer
+            if writer.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                spectator.needs_keyframe = True
+                spectator.skipped += 1
+                continue
+            if spectator.needs_keyframe or restarted:
+                if keyframe is None:
+                    body = self.encoder.keyframe(sim)
+                    keyframe = LENGTH.pack(len(body)) + body
+                self.keyframes += 1
+                self.keyframe_bytes += len(keyframe)
+                spectator.needs_keyframe = False
+                writer.write(keyframe)
+                sent += len(keyframe)
+            else:
+                writer.write(frame)
+                sent += len(frame)
+
+        end = time.perf_counter()
+        self.ticks += 1
+        self.delta_bytes += len(frame)
+        self.sent_bytes += sent
+        self.sim_time += encoded - start
+        self.encode_time += sending - encoded
+        self.send_time += end - sending
+
+    async def run(self, ticks=None):
+        """tick_rate で ticks 回（None なら止めるまで）ゲームを進める"""
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        next_time = loop.time()
+        count = 0
+        while ticks is None or count < ticks:
+            self.tick()
+            count += 1
+            next_time += interval
+            delay = next_time - loop.time()
+            if delay < 0:  # 遅れた分は取り戻さない
+                next_time = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def wait_spectators(self, count, timeout=10.0):
+        """count 人の観戦者がつながるまで待つ"""
+        deadline = time.monotonic() + timeout
+        while len(self.spectators) < count:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{count} 人の観戦者がつながりません（{len(self.spectators)} 人）")
+            await asyncio.sleep(0.01)
+
+    async def close(self):
+        """観戦者との接続を閉じて受け付けを終える（送信待ちのフレームは送ってから閉じる）"""
+        for spectator in list(self.spectators):
+            spectator.writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def spectate(host, port, on_frame=None, decode=True):
+    """サーバーにつないで、切れるまでフレームを受け取る
+
+    フレームを反映するたびに on_frame(state) を呼ぶ。decode が False ならフレームを
+    反映せずに読み捨てる（bench の負荷用）。(StreamState, 受け取ったフレーム数, バイト数) を返す。
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    state = StreamState()
+    frames = 0
+    received = 0
+    try:
+        while True:
+            try:
+                size, = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+                data = await reader.readexactly(size)
+            except asyncio.IncompleteReadError:
+                break  # サーバーが閉じた
+            frames += 1
+            received += LENGTH.size + size
+            if decode and state.apply(data) and on_frame is not None:
+                on_frame(state)
+    finally:
+        writer.close()
+    return state, frames, received
+
+
+def summary(state):
+    """状態の要約（bench でサーバーと観戦者の状態を比べる）"""
+    return {"tick": state.tick, "score": state.score, "lives": state.lives,
+            "counts": [len(state.positions(group)) for group in GROUPS]}
+
+
+def sim_summary(sim):
+    return {"tick": sim.frame_count, "score": sim.score, "lives": sim.player.lives,
+            "counts": [len(objects) for objects in visible_groups(sim)]}
+
+
+async def serve(args):
+    sim = Simulation.from_stage(STAGES[args.stage], args.seed)
+    server = SpectatorServer(sim, create_policy(args.policy, args.seed), args.tick_rate)
+    port = await server.start(args.host, args.port)
+    print(f"{args.host}:{port} で観戦を受け付けています（{args.stage}, {args.policy}）")
+    try:
+        await server.run()
+    finally:
+        await server.close()
+
+
+async def watch(args):
+    """count 本の接続で観戦する（1本目だけ状態を表示する）"""
+    last_print = [0.0]
+
+    def show(state):
+        now = time.monotonic()
+        if now - last_print[0] >= 1.0:
+            last_print[0] = now
+            counts = ", ".join(f"{group} {len(state.positions(group))}" for group in GROUPS)
+            print(f"tick {state.tick} score {state.score} lives {state.lives}: {counts}",
+                  flush=True)
+
+    tasks = [spectate(args.host, args.port, show if i == 0 and not args.json else None,
+                      decode=i < args.decoders)
+             for i in range(args.count)]
+    results = await asyncio.gather(*tasks)
+    if args.json:
+        print(json.dumps([dict(summary(state), frames=frames, bytes=received,
+                               decoded=i < args.decoders)
+                          for i, (state, frames, received) in enumerate(results)]))
+
+
+async def bench_one(args, clients):
+    """観戦者 clients 人で ticks だけ配信して計測結果を返す"""
+    sim = Simulation.from_stage(STAGES[args.stage], args.seed)
+    server = SpectatorServer(sim, create_policy(args.policy, args.seed), args.tick_rate)
+    port = await server.start()
+    process = None
+    if clients:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, __file__, "watch", "--port", str(port), "--count", str(clients),
+            "--decoders", str(min(args.decoders, clients)), "--json",
+            stdout=asyncio.subprocess.PIPE)
+    try:
+        await server.wait_spectators(clients)
+        cpu = time.process_time()
+        await server.run(args.ticks)
+        cpu = time.process_time() - cpu
+        expected = sim_summary(sim)
+    except BaseException:
+        if process is not None:
+            process.kill()
+        raise
+    finally:
+        await server.close()
+    results = []
+    if process is not None:
+        output, _ = await process.communicate()
+        results = json.loads(output)
+
+    # 状態を組み立てた観戦者は、最後の状態がサーバーと同じになるはず
+    mismatched = sum(1 for result in results
+                     if result["decoded"] and
+                     {name: result[name] for name in expected} != expected)
+    ticks = server.ticks
+    return {
+        "clients": clients,
+        "ticks": ticks,
+        "bytes_per_tick": server.delta_bytes / ticks,
+        "keyframe_bytes": server.keyframe_bytes / max(server.keyframes, 1),
+        "sent_per_tick": server.sent_bytes / ticks,
+        "cpu_ms_per_tick": cpu / ticks * 1000,
+        "sim_ms_per_tick": server.sim_time / ticks * 1000,
+        "encode_ms_per_tick": server.encode_time / ticks * 1000,
+        "send_us_per_client": server.send_time / ticks / max(clients, 1) * 1e6,
+        "skipped": sum(result["frames"] < ticks for result in results),
+        "mismatched": mismatched,
+    }
+
+
+async def bench(args):
+    """観戦者0人の CPU 時間を基準にして、観戦者の数ごとに計測する
+
+    us/client は Simulation とフレームを作る時間を除いたサーバーの CPU 時間が観戦者0人の
+    ときから増えた分を観戦者の数で割ったもの、send us は観戦者への書き込みの時間。
+    """
+    print(f"{args.stage}, {args.policy}, {args.ticks} ticks at {args.tick_rate} Hz")
+    print(f"{'clients':>7} {'B/tick':>8} {'key B':>8} {'sent/tick':>10} {'cpu ms':>7} "
+          f"{'sim ms':>7} {'enc ms':>7} {'us/client':>9} {'send us':>7} {'behind':>6} "
+          f"{'bad':>4}")
+    base = None
+    for clients in [0] + [clients for clients in args.clients if clients]:
+        result = await bench_one(args, clients)
+        network = (result["cpu_ms_per_tick"] - result["sim_ms_per_tick"] -
+                   result["encode_ms_per_tick"])
+        if base is None:
+            base = network
+            per_client = 0.0
+        else:
+            per_client = (network - base) / clients * 1000
+        print(f"{result['clients']:>7} {result['bytes_per_tick']:>8.1f} "
+              f"{result['keyframe_bytes']:>8.0f} {result['sent_per_tick']:>10.0f} "
+              f"{result['cpu_ms_per_tick']:>7.3f} {result['sim_ms_per_tick']:>7.3f} "
+              f"{result['encode_ms_per_tick']:>7.3f} {per_client:>9.2f} "
+              f"{result['send_us_per_client']:>7.2f} {result['skipped']:>6} "
+              f"{result['mismatched']:>4}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ゲームの観戦サーバーとクライアント")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    game = argparse.ArgumentParser(add_help=False)
+    game.add_argument("--stage", default="classic", choices=sorted(STAGES))
+    game.add_argument("--policy", default="tracker", choices=sorted(POLICIES),
+                      help="ゲームを進める方策")
+    game.add_argument("--seed", type=int, default=None)
+    game.add_argument("--tick-rate", type=int, default=TICK_RATE, help="1秒あたりの tick 数")
+
+    command = commands.add_parser("serve", parents=[game], help="観戦サーバーを動かす")
+    command.add_argument("--host", default="127.0.0.1")
+    command.add_argument("--port", type=int, default=8765)
+
+    command = commands.add_parser("watch", help="観戦する（状態を1秒ごとに表示）")
+    command.add_argument("--host", default="127.0.0.1")
+    command.add_argument("--port", type=int, default=8765)
+    command.add_argument("--count", type=int, default=1, help="接続の数")
+    command.add_argument("--decoders", type=int, default=1,
+                         help="状態を組み立てる接続の数（残りは読み捨てる）")
+    command.add_argument("--json", action="store_true", help="終わったら結果を JSON で表示")
+
+    command = commands.add_parser("bench", parents=[game],
+                                  help="ローカルで観戦者をつないで負荷を計測")
+    command.add_argument("--clients", default="1,10,100",
+                         type=lambda text: [int(value) for value in text.split(",")],
+                         help="観戦者の数（カンマ区切りで複数）")
+    command.add_argument("--ticks", type=int, default=600)
+    command.add_argument("--decoders", type=int, default=4,
+                         help="状態を組み立てて確かめる観戦者の数（残りは読み捨てる）")
+    command.set_defaults(seed=1, tick_rate=60)
+
+    args = parser.parse_args()
+    try:
+        asyncio.run({"serve": serve, "watch": watch, "bench": bench}[args.command](args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
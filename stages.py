@@ -0,0 +1,99 @@
+"""ステージの設定
+
+画面の大きさ、敵の隊列（行数・列数・間隔・敵の種類）、敵の速度と発射確率、
+敵の弾の上限、プレイヤーと弾のルール（ライフ、速さ、連射の間隔）をまとめたもの。
+組み込みのステージは STAGES にあり、JSON ファイルに同じキーを書いて読み込むこともできる。
+
+    sim = Simulation.from_stage(load_stage("stress"), seed=0)
+    python3 invaders_game_oop.py --stage stress
+    python3 -m benchmarks.suite --stage my_stage.json
+
+"stress" は大きな画面に数千体の敵と弾を出し、当たり判定・更新・描画の処理が
+数の増加に耐えられるかを確かめるためのステージ。
+"""
+from atlas import ENEMY_SPRITES
+
+# EnemyManager の引数になるキー
+ENEMY_KEYS = ("speed", "shoot_chance", "speed_step", "shoot_chance_step",
+              "rows", "columns", "origin_x", "origin_y", "spacing_x", "spacing_y",
+              "enemy_types", "drop")
+# Simulation の rules になるキー（既定値は Simulation.RULES）
+RULE_KEYS = ("lives", "player_speed", "fire_cooldown", "player_bullet_speed",
+             "enemy_bullet_speed", "enemy_bullet_offset")
+
+
+class Stage:
+    """ステージの設定
+
+    キーワード引数は ENEMY_KEYS と RULE_KEYS と width, height, max_enemy_bullets。
+    """
+    def __init__(self, name, width=160, height=120, max_enemy_bullets=None, **settings):
+        unknown = sorted(set(settings) - set(ENEMY_KEYS) - set(RULE_KEYS))
+        if unknown:
+            raise ValueError(f"unknown stage setting: {', '.join(unknown)}")
+        enemy_types = settings.get("enemy_types", (0,))
+        invalid = [enemy_type for enemy_type in enemy_types
+                   if type(enemy_type) is not int or not 0 <= enemy_type < len(ENEMY_SPRITES)]
+        if invalid or not enemy_types:
+            raise ValueError(f"invalid enemy_types: {list(enemy_types)} "
+                             f"(use 0 to {len(ENEMY_SPRITES) - 1})")
+        self.name = name
+        self.width = width
+        self.height = height
+        self.max_enemy_bullets = max_enemy_bullets  # 画面に出せる敵の弾の数（None は無制限）
+        self.enemy_settings = {key: value for key, value in settings.items()
+                               if key in ENEMY_KEYS}
+        self.rules = {key: value for key, value in settings.items() if key in RULE_KEYS}
+
+    @classmethod
+    def from_dict(cls, data, name=None):
+        """辞書（JSON）からステージを作る"""
+        data = dict(data)
+        name = data.pop("name", name)
+        if "enemy_types" in data:
+            data["enemy_types"] = tuple(data["enemy_types"])
+        return cls(name, **data)
+
+    def to_dict(self):
+        """JSON に書き出せる辞書にする"""
+        data = {"name": self.name, "width": self.width, "height": self.height,
+                "max_enemy_bullets": self.max_enemy_bullets}
+        data.update(self.enemy_settings)
+        data.update(self.rules)
+        if "enemy_types" in data:
+            data["enemy_types"] = list(data["enemy_types"])
+        return data
+
+    @property
+    def enemy_count(self):
+        """最初の隊列の敵の数"""
+        return self.enemy_settings.get("rows", 3) * self.enemy_settings.get("columns", 6)
+
+
+STAGES = {
+    # 元のゲームと同じ（160x120 の画面に 3x6 の隊列）
+    "classic": Stage("classic"),
+    # シンプル版の invaders_game.py（5x6 の1種類の敵が速く動き、よく撃つ）。
+    # ライフは1つで、プレイヤーは遅く、弾は押すたびに1発（連射の間隔も長い）
+    "simple": Stage("simple", rows=5, columns=6, origin_x=20, origin_y=10, spacing_x=20,
+                    spacing_y=10, enemy_types=(0,), speed=1, drop=5, shoot_chance=0.01,
+                    speed_step=0.5, shoot_chance_step=0.005, lives=1, player_speed=2,
+                    fire_cooldown=10, player_bullet_speed=4, enemy_bullet_speed=2,
+                    enemy_bullet_offset=4),
+    # 960x720 の画面に 40x60 = 2400体の隊列。弾は常に数千発が画面にある
+    "stress": Stage("stress", width=960, height=720, max_enemy_bullets=4096,
+                    rows=40, columns=60, origin_x=60, origin_y=5, spacing_x=12, spacing_y=9,
+                    speed=0.5, shoot_chance=0.002, speed_step=0.2, shoot_chance_step=0.0005),
+}
+
+
+def load_stage(name):
+    """組み込みのステージ名か JSON ファイルのパスからステージを読み込む"""
+    if name in STAGES:
+        return STAGES[name]
+    if name.endswith(".json"):
+        import json  # 組み込みのステージだけを使う起動では読み込まない
+
+        with open(name) as f:
+            return Stage.from_dict(json.load(f), name)
+    raise ValueError(f"unknown stage: {name} (choose from {', '.join(STAGES)} or a .json file)")
@@ -0,0 +1,285 @@
+"""観戦用のゲームの状態の差分の符号化
+
+サーバーは tick ごとに Simulation の見た目の状態（プレイヤー、スコア、敵と弾の位置）を
+1つのフレームにする。最初のフレーム（キーフレーム）にはすべてのエンティティを入れ、
+その後のフレームには前の tick からの差分だけを入れる。
+
+エンティティは敵・プレイヤーの弾・敵の弾・必殺技の弾の4つのグループに分け、
+グループごとに次の順に書く。
+
+- 消えたもの: 前の tick のリストでの添字
+- 残ったものの移動: 全員に共通の移動量と、それと違う動きをしたものの添字と移動量
+  （敵の隊列は全員が同じだけ動き、通常弾も種類ごとに同じ速さなので、ほとんどは共通の移動量だけで済む）
+- 新しく出たもの: 位置と種類
+
+座標は 1/4 ピクセル単位の整数にし、送った座標との差だけを送るので誤差はたまらない。
+弾はプールで使い回すので、同じオブジェクトでも1tick に MAX_STEP より大きく動いたものは
+消えて新しく出たものとして扱う。
+
+StreamState はフレームを順に受け取って状態を組み立て、直前の tick の位置との間を
+補間した位置を返す（クライアントの描画用）。
+
+オブジェクト版の Simulation だけに対応する（ArraySimulation の弾や敵はビューなので
+tick ごとに別のオブジェクトになる）。
+"""
+import struct
+from array import array
+
+from simulation import BouncingBullet
+
+KEYFRAME = 0
+DELTA = 1
+
+SCALE = 4  # 座標の単位（1/4 ピクセル）
+MAX_STEP = 16 * SCALE  # 同じエンティティとみなす1tick の移動量の最大値
+
+GROUPS = ("enemies", "player_bullets", "enemy_bullets", "special_bullets")
+
+# フレームの種類, tick, スコア, プレイヤーの x, y, ライフ, フラグ（リトルエンディアン）
+FRAME_HEADER = struct.Struct("<BIIhhBB")
+COUNT = struct.Struct("<H")
+DELTA_MOVE = struct.Struct("<hh")
+
+# FRAME_HEADER のフラグ
+INVINCIBLE = 1  # 無敵中
+HIDDEN = 2  # 無敵中の点滅で見えない
+GAME_OVER = 4
+
+
+class StreamError(ValueError):
+    """フレームのデータが壊れているか、順番が合わない"""
+
+
+def _quantize(value):
+    return round(value * SCALE)
+
+
+def _kind_enemy(enemy):
+    return enemy.enemy_type
+
+
+def _kind_zero(bullet):
+    return 0
+
+
+def _kind_special(bullet):
+    return 1 if type(bullet) is BouncingBullet else 0
+
+
+KINDS = (_kind_enemy, _kind_zero, _kind_zero, _kind_special)
+
+
+def visible_groups(sim):
+    """グループごとの有効なエンティティのリスト"""
+    return ([enemy for enemy in sim.enemy_manager.enemies if enemy.is_active],
+            [bullet for bullet in sim.player_bullets if bullet.is_active],
+            [bullet for bullet in sim.enemy_bullets if bullet.is_active],
+            [bullet for bullet in sim.special_bullets if bullet.is_active])
+
+
+def _header(frame_type, sim):
+    player = sim.player
+    flags = 0
+    if player.invincible:
+        flags |= INVINCIBLE
+        if player.blink_timer >= 3:
+            flags |= HIDDEN
+    if sim.game_over:
+        flags |= GAME_OVER
+    return FRAME_HEADER.pack(frame_type, sim.frame_count, sim.score, _quantize(player.x),
+                             _quantize(player.y), player.lives, flags)
+
+
+def _entities(objects, kind):
+    """新しく出たエンティティ（数, x の配列, y の配列, 種類）"""
+    xs = array("h", [_quantize(obj.x) for obj in objects])
+    ys = array("h", [_quantize(obj.y) for obj in objects])
+    kinds = bytes([kind(obj) for obj in objects])
+    return b"".join((COUNT.pack(len(objects)), xs.tobytes(), ys.tobytes(), kinds))
+
+
+class StateEncoder:
+    """Simulation の状態をキーフレームと差分のフレームにする"""
+    def __init__(self):
+        # グループごとの前の tick に送ったエンティティ、x、y（1/4 ピクセル単位）
+        self.sent = [([], [], []) for _ in GROUPS]
+
+    def keyframe(self, sim):
+        """すべてのエンティティを入れたフレーム（途中から観戦するクライアント用）
+
+        差分の基準は変えないので、同じ tick の encode の後に呼んでもよい。
+        """
+        parts = [_header(KEYFRAME, sim)]
+        for objects, kind in zip(visible_groups(sim), KINDS):
+            parts.append(_entities(objects, kind))
+        return b"".join(parts)
+
+    def encode(self, sim):
+        """前に encode したときからの差分のフレーム"""
+        parts = [_header(DELTA, sim)]
+        for group, (objects, kind) in enumerate(zip(visible_groups(sim), KINDS)):
+            parts.append(self.encode_group(group, objects, kind))
+        return b"".join(parts)
+
+    def encode_group(self, group, objects, kind):
+        """1つのグループの差分（消えたもの, 残ったものの移動, 新しく出たもの）"""
+        sent_objects, sent_x, sent_y = self.sent[group]
+        xs = [_quantize(obj.x) for obj in objects]
+        ys = [_quantize(obj.y) for obj in objects]
+
+        # リストは残ったものの順を保ち、新しいものは最後に加わる（pool.compact）ので、
+        # 前のリストと先頭から順に照らし合わせる
+        removed = array("H")
+        moves = []
+        count = len(objects)
+        j = 0
+        for i, obj in enumerate(sent_objects):
+            if j < count and objects[j] is obj:
+                dx = xs[j] - sent_x[i]
+                dy = ys[j] - sent_y[i]
+                if -MAX_STEP <= dx <= MAX_STEP and -MAX_STEP <= dy <= MAX_STEP:
+                    moves.append((dx, dy))
+                    j += 1
+                    continue
+            removed.append(i)
+
+        # 最初に残ったものの移動量を共通の移動量にし、違うものだけ添字と移動量を送る
+        common = moves[0] if moves else (0, 0)
+        odd = [i for i, move in enumerate(moves) if move != common]
+        self.sent[group] = (objects, xs, ys)
+        return b"".join((
+            COUNT.pack(len(removed)), removed.tobytes(),
+            DELTA_MOVE.pack(*common),
+            COUNT.pack(len(odd)), array("H", odd).tobytes(),
+            array("h", [moves[i][0] for i in odd]).tobytes(),
+            array("h", [moves[i][1] for i in odd]).tobytes(),
+            _entities(objects[j:], kind),
+        ))
+
+
+class _Reader:
+    """フレームのバイト列から順に読み出す"""
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, format):
+        try:
+            values = format.unpack_from(self.data, self.offset)
+        except struct.error:
+            raise StreamError("フレームのデータが足りません") from None
+        self.offset += format.size
+        return values
+
+    def array(self, typecode, count):
+        values = array(typecode)
+        end = self.offset + values.itemsize * count
+        if end > len(self.data):
+            raise StreamError("フレームのデータが足りません")
+        values.frombytes(self.data[self.offset:end])
+        self.offset = end
+        return values
+
+    def entities(self):
+        count, = self.unpack(COUNT)
+        xs = self.array("h", count)
+        ys = self.array("h", count)
+        kinds = self.array("B", count)
+        return xs, ys, kinds
+
+
+class StreamState:
+    """受け取ったフレームから組み立てたゲームの状態（クライアント用）
+
+    グループごとに x, y, 種類と、補間のための直前の tick の x, y を持つ（1/4 ピクセル単位）。
+    キーフレームを受け取るまでは差分のフレームを捨てる。
+    """
+    def __init__(self):
+        self.tick = None  # 最後に受け取ったフレームの tick（None ならキーフレーム待ち）
+        self.score = 0
+        self.player = (0, 0)  # プレイヤーの x, y（ピクセル）
+        self.prev_player = (0, 0)
+        self.lives = 0
+        self.flags = 0
+        # グループごとの [x, y, 種類, 直前の x, 直前の y]
+        self.groups = [[array("h"), array("h"), array("B"), array("h"), array("h")]
+                       for _ in GROUPS]
+
+    def apply(self, data):
+        """フレームを1つ反映し、反映したら True を返す"""
+        reader = _Reader(data)
+        frame_type, tick, score, x, y, lives, flags = reader.unpack(FRAME_HEADER)
+        if frame_type == DELTA:
+            if self.tick is None:
+                return False  # キーフレーム待ち
+            if tick != self.tick + 1:
+                raise StreamError(f"フレームが飛んでいます: {self.tick} -> {tick}")
+        elif frame_type != KEYFRAME:
+            raise StreamError(f"知らないフレームの種類です: {frame_type}")
+
+        player = (x / SCALE, y / SCALE)
+        self.prev_player = self.player if frame_type == DELTA else player
+        self.player = player
+        self.tick = tick
+        self.score = score
+        self.lives = lives
+        self.flags = flags
+        for group in self.groups:
+            if frame_type == KEYFRAME:
+                xs, ys, kinds = reader.entities()
+                group[:] = [xs, ys, kinds, array("h", xs), array("h", ys)]
+            else:
+                self.apply_delta(group, reader)
+        if reader.offset != len(reader.data):
+            raise StreamError("フレームのデータが余っています")
+        return True
+
+    def apply_delta(self, group, reader):
+        """1つのグループの差分を反映"""
+        xs, ys, kinds = group[:3]
+        count, = reader.unpack(COUNT)
+        removed = set(reader.array("H", count))
+        if removed:
+            keep = [i for i in range(len(xs)) if i not in removed]
+            xs = array("h", [xs[i] for i in keep])
+            ys = array("h", [ys[i] for i in keep])
+            kinds = array("B", [kinds[i] for i in keep])
+
+        prev_x = array("h", xs)
+        prev_y = array("h", ys)
+        dx, dy = reader.unpack(DELTA_MOVE)
+        count, = reader.unpack(COUNT)
+        odd = reader.array("H", count)
+        odd_dx = reader.array("h", count)
+        odd_dy = reader.array("h", count)
+        if dx:
+            xs = array("h", [x + dx for x in xs])
+        if dy:
+            ys = array("h", [y + dy for y in ys])
+        for i, ddx, ddy in zip(odd, odd_dx, odd_dy):
+            xs[i] += ddx - dx
+            ys[i] += ddy - dy
+
+        new_x, new_y, new_kinds = reader.entities()
+        xs.extend(new_x)
+        ys.extend(new_y)
+        kinds.extend(new_kinds)
+        prev_x.extend(new_x)  # 新しく出たものは補間しない
+        prev_y.extend(new_y)
+        group[:] = [xs, ys, kinds, prev_x, prev_y]
+
+    def positions(self, group, alpha=1.0):
+        """グループのエンティティの (x, y, 種類) のリスト（ピクセル）
+
+        alpha（0〜1）で直前の tick の位置から今の位置までを補間する。
+        """
+        xs, ys, kinds, prev_x, prev_y = self.groups[GROUPS.index(group)]
+        if alpha >= 1.0:
+            return [(x / SCALE, y / SCALE, kind) for x, y, kind in zip(xs, ys, kinds)]
+        return [((px + (x - px) * alpha) / SCALE, (py + (y - py) * alpha) / SCALE, kind)
+                for x, y, kind, px, py in zip(xs, ys, kinds, prev_x, prev_y)]
+
+    def player_position(self, alpha=1.0):
+        """プレイヤーの (x, y)（alpha で補間）"""
+        (px, py), (x, y) = self.prev_player, self.player
+        return px + (x - px) * alpha, py + (y - py) * alpha
@@ -0,0 +1,38 @@
+"""移動を考慮した当たり判定（スウェプトAABB）
+
+collides_with は移動した後の矩形どうしが重なっているかだけを調べるので、1tick に
+相手の大きさより長く動く弾は相手をすり抜けることがある。ここでは弾の矩形を
+この tick の始めの位置から終わりの位置まで動かし、相手の矩形と最初に重なる時刻を求める。
+
+時刻は tick の始めの位置を0、終わりの位置を1とした割合で、重ならなければ NO_HIT。
+動いていない矩形では collides_with と同じ結果になる（辺が接しているだけなら重ならない）。
+相手はこの tick の終わりの位置で止まっているものとして扱う。
+
+sweep は1組ずつ調べる。同じ計算を NumPy の配列でまとめて行う版は entity_store.sweep_times
+（ArraySimulation 用）。このモジュールはゲームの起動時に読み込まれるので NumPy を使わない。
+"""
+import math
+
+NO_HIT = math.inf
+
+
+def _axis(start, delta, size, target, target_size):
+    """1つの軸で重なっている時刻の開区間（入る時刻, 出る時刻）"""
+    if delta == 0:
+        if start < target + target_size and start + size > target:
+            return -math.inf, math.inf
+        return math.inf, -math.inf
+    t0 = (target - size - start) / delta
+    t1 = (target + target_size - start) / delta
+    return (t0, t1) if t0 < t1 else (t1, t0)
+
+
+def sweep(x, y, dx, dy, width, height, target_x, target_y, target_width, target_height):
+    """(x, y) から (dx, dy) 動く矩形が止まっている矩形と最初に重なる時刻を返す"""
+    enter_x, exit_x = _axis(x, dx, width, target_x, target_width)
+    enter_y, exit_y = _axis(y, dy, height, target_y, target_height)
+    enter = enter_x if enter_x > enter_y else enter_y
+    leave = exit_x if exit_x < exit_y else exit_y
+    if enter < leave and enter < 1.0 and leave > 0.0:
+        return enter if enter > 0.0 else 0.0
+    return NO_HIT
@@ -0,0 +1,22 @@
+"""snapshot の複製"""
+import snapshot
+from simulation import Inputs, Simulation
+
+LEFT = Inputs(left=True)
+
+
+def test_clone_keeps_fractional_player_position():
+    sim = Simulation(seed=3, rules={"player_speed": 2.5})
+    for _ in range(5):
+        sim.step(LEFT)
+    assert sim.player.x == 67.5
+
+    copy = snapshot.clone(sim)
+    assert copy.player.x == sim.player.x
+    assert snapshot.dumps(copy) == snapshot.dumps(sim)
+    # 複製したゲームは元のゲームと同じように進む
+    for _ in range(300):
+        inputs = Inputs(left=sim.frame_count % 40 < 20, space=True)
+        sim.step(inputs)
+        copy.step(inputs)
+    assert snapshot.dumps(copy) == snapshot.dumps(sim)
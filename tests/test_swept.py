@@ -0,0 +1,42 @@
+"""collision="swept" の当たり判定"""
+import pytest
+
+from simulation import Inputs, Simulation
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ENGINES = [Simulation]
+if numpy is not None:
+    from entity_store import ArraySimulation
+    ENGINES.append(ArraySimulation)
+
+# 1行の止まった敵の隊列（敵は撃たない）
+STILL_ROW = {"rows": 1, "origin_y": 5, "speed": 0, "shoot_chance": 0}
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("speed", [5, 21, 37])
+def test_player_bullet_hits_enemy_on_the_tick_it_leaves_the_screen(engine, speed):
+    # 速さ 21 の弾は 100→79→58→37→16→-5 と進み、敵を通り過ぎる tick に画面の外に出る
+    sim = engine(seed=1, collision="swept", enemy_settings=STILL_ROW,
+                 rules={"player_bullet_speed": speed})
+    sim.player.x = sim.enemy_manager.enemies[0].x
+    sim.step(Inputs(space=True))
+    for _ in range(20):
+        sim.step()
+    assert sim.score == 10
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_enemy_bullet_hits_player_on_the_tick_it_leaves_the_screen(engine):
+    sim = engine(seed=1, collision="swept", enemy_settings=STILL_ROW,
+                 rules={"enemy_bullet_speed": 40})
+    lives = sim.player.lives
+    # 85→125 と進み、プレイヤー（y=100〜108）を通り過ぎる tick に画面の下に出る
+    sim.add_enemy_bullet(sim.player.x, 85)
+    sim.step()
+    assert sim.player.lives == lives - 1
+    assert not sim.enemy_bullets
@@ -0,0 +1,62 @@
+"""固定タイムステップのループ制御
+
+ゲームのルールは1tickごとの移動量やクールダウンで書かれているので、描画の
+フレームが遅れたり飛んだりしてもゲームの速さが変わらないように、経過した
+実時間に応じて1フレームで進める tick 数を決める。
+
+描画が遅れて溜まった時間は max_ticks まで追いつき、それを超えた分は捨てる
+（大きな引っかかりの後に長い早送りにならないように）。alpha は前の tick から
+次の tick までのどこにいるか（0〜1）で、位置の補間描画に使う。
+"""
+import time
+
+# ゲームのルールが前提にしている1秒あたりの tick 数
+TICK_RATE = 30
+
+
+class FixedTimestep:
+    """経過時間から1フレームで進める tick 数を決める"""
+    # 1tick との差がこれより小さい経過時間は1tick ちょうどとみなす
+    # （描画と tick が同じ周期のとき、時計の揺れで 0 tick と 2 tick が交互にならないように）
+    SNAP = 0.002
+
+    def __init__(self, tick_rate=TICK_RATE, max_ticks=4, clock=time.perf_counter):
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.max_ticks = max_ticks  # 1フレームで追いつく tick 数の上限
+        self.clock = clock
+        self.accumulator = 0.0  # まだ進めていない時間（秒）
+        self.dropped = 0.0  # 追いつけずに捨てた時間の合計（秒）
+        self.last = None
+
+    def reset(self):
+        """溜まった時間を捨てて、今から測り直す（ポーズ解除やリスタートのとき）"""
+        self.last = self.clock()
+        self.accumulator = 0.0
+
+    def advance(self):
+        """前回からの経過時間を加えて、今回進める tick 数を返す"""
+        now = self.clock()
+        if self.last is None:  # 最初のフレームは1tick 進める
+            self.last = now
+            return 1
+
+        elapsed = now - self.last
+        self.last = now
+        if abs(elapsed - self.dt) < self.SNAP:
+            elapsed = self.dt
+
+        self.accumulator += elapsed
+        ticks = int(self.accumulator / self.dt + 1e-9)  # 浮動小数点の誤差で1tick 足りなくならないように
+        if ticks > self.max_ticks:
+            # 追いつけない分は捨てる
+            self.dropped += (ticks - self.max_ticks) * self.dt
+            ticks = self.max_ticks
+            self.accumulator = self.accumulator % self.dt + ticks * self.dt
+        self.accumulator = max(self.accumulator - ticks * self.dt, 0.0)
+        return ticks
+
+    @property
+    def alpha(self):
+        """前の tick から次の tick までの進み具合（0〜1）"""
+        return min(self.accumulator / self.dt, 1.0)